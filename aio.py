@@ -0,0 +1,52 @@
+from __future__ import annotations
+import asyncio, subprocess
+
+import httpx
+
+_client = None   # (loop, httpx.AsyncClient)
+
+
+async def run(cmd: list[str], timeout: float, check: bool = False) -> tuple[int, str]:
+  """Start `cmd` zonder de event loop te blokkeren; geeft (returncode, stdout+stderr).
+
+  Bij overschrijding van `timeout` wordt het proces gekild en volgt
+  subprocess.TimeoutExpired (zelfde semantiek als subprocess.check_output).
+  """
+  proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+  try:
+    out, _ = await asyncio.wait_for(proc.communicate(), timeout)
+  except asyncio.TimeoutError:
+    proc.kill()
+    await proc.wait()
+    raise subprocess.TimeoutExpired(cmd, timeout)
+  text = out.decode('utf-8', 'replace')
+  if check and proc.returncode:
+    raise subprocess.CalledProcessError(proc.returncode, cmd, text)
+  return proc.returncode, text
+
+
+def client() -> httpx.AsyncClient:
+  """Gedeelde AsyncClient (keep-alive pool) voor de draaiende event loop."""
+  global _client
+  loop = asyncio.get_running_loop()
+  if _client is None or _client[0] is not loop or _client[1].is_closed:
+    _client = (loop, httpx.AsyncClient(follow_redirects=False))
+  return _client[1]
+
+
+async def aclose():
+  global _client
+  if _client is not None:
+    cur, _client = _client, None
+    await cur[1].aclose()
+
+
+async def http_request(url: str, headers: dict | None = None, method: str = 'GET',
+                       connect_timeout: float = 2.0, read_timeout: float = 5.0) -> tuple[int, bytes]:
+  """HTTP-request via httpx met aparte connect- en read-timeout.
+
+  Geeft (status, body); netwerkfouten en timeouts (httpx.TimeoutException) worden doorgegeven.
+  """
+  resp = await client().request(method, url, headers=headers,
+                                timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+  return resp.status_code, resp.content
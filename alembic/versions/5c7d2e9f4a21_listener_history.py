@@ -0,0 +1,32 @@
+"""listener history chunks
+
+Revision ID: 5c7d2e9f4a21
+Revises: 3a2f5c1d8b10
+Create Date: 2026-10-18 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5c7d2e9f4a21'
+down_revision = '3a2f5c1d8b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'listener_history',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('mount', sa.String(length=255), nullable=False),
+        sa.Column('resolution', sa.Integer(), nullable=False),
+        sa.Column('bucket_start', sa.Integer(), nullable=False),
+        sa.Column('samples', sa.LargeBinary(), nullable=False),
+        sa.Column('peaks', sa.LargeBinary(), nullable=False),
+        sa.UniqueConstraint('mount', 'resolution', 'bucket_start', name='uq_listener_history_chunk'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('listener_history')
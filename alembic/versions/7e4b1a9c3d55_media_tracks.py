@@ -0,0 +1,43 @@
+"""media track metadata index
+
+Revision ID: 7e4b1a9c3d55
+Revises: 5c7d2e9f4a21
+Create Date: 2026-10-18 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '7e4b1a9c3d55'
+down_revision = '5c7d2e9f4a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'media_tracks',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('dir', sa.String(length=255), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('mtime_ns', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('artist', sa.String(length=255), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=True),
+        sa.Column('album', sa.String(length=255), nullable=True),
+        sa.Column('duration', sa.Float(), nullable=True),
+        sa.Column('bitrate', sa.Integer(), nullable=True),
+        sa.Column('vbr', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('error', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('indexed_at', sa.Integer(), nullable=False, server_default='0'),
+        sa.UniqueConstraint('dir', 'name', name='uq_media_tracks_file'),
+    )
+    op.create_index('ix_media_tracks_artist', 'media_tracks', ['artist'])
+    op.create_index('ix_media_tracks_title', 'media_tracks', ['title'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_tracks_title', table_name='media_tracks')
+    op.drop_index('ix_media_tracks_artist', table_name='media_tracks')
+    op.drop_table('media_tracks')
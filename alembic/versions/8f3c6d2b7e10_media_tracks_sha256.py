@@ -0,0 +1,29 @@
+"""media_tracks content hash for duplicate detection
+
+Revision ID: 8f3c6d2b7e10
+Revises: 7e4b1a9c3d55
+Create Date: 2026-10-18 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '8f3c6d2b7e10'
+down_revision = '7e4b1a9c3d55'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('media_tracks') as batch_op:
+        batch_op.add_column(sa.Column('sha256', sa.String(length=64), nullable=True))
+    op.create_index('ix_media_tracks_size', 'media_tracks', ['size'])
+    op.create_index('ix_media_tracks_sha256', 'media_tracks', ['sha256'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_media_tracks_sha256', table_name='media_tracks')
+    op.drop_index('ix_media_tracks_size', table_name='media_tracks')
+    with op.batch_alter_table('media_tracks') as batch_op:
+        batch_op.drop_column('sha256')
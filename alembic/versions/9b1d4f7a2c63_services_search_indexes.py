@@ -0,0 +1,29 @@
+"""services search/pagination indexes
+
+Revision ID: 9b1d4f7a2c63
+Revises: 8f3c6d2b7e10
+Create Date: 2026-10-18 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '9b1d4f7a2c63'
+down_revision = '8f3c6d2b7e10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_services_name_id', 'services', ['name', 'id'])
+    op.create_index('ix_services_owner_id', 'services', ['owner', 'id'])
+    op.create_index('ix_services_svc_type_id', 'services', ['svc_type', 'id'])
+    op.create_index('ix_services_uid', 'services', ['uid'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_services_uid', table_name='services')
+    op.drop_index('ix_services_svc_type_id', table_name='services')
+    op.drop_index('ix_services_owner_id', table_name='services')
+    op.drop_index('ix_services_name_id', table_name='services')
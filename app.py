@@ -1,12 +1,33 @@
 #!/usr/bin/env python3
-import os, re, subprocess, json, urllib.request, tempfile, time, logging
-from flask import Flask, render_template_string, request, Response, abort, redirect, get_flashed_messages, flash, url_for, session
+import os, re, subprocess, json, tempfile, time, logging, threading, base64, functools, gzip, hashlib
+from urllib.parse import urlparse, urlencode, quote
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+from flask import Flask, request, Response, abort, redirect, get_flashed_messages, flash, url_for, session, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import select, or_, tuple_
 from sqlalchemy.exc import SQLAlchemyError
 
-from db import get_session, engine
-from models import Base, Service, ServiceLimits, ServiceFeatures, ServiceIcecast, ServiceAutoDJ, ServiceRelay
+from db import get_session, engine, SessionLocal, check_schema
+from models import Service, ServiceLimits, ServiceFeatures, ServiceIcecast, ServiceAutoDJ, ServiceRelay
+from httppool import HTTPPool
+from history import ListenerHistoryStore, TOTAL_MOUNT
+from mediaindex import MediaIndex, iter_files, count_files, first_files, page_files
+from uploads import ChunkedUploads, UploadError, save_stream, move_file, copy_file
+from library import LibraryIndexer
+from dupes import DuplicateFinder
+from reload import ReloadCoalescer
+from dbhealth import DBHealth
+from multistatus import MultiStatusCollector, parse_icecast_status
+from svcsettings import SettingsCache, load_service, settings_dict
+import svcio
+from icecastconf import IcecastConfig
 from werkzeug.utils import secure_filename
+from markupsafe import Markup
+from collections import OrderedDict
+try:
+  import brotli  # optioneel: Content-Encoding br voor /api/status
+except ImportError:
+  brotli = None
 
 APP_TITLE = "Ingest Admin (Lite)"
 
@@ -75,11 +96,78 @@ MOUNT_DIR          = os.environ.get("MOUNT_DIR", "/srv/fallback-music")
 ICE_ADMIN_BASE     = os.environ.get("ICE_ADMIN_BASE", os.environ.get("ICE_ADMIN_URL", ""))
 ADMIN_DRY_RUN      = os.environ.get("ADMIN_DRY_RUN", "")
 MOVEALL_MIN_INTERVAL_SEC = int(os.environ.get("MOVEALL_MIN_INTERVAL_SEC", "10") or "10")
+# Keep-alive verbindingen naar Icecast status/admin: aparte connect- en read-timeout
+ICE_HTTP_CONNECT_TIMEOUT = float(os.environ.get("ICE_HTTP_CONNECT_TIMEOUT", "2") or "2")
+ICE_HTTP_READ_TIMEOUT    = float(os.environ.get("ICE_HTTP_READ_TIMEOUT", "5") or "5")
+ICE_HTTP_MAX_IDLE        = int(os.environ.get("ICE_HTTP_MAX_IDLE", "4") or "4")
+# Eén Icecast-instantie per Service: status-URL per poort ({port}, {id}); standaard ICECAST_STATUS_URL met de poort van de service
+_ice_status = urlparse(ICECAST_STATUS_URL)
+ICECAST_INSTANCE_URL  = os.environ.get("ICECAST_INSTANCE_URL", "") or \
+  f"{_ice_status.scheme or 'http'}://{_ice_status.hostname or '127.0.0.1'}:{{port}}{_ice_status.path or '/status-json.xsl'}"
+ICE_MULTI_TIMEOUT_SEC = float(os.environ.get("ICE_MULTI_TIMEOUT_SEC", "2.5") or "2.5")
+ICE_MULTI_TTL_SEC     = float(os.environ.get("ICE_MULTI_TTL_SEC", "5") or "5")
+ICE_MULTI_WORKERS     = int(os.environ.get("ICE_MULTI_WORKERS", "16") or "16")
+SERVICES_IMPORT_MAX_BYTES = int(float(os.environ.get("SERVICES_IMPORT_MAX_MB", "32") or "32") * 1024 * 1024)
+# icecast.xml per service (service-<id>.xml) uit de DB; alleen gewijzigde instanties worden herladen via de wrapper ({id}, {port})
+ICECAST_CONF_DIR        = os.environ.get("ICECAST_CONF_DIR", "/etc/icecast-kh/services")
+ICECAST_INSTANCE_RELOAD = os.environ.get("ICECAST_INSTANCE_RELOAD", "icecast:reload:{id}")
+ICECAST_BASEDIR         = os.environ.get("ICECAST_BASEDIR", "/usr/share/icecast-kh")
+ICECAST_LOG_DIR         = os.environ.get("ICECAST_LOG_DIR", "/var/log/icecast-kh")
+# Circuit breaker per admin base: na N opeenvolgende fouten base overslaan met oplopende backoff
+ADMIN_CB_FAILURES = int(os.environ.get("ADMIN_CB_FAILURES", "2") or "2")
+ADMIN_CB_BASE_SEC = float(os.environ.get("ADMIN_CB_BASE_SEC", "10") or "10")
+ADMIN_CB_MAX_SEC  = float(os.environ.get("ADMIN_CB_MAX_SEC", "300") or "300")
+# Uploads: eerst naar UPLOAD_TMP_DIR (zelfde filesystem als MOUNT_DIR), dan atomair hernoemen.
+# Hervatbare uploads gaan in chunks van UPLOAD_CHUNK_MB (< MAX_UPLOAD_MB) tot UPLOAD_MAX_MB totaal.
+UPLOAD_TMP_DIR     = os.environ.get("UPLOAD_TMP_DIR", "") or os.path.join(MOUNT_DIR, ".uploads")
+UPLOAD_MAX_BYTES   = int(os.environ.get("UPLOAD_MAX_MB", "2048") or "2048") * 1024 * 1024
+UPLOAD_CHUNK_BYTES = int(float(os.environ.get("UPLOAD_CHUNK_MB", "8") or "8") * 1024 * 1024)
+UPLOAD_TTL_HOURS   = float(os.environ.get("UPLOAD_TTL_HOURS", "24") or "24")
+# Metadata-index (ID3/Xing) van alle mp3's: volledige ronde elke LIBRARY_SCAN_SEC, LIBRARY_WORKERS leesthreads
+LIBRARY_INDEX      = (os.environ.get("LIBRARY_INDEX", "1") or "1").strip().lower() in ("1","true","yes","on")
+LIBRARY_SCAN_SEC   = float(os.environ.get("LIBRARY_SCAN_SEC", "900") or "900")
+LIBRARY_WORKERS    = int(os.environ.get("LIBRARY_WORKERS", "4") or "4")
+# Duplicaten (zelfde inhoud) na elke indexronde: grootte → kop/staart → sha256 (persistent in media_tracks)
+DUPLICATE_SCAN     = (os.environ.get("DUPLICATE_SCAN", "1") or "1").strip().lower() in ("1","true","yes","on")
+# Soft reloads per map bundelen: poke pas na RELOAD_DEBOUNCE_SEC stilte, uiterlijk na RELOAD_MAX_WAIT_SEC (0 = direct)
+RELOAD_DEBOUNCE_SEC = float(os.environ.get("RELOAD_DEBOUNCE_SEC", "2") or "2")
+RELOAD_MAX_WAIT_SEC = float(os.environ.get("RELOAD_MAX_WAIT_SEC", "10") or "10")
+RELOAD_STATE_DIR    = os.environ.get("RELOAD_STATE_DIR", "") or None
+# Instellingen per service in-process cachen; commits wissen direct, andere workers na maximaal zoveel seconden
+SETTINGS_CACHE_SEC = float(os.environ.get("SETTINGS_CACHE_SEC", "30") or "30")
+# DB-badge en /db-status: SELECT 1 op de achtergrond, tabeltellingen gecachet
+DB_HEALTH_SEC      = float(os.environ.get("DB_HEALTH_SEC", "15") or "15")
+DB_COUNTS_TTL_SEC  = float(os.environ.get("DB_COUNTS_TTL_SEC", "60") or "60")
+# Live dashboard (SSE): keepalive/ping-interval, max. duur per stream (client herverbindt) en max. streams per worker.
+# Elke stream houdt een gthread-thread bezet: standaard GUNICORN_THREADS (gelijk aan --threads) min 2 voor gewone requests
+SSE_KEEPALIVE_SEC = float(os.environ.get("SSE_KEEPALIVE_SEC", "15") or "15")
+SSE_MAX_SEC       = float(os.environ.get("SSE_MAX_SEC", "300") or "300")
+GUNICORN_THREADS  = int(os.environ.get("GUNICORN_THREADS", "8") or "8")
+SSE_MAX_CLIENTS   = int(os.environ.get("SSE_MAX_CLIENTS", "") or max(1, GUNICORN_THREADS - 2))
+# Luisterhistorie (ServiceFeatures.hist): retentie per resolutie en flush-interval naar de DB
+LISTENER_HISTORY            = os.environ.get("LISTENER_HISTORY", "auto")
+HISTORY_FLUSH_SEC           = float(os.environ.get("HISTORY_FLUSH_SEC", "300") or "300")
+HISTORY_RAW_RETENTION_SEC   = int(os.environ.get("HISTORY_RAW_RETENTION_SEC", str(2 * 86400)) or "0")
+HISTORY_MIN_RETENTION_SEC   = int(os.environ.get("HISTORY_MIN_RETENTION_SEC", str(35 * 86400)) or "0")
+HISTORY_HOUR_RETENTION_SEC  = int(os.environ.get("HISTORY_HOUR_RETENTION_SEC", str(730 * 86400)) or "0")
+# Bulk admin-acties (move all, bulk killsource/moveclients): parallelle calls en totale deadline
+ADMIN_PARALLEL     = int(os.environ.get("ADMIN_PARALLEL", "8") or "8")
+ADMIN_DEADLINE_SEC = float(os.environ.get("ADMIN_DEADLINE_SEC", "20") or "20")
+# Icecast status poller: interval en hoe lang een laatste goede snapshot bruikbaar blijft als Icecast faalt
+ICECAST_POLL_INTERVAL_SEC = float(os.environ.get("ICECAST_POLL_INTERVAL_SEC", "5") or "5")
+ICECAST_STALE_MAX_SEC     = float(os.environ.get("ICECAST_STALE_MAX_SEC", "60") or "60")
+# systemctl show resultaten kort cachen (monitoring pollt /api/status elke paar seconden)
+SYSTEMD_CACHE_TTL_SEC     = float(os.environ.get("SYSTEMD_CACHE_TTL_SEC", "3") or "3")
 
 # Media secties (submappen van MOUNT_DIR)
 PLAYLISTS_DIR = os.environ.get("PLAYLISTS_DIR", "PLAYLISTS")
 JINGLES_DIR   = os.environ.get("JINGLES_DIR", "Jingles")
 MUSIC_DIR     = os.environ.get("MUSIC_DIR", "Music")
+# Media index: mtime-check per map zonder watch als vangnet naast inotify (MEDIA_INOTIFY=0 schakelt inotify uit, bijv. op NFS)
+MEDIA_RESCAN_SEC = float(os.environ.get("MEDIA_RESCAN_SEC", "60") or "60")
+MEDIA_INOTIFY    = (os.environ.get("MEDIA_INOTIFY", "1") or "1").strip().lower() in ("1","true","yes","on")
+# MEDIA_INDEX=0: geen in-memory index, elke weergave streamt via os.scandir (top-N heap, cursor)
+MEDIA_INDEX      = (os.environ.get("MEDIA_INDEX", "1") or "1").strip().lower() in ("1","true","yes","on")
 
 # Gebruik een stabiele secret voor flash-meldingen
 SECRET_KEY         = os.environ.get("SECRET_KEY", ADMIN_TOKEN or "please-change-this")
@@ -127,6 +215,8 @@ HTML = """
   .badge-db{display:inline-block;margin-left:8px;padding:2px 8px;border-radius:999px;font-size:12px;vertical-align:middle}
   .badge-db.ok{background:#ecfdf5;border:1px solid #a7f3d0;color:#065f46}
   .badge-db.err{background:#fef2f2;border:1px solid #fecaca;color:#991b1b}
+  li.offline{opacity:.5}
+  li.offline .ml::after{content:" (offline)"}
   /* Settings tabs */
   .tabs{display:flex;gap:8px;flex-wrap:wrap;margin:0 0 12px}
   .tab{display:inline-block;padding:8px 10px;border:1px solid #e5e7eb;border-radius:999px;text-decoration:none;color:#1f2937;background:#fff}
@@ -140,6 +230,40 @@ HTML = """
       // Fallback
       const ta=document.createElement('textarea'); ta.value=t; document.body.appendChild(ta); ta.select(); try{document.execCommand('copy'); alert('Curl gekopieerd');}catch(e){alert('Kopiëren mislukt');} finally{document.body.removeChild(ta);}    }
   }
+  // Upload in chunks (hervatbaar): start → PUT per chunk → finish; valt zonder fetch terug op het formulier
+  function chunkedUpload(form){
+    var inp=form.querySelector('input[type=file]');
+    if(!window.fetch || !window.FormData || !inp || !inp.files || !inp.files.length) return true;
+    var file=inp.files[0], fd=new FormData(form), csrf=fd.get('csrf'), url=form.action.replace(/\/$/,'');
+    var key='upload:'+(fd.get('mount')||'')+'|'+(fd.get('dir')||'')+'|'+file.name+'|'+file.size+'|'+file.lastModified;
+    var bar=form.querySelector('progress')||form.appendChild(document.createElement('progress'));
+    bar.max=file.size; bar.value=0;
+    var btn=form.querySelector('button'); if(btn) btn.disabled=true;
+    function json(r){ return r.json().then(function(d){ if(!r.ok && r.status!==409) throw new Error(d.error||('HTTP '+r.status)); return d }) }
+    function post(path, fields){ var b=new FormData(); b.append('csrf',csrf); Object.keys(fields).forEach(function(k){ b.append(k,fields[k]) }); return fetch(url+path,{method:'POST',body:b,credentials:'same-origin'}).then(json) }
+    function start(){ return post('/start',{mount:fd.get('mount')||'',dir:fd.get('dir')||'',name:file.name,size:file.size}).then(function(d){ localStorage.setItem(key,d.id); return d }) }
+    function begin(){
+      var id=localStorage.getItem(key); if(!id) return start();
+      return fetch(url+'/'+id,{credentials:'same-origin'}).then(function(r){ if(r.ok) return r.json(); localStorage.removeItem(key); return start() });
+    }
+    function send(d, tries){
+      bar.value=d.offset;
+      if(d.offset>=file.size) return post('/'+d.id+'/finish',{});
+      var end=Math.min(file.size, d.offset+d.chunk_size);
+      return fetch(url+'/'+d.id+'?offset='+d.offset,{method:'PUT',body:file.slice(d.offset,end),credentials:'same-origin',headers:{'X-CSRF-Token':csrf,'Content-Type':'application/octet-stream'}})
+        .then(json).then(function(r){ return send({id:d.id,offset:r.offset,chunk_size:d.chunk_size},0) }, function(e){
+          if(tries>=5) throw e;
+          return new Promise(function(ok){ setTimeout(ok,1000*Math.pow(2,tries)) })
+            .then(function(){ return fetch(url+'/'+d.id,{credentials:'same-origin'}).then(json) })
+            .then(function(st){ return send({id:d.id,offset:st.offset,chunk_size:d.chunk_size},tries+1) });
+        });
+    }
+    begin().then(function(d){ return send(d,0) }).then(function(){ localStorage.removeItem(key); location.reload() }, function(e){
+      if(btn) btn.disabled=false;
+      alert('Upload mislukt: '+e.message+'\nKies hetzelfde bestand opnieuw om te hervatten.');
+    });
+    return false;
+  }
   function copyMoveCurl(base, userPlaceholder, src, selectId){
     var sel=document.getElementById(selectId); if(!sel){alert('Selectie niet gevonden');return}
     var dst=sel.value; var b=(base||'').replace(/\/$/,'');
@@ -175,7 +299,7 @@ HTML = """
   {% endif %}
 
   {% for m in messages %}
-    <div class="alert {{ 'ok' if m.ok else 'err' }}">{{ m.text }}</div>
+    <div class="alert {{ m.cls }}">{{ m.text }}</div>
   {% endfor %}
 
   <p class="muted">OK – app.py draait.</p>
@@ -198,6 +322,11 @@ HTML = """
           <li><a href="#logs">Logbeheer</a></li>
         </ul>
       </div>
+      {% macro unit_meta(u) %}
+        {% if u.ActiveEnterTimestamp or u.MainPID %}
+          <div class="muted">{% if u.ActiveEnterTimestamp %}sinds {{u.ActiveEnterTimestamp}}{% endif %}{% if u.MainPID %} · pid {{u.MainPID}}{% endif %}{% if u.NRestarts %} · <span class="warn">{{u.NRestarts}} restarts</span>{% endif %}</div>
+        {% endif %}
+      {% endmacro %}
       <div class="card" id="status">
         <h2>Service status</h2>
         <ul>
@@ -206,13 +335,23 @@ HTML = """
             {% elif svc_ice == 'inactive' %}<span class="warn">inactive</span>
             {% else %}<span class="err">{{svc_ice}}</span>{% endif %}
             <div class="muted">unit: <code>{{ice_unit}}</code></div>
+            {{ unit_meta(units.get(ice_unit, {})) }}
           </li>
           <li><strong>Liquidsoap:</strong>
             {% if svc_lsq == 'active' %}<span class="ok">active</span>
             {% elif svc_lsq == 'inactive' %}<span class="warn">inactive</span>
             {% else %}<span class="err">{{svc_lsq}}</span>{% endif %}
             <div class="muted">unit: <code>{{lsq_unit}}</code></div>
+            {{ unit_meta(units.get(lsq_unit, {})) }}
           </li>
+          {% for name, u in units.items() if name not in (ice_unit, lsq_unit) %}
+            <li><code>{{name}}</code>:
+              {% if u.ActiveState == 'active' %}<span class="ok">active</span>
+              {% elif u.ActiveState == 'inactive' %}<span class="warn">inactive</span>
+              {% else %}<span class="err">{{u.ActiveState}}</span>{% endif %}
+              {{ unit_meta(u) }}
+            </li>
+          {% endfor %}
         </ul>
       </div>
 
@@ -229,8 +368,18 @@ HTML = """
           <li>
             <strong>Bases volgorde:</strong>
             {% if admin_conf.bases %}
-              {% for b in admin_conf.bases %}
-                <div><code>{{b}}</code></div>
+              {% for h in admin_conf.health %}
+                <div>
+                  <code>{{h.base}}</code>
+                  {% if h.state == 'ok' %}<span class="ok">ok</span>
+                  {% elif h.state == 'open' %}<span class="err">circuit open ({{h.open_for}}s)</span>
+                  {% elif h.state == 'half-open' %}<span class="warn">half-open ({{'proefcall loopt' if h.trial else 'wacht op proefcall'}})</span>
+                  {% elif h.state == 'failing' %}<span class="warn">{{h.failures}}× fout</span>
+                  {% else %}<span class="muted">onbekend</span>{% endif %}
+                  {% if h.preferred %}<span class="muted">· voorkeur</span>{% endif %}
+                  {% if h.latency is not none %}<span class="muted">· {{ (h.latency * 1000)|round|int }} ms</span>{% endif %}
+                  {% if h.last_error %}<div class="muted">{{h.last_error}}</div>{% endif %}
+                </div>
               {% endfor %}
             {% else %}
               <div class="muted">(geen bases geconfigureerd)</div>
@@ -238,6 +387,9 @@ HTML = """
             <div class="muted">voorkeur/copy: <code>{{admin_base}}</code></div>
           </li>
           <li><strong>Dry-run:</strong> {{ 'aan' if is_dry_run else 'uit' }}</li>
+          <li><strong>HTTP pool:</strong>
+            <span class="muted">{{http_pool.requests}} requests · hergebruik {{ (http_pool.reuse_rate * 100)|round|int }}% · {{http_pool.open}} open · {{http_pool.errors}} fouten</span>
+          </li>
         </ul>
       </div>
 
@@ -250,6 +402,7 @@ HTML = """
           <button name="do" value="liquidsoap:reload">Reload Liquidsoap</button>
           <button name="do" value="liquidsoap:restart">Restart Liquidsoap</button>
           <button name="do" value="env:reload">Reload Env (.env)</button>
+          <button name="do" value="mountmap:reload">Reload Mountmap</button>
           <button name="do" value="admin:test">Test Admin</button>
           <button name="do" value="admin:probe-kill">Test Killsource Auth</button>
           <button name="do" value="admin:probe-move">Test Moveclients Auth</button>
@@ -278,71 +431,75 @@ HTML = """
             <button type="button" onclick="copyMoveAllCurls('{{admin_base}}','{{ (admin_user if admin_user else "USER") }}:*****','dst-global', {{ mounts_names|tojson }})">copy curls</button>
           </form>
           {% endif %}
-          <div><strong>Totaal:</strong> {{ice.listeners}}</div>
-          <div><strong>Mounts:</strong> {{ice.mounts_count}}</div>
+          {% if mounts %}
+          <form method="post" action="{{pref}}/mount/bulk" id="bulk-form" style="margin:6px 0" onsubmit="return confirm('Actie uitvoeren op geselecteerde mounts?')">
+            <input type="hidden" name="csrf" value="{{csrf}}">
+            <label>Geselecteerde mounts:
+              <select name="op">
+                <option value="moveclients">moveclients naar</option>
+                <option value="killsource">disconnect (killsource)</option>
+              </select>
+            </label>
+            <select name="dst">
+              {% for m in mounts %}
+                <option value="{{m.mount}}">{{m.mount}}</option>
+              {% endfor %}
+            </select>
+            <button>uitvoeren</button>
+          </form>
+          {% endif %}
+          <div><strong>Totaal:</strong> <span id="ice-total">{{ice.listeners}}</span></div>
+          <div><strong>Mounts:</strong> <span id="ice-count">{{ice.mounts_count}}</span></div>
+          <div class="muted">Status <span id="ice-age">{{ice.age}}</span>s oud <span id="ice-stale" class="warn"{% if not ice.stale %} hidden{% endif %}>(verouderd — Icecast reageert niet)</span></div>
+          <div id="ice-live" class="muted"></div>
           {% if mounts %}
             <ul>
               {% for m in mounts %}
-                <li>
-                  <code>{{m.mount}}</code> — {{m.listeners}} luisteraars
+                <li data-mount="{{m.mount}}">
+                  <input type="checkbox" name="mounts" value="{{m.mount}}" form="bulk-form" aria-label="selecteer {{m.mount}}">
+                  <code>{{m.mount}}</code> — <span class="ml">{{m.listeners}}</span> luisteraars
                   &nbsp;·&nbsp;
                   <a href="{{public_base}}{{m.mount}}" target="_blank">luister</a>
-                  <form method="post" action="mount/soft-reload" style="display:inline">
-                    <input type="hidden" name="csrf" value="{{csrf}}">
-                    <input type="hidden" name="mount" value="{{m.mount}}">
-                    <button>soft reload</button>
-                  </form>
-                  <form method="post" action="mount/disconnect" style="display:inline" onsubmit="return confirm('Disconnect {{m.mount}}?')">
-                    <input type="hidden" name="csrf" value="{{csrf}}">
-                    <input type="hidden" name="mount" value="{{m.mount}}">
-                    <button>restart (disconnect)</button>
-                  </form>
-                  <form method="post" action="mount/moveclients" style="display:inline" onsubmit="return confirm('Move listeners van {{m.mount}} naar gekozen mount?')">
-                    <input type="hidden" name="csrf" value="{{csrf}}">
-                    <input type="hidden" name="src" value="{{m.mount}}">
-                    {% set sel_id = 'dst-' + m.mount|replace('/','_')|replace('.','_')|replace(' ','_') %}
-                    <select name="dst" id="{{sel_id}}">
-                      {% for m2 in mounts %}
-                        {% if m2.mount != m.mount %}
-                          <option value="{{m2.mount}}">→ {{m2.mount}}</option>
-                        {% endif %}
-                      {% endfor %}
-                    </select>
-                    <button>moveclients</button>
-                    <button type="button" onclick="copyMoveCurl('{{admin_base}}','{{ (admin_user if admin_user else "USER") }}:*****','{{m.mount}}','{{sel_id}}')">copy curl</button>
-                  </form>
-                  {% if m.dir %}
-                    <div class="muted">map: <code>{{m.dir}}</code></div>
-                    {% if m.files %}
-                      <div style="margin-top:6px"><strong>Bestanden</strong> (max 20):</div>
-                      <ul>
-                        {% for f in m.files %}
-                          <li>
-                            <code>{{f}}</code>
-                            <form method="post" action="{{pref}}/files/delete" style="display:inline" onsubmit="return confirm('Verwijder {{f}} uit {{m.dir}}?')">
-                              <input type="hidden" name="csrf" value="{{csrf}}">
-                              <input type="hidden" name="mount" value="{{m.mount}}">
-                              <input type="hidden" name="name" value="{{f}}">
-                              <button>verwijderen</button>
-                            </form>
-                          </li>
-                        {% endfor %}
-                      </ul>
-                      {% if m.files_total and m.files_total > 20 %}
-                        <div class="muted" style="margin-top:4px">
-                          <a href="?dir={{m.dir}}&per=100">Bekijk alle ({{m.files_total}})</a>
-                        </div>
-                      {% endif %}
-                    {% else %}
-                      <div class="muted">Geen mp3's gevonden in {{m.dir}}</div>
-                    {% endif %}
-                  {% endif %}
+                  {{ m.card }}
                 </li>
               {% endfor %}
             </ul>
           {% endif %}
+          <script>
+          (function(){
+            if(!window.EventSource) return;
+            var es=new EventSource('{{pref}}/api/events'), fresh={}, ageBase=null, ageAt=Date.now();
+            function el(id){return document.getElementById(id)}
+            function txt(id,v){var e=el(id); if(e && v!=null) e.textContent=v}
+            function row(m){return document.querySelector('li[data-mount="'+(window.CSS&&CSS.escape?CSS.escape(m):m)+'"]')}
+            function age(d){ if(d.age!=null){ageBase=d.age; ageAt=Date.now()} var s=el('ice-stale'); if(s) s.hidden=!d.stale }
+            function apply(d, full){
+              age(d);
+              var live=el('ice-live');
+              if(!d.ok){ if(live) live.textContent='Icecast reageert niet — laatste bekende waarden'; return }
+              txt('ice-total', d.total); txt('ice-count', d.count);
+              var set=full ? d.mounts : (d.set||{});
+              if(full){
+                fresh={};
+                document.querySelectorAll('li[data-mount]').forEach(function(li){ li.classList.toggle('offline', !(li.getAttribute('data-mount') in set)) });
+              }
+              Object.keys(set).forEach(function(m){
+                var li=row(m);
+                if(li){ li.classList.remove('offline'); li.querySelector('.ml').textContent=set[m] } else { fresh[m]=1 }
+              });
+              (d.gone||[]).forEach(function(m){ var li=row(m); if(li) li.classList.add('offline'); delete fresh[m] });
+              var n=Object.keys(fresh);
+              if(live) live.textContent = n.length ? 'Nieuwe mount(s): '+n.join(', ')+' — herlaad de pagina voor acties' : '';
+            }
+            es.addEventListener('snapshot', function(e){ apply(JSON.parse(e.data), true) });
+            es.addEventListener('delta', function(e){ apply(JSON.parse(e.data), false) });
+            es.addEventListener('ping', function(e){ age(JSON.parse(e.data)) });
+            setInterval(function(){ if(ageBase!=null) txt('ice-age', (ageBase+(Date.now()-ageAt)/1000).toFixed(1)) }, 1000);
+          })();
+          </script>
         {% else %}
           <div class="err">Kon Icecast status niet ophalen</div>
+          {% if ice.fetched_at %}<div class="muted">Laatste goede status {{ice.age}}s geleden</div>{% endif %}
           <div class="muted">URL: <code>{{ice_url}}</code></div>
         {% endif %}
       </div>
@@ -350,7 +507,7 @@ HTML = """
       <div class="card" id="media">
         <h2>Muziekbeheer</h2>
         <div class="muted">Standaard muziekmap: <code>{{mount_dir}}/{{music_dir}}</code></div>
-        <form method="post" action="files/upload" enctype="multipart/form-data">
+        <form method="post" action="files/upload" enctype="multipart/form-data" onsubmit="return chunkedUpload(this)">
           <input type="hidden" name="csrf" value="{{csrf}}">
           <label>Mount:
             <select name="mount">
@@ -371,6 +528,17 @@ HTML = """
           <button>Upload</button>
         </form>
         <p class="muted">Upload plaatst het bestand in de gekozen of gemapte directory en triggert soft reload.</p>
+        {% if dupes and dupes.groups %}
+          <details>
+            <summary class="warn">Dubbele bestanden: {{dupes.groups}} groepen, {{dupes.redundant_files}} overbodige kopieën — {{ '%.1f'|format(dupes.reclaimable_bytes / 1048576) }} MB terug te winnen</summary>
+            <ul>
+              {% for g in dupes.top %}
+                <li>{{ '%.1f'|format(g.reclaimable / 1048576) }} MB — {% for f in g.files %}<code>{{f}}</code>{% if not loop.last %}, {% endif %}{% endfor %}</li>
+              {% endfor %}
+            </ul>
+            <a href="{{pref}}/api/library/duplicates" target="_blank">volledig overzicht (JSON)</a>
+          </details>
+        {% endif %}
       </div>
 
       <div class="card" id="bestanden">
@@ -388,9 +556,28 @@ HTML = """
         </form>
         {% if selected_dir %}
           {% if selected_files %}
+            <form method="post" action="{{pref}}/files/bulk" id="files-bulk-form" style="margin:6px 0" onsubmit="return confirm('Actie uitvoeren op geselecteerde bestanden?')">
+              <input type="hidden" name="csrf" value="{{csrf}}">
+              <input type="hidden" name="dir" value="{{selected_dir}}">
+              <label><input type="checkbox" onclick="var c=this.checked;document.querySelectorAll('input[form=files-bulk-form][name=names]').forEach(function(x){x.checked=c})"> alles</label>
+              <label>Geselecteerde bestanden:
+                <select name="op">
+                  <option value="delete">verwijderen</option>
+                  <option value="move">verplaatsen naar</option>
+                  <option value="copy">kopiëren naar</option>
+                </select>
+              </label>
+              <select name="dst">
+                {% for d in dirs %}{% if d != selected_dir %}
+                  <option value="{{d}}">{{d}}</option>
+                {% endif %}{% endfor %}
+              </select>
+              <button>uitvoeren</button>
+            </form>
             <ul>
               {% for f in selected_files %}
                 <li>
+                  <input type="checkbox" name="names" value="{{f}}" form="files-bulk-form" aria-label="selecteer {{f}}">
                   <code>{{f}}</code>
                   <form method="post" action="files/delete" style="display:inline" onsubmit="return confirm('Verwijder {{f}} uit {{selected_dir}}?')">
                     <input type="hidden" name="csrf" value="{{csrf}}">
@@ -401,18 +588,20 @@ HTML = """
                 </li>
               {% endfor %}
             </ul>
-            {% if pages and pages > 1 %}
+            {% if has_prev or has_next %}
               <div class="muted" style="margin-top:6px">
-                Pagina {{page}} / {{pages}} — totaal {{total_files}} bestanden
+                {{selected_files[0]}} … {{selected_files[-1]}} — totaal {{total_files}} bestanden
                 <div style="margin-top:4px">
-                  {% if page > 1 %}
-                    <a href="?dir={{selected_dir}}&page={{page-1}}&per={{per}}">← Vorige</a>
+                  {% if has_prev %}
+                    <a href="?dir={{selected_dir|urlencode}}&per={{per}}">« Eerste</a>
+                    &nbsp;|
+                    <a href="?dir={{selected_dir|urlencode}}&before={{selected_files[0]|urlencode}}&per={{per}}">← Vorige</a>
                   {% else %}
                     <span class="muted">← Vorige</span>
                   {% endif %}
                   &nbsp;|
-                  {% if page < pages %}
-                    <a href="?dir={{selected_dir}}&page={{page+1}}&per={{per}}">Volgende →</a>
+                  {% if has_next %}
+                    <a href="?dir={{selected_dir|urlencode}}&after={{selected_files[-1]|urlencode}}&per={{per}}">Volgende →</a>
                   {% else %}
                     <span class="muted">Volgende →</span>
                   {% endif %}
@@ -422,7 +611,7 @@ HTML = """
           {% else %}
             <div class="muted">Geen mp3's in {{selected_dir}}</div>
           {% endif %}
-          <form method="post" action="files/upload" enctype="multipart/form-data" style="margin-top:8px">
+          <form method="post" action="files/upload" enctype="multipart/form-data" onsubmit="return chunkedUpload(this)" style="margin-top:8px">
             <input type="hidden" name="csrf" value="{{csrf}}">
             <input type="hidden" name="mount" value="">
             <input type="hidden" name="dir" value="{{selected_dir}}">
@@ -510,7 +699,7 @@ HTML = """
         {% else %}
           <div class="muted">Geen bestanden gevonden.</div>
         {% endif %}
-        <form method="post" action="files/upload" enctype="multipart/form-data" style="margin-top:8px">
+        <form method="post" action="files/upload" enctype="multipart/form-data" onsubmit="return chunkedUpload(this)" style="margin-top:8px">
           <input type="hidden" name="csrf" value="{{csrf}}">
           <input type="hidden" name="mount" value="">
           <input type="hidden" name="dir" value="{{playlists_dir}}">
@@ -539,7 +728,7 @@ HTML = """
         {% else %}
           <div class="muted">Geen bestanden gevonden.</div>
         {% endif %}
-        <form method="post" action="files/upload" enctype="multipart/form-data" style="margin-top:8px">
+        <form method="post" action="files/upload" enctype="multipart/form-data" onsubmit="return chunkedUpload(this)" style="margin-top:8px">
           <input type="hidden" name="csrf" value="{{csrf}}">
           <input type="hidden" name="mount" value="">
           <input type="hidden" name="dir" value="{{jingles_dir}}">
@@ -592,6 +781,60 @@ HTML = """
 </html>
 """
 
+# Per-mount fragment (acties + bestandenlijst); apart gerenderd en gecachet, zie render_fragment()
+MOUNT_CARD_HTML = """
+<form method="post" action="mount/soft-reload" style="display:inline">
+  <input type="hidden" name="csrf" value="{{csrf}}">
+  <input type="hidden" name="mount" value="{{m.mount}}">
+  <button>soft reload</button>
+</form>
+<form method="post" action="mount/disconnect" style="display:inline" onsubmit="return confirm('Disconnect {{m.mount}}?')">
+  <input type="hidden" name="csrf" value="{{csrf}}">
+  <input type="hidden" name="mount" value="{{m.mount}}">
+  <button>restart (disconnect)</button>
+</form>
+<form method="post" action="mount/moveclients" style="display:inline" onsubmit="return confirm('Move listeners van {{m.mount}} naar gekozen mount?')">
+  <input type="hidden" name="csrf" value="{{csrf}}">
+  <input type="hidden" name="src" value="{{m.mount}}">
+  {% set sel_id = 'dst-' + m.mount|replace('/','_')|replace('.','_')|replace(' ','_') %}
+  <select name="dst" id="{{sel_id}}">
+    {% for n in mount_names %}
+      {% if n != m.mount %}
+        <option value="{{n}}">→ {{n}}</option>
+      {% endif %}
+    {% endfor %}
+  </select>
+  <button>moveclients</button>
+  <button type="button" onclick="copyMoveCurl('{{admin_base}}','{{ (admin_user if admin_user else "USER") }}:*****','{{m.mount}}','{{sel_id}}')">copy curl</button>
+</form>
+{% if m.dir %}
+  <div class="muted">map: <code>{{m.dir}}</code></div>
+  {% if m.files %}
+    <div style="margin-top:6px"><strong>Bestanden</strong> (max 20):</div>
+    <ul>
+      {% for f in m.files %}
+        <li>
+          <code>{{f}}</code>
+          <form method="post" action="{{pref}}/files/delete" style="display:inline" onsubmit="return confirm('Verwijder {{f}} uit {{m.dir}}?')">
+            <input type="hidden" name="csrf" value="{{csrf}}">
+            <input type="hidden" name="mount" value="{{m.mount}}">
+            <input type="hidden" name="name" value="{{f}}">
+            <button>verwijderen</button>
+          </form>
+        </li>
+      {% endfor %}
+    </ul>
+    {% if m.files_total and m.files_total > 20 %}
+      <div class="muted" style="margin-top:4px">
+        <a href="?dir={{m.dir}}&per=100">Bekijk alle ({{m.files_total}})</a>
+      </div>
+    {% endif %}
+  {% else %}
+    <div class="muted">Geen mp3's gevonden in {{m.dir}}</div>
+  {% endif %}
+{% endif %}
+"""
+
 # Settings (Instellen) template
 SETTINGS_HTML = """
 <!doctype html>
@@ -653,7 +896,7 @@ SETTINGS_HTML = """
           <label>Wachtwoord*<input name=\"admin_pass\" value=\"{{settings.admin_pass or ''}}\" placeholder=\"Sterk wachtwoord\"></label>
           <label>Stream Bron wachtwoord<input name=\"source_pass\" value=\"{{settings.source_pass or ''}}\"></label>
           <label>Relay Bron wachtwoord<input name=\"relay_pass\" value=\"{{settings.relay_pass or ''}}\"></label>
-          <label class=\"muted\"><input type=\"checkbox\" name=\"apply_icecast\" value=\"1\"> Toepassen: Icecast reload na opslaan</label>
+          <label class=\"muted\"><input type=\"checkbox\" name=\"apply_icecast\" value=\"1\"> Toepassen: Icecast config bijwerken na opslaan (reload alleen bij wijziging)</label>
         </div>
       {% elif active=='limieten' %}
         <div class=\"row\">
@@ -663,6 +906,7 @@ SETTINGS_HTML = """
           <label>Max gebruikers*<input name=\"listeners\" value=\"{{settings.limits.listeners}}\" placeholder=\"100\"></label>
           <label>Bandbreedte (MB)*<input name=\"bandwidth\" value=\"{{settings.limits.bandwidth}}\" placeholder=\"0\"></label>
           <label>Opslaglimiet (MB)*<input name=\"storage\" value=\"{{settings.limits.storage}}\" placeholder=\"11000\"></label>
+          <label class=\"muted\"><input type=\"checkbox\" name=\"apply_icecast\" value=\"1\"> Toepassen: Icecast config bijwerken na opslaan (reload alleen bij wijziging)</label>
         </div>
       {% elif active=='functies' %}
         <div class=\"row\">
@@ -681,6 +925,7 @@ SETTINGS_HTML = """
           <label>Introbestand<input name=\"intro\" value=\"{{settings.icecast.intro}}\" placeholder=\"/pad/naar/intro.mp3\"><span class=\"hint\">Zelfde bitrate/channels als stream</span></label>
           <label>Publiceer naar YP<input name=\"yp\" value=\"{{settings.icecast.yp}}\" placeholder=\"http://dir.xiph.org/cgi-bin/yp-cgi\"></label>
           <label>Redirect Icecast-pagina<input name=\"redirect\" value=\"{{settings.icecast.redirect}}\" placeholder=\"/default.mp3\"></label>
+          <label class=\"muted\"><input type=\"checkbox\" name=\"apply_icecast\" value=\"1\"> Toepassen: Icecast config bijwerken na opslaan (reload alleen bij wijziging)</label>
         </div>
       {% elif active=='autodj' %}
         <div class=\"row\">
@@ -724,6 +969,60 @@ def dbg(msg: str):
       log.info('[ADMIN] %s', msg)
     except Exception:
       pass
+
+# ---------- Templates: eenmalig compileren + fragment cache ----------
+
+FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', '2048') or '2048')
+
+# Inline templates één keer per proces compileren i.p.v. per request (render_template_string)
+TEMPLATES = {
+  'index': app.jinja_env.from_string(HTML),
+  'mount_card': app.jinja_env.from_string(MOUNT_CARD_HTML),
+  'settings': app.jinja_env.from_string(SETTINGS_HTML),
+}
+
+def render_page(name: str, **context) -> str:
+  """Render een voorgecompileerd template met dezelfde context als render_template_string."""
+  app.update_template_context(context)
+  return TEMPLATES[name].render(context)
+
+class FragmentCache:
+  """Thread-safe LRU voor gerenderde HTML-fragmenten, gesleuteld op de invoerdata."""
+
+  def __init__(self, maxsize: int):
+    self.maxsize = max(0, maxsize)
+    self._items = OrderedDict()
+    self._lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def get_or_render(self, key, render):
+    with self._lock:
+      html = self._items.get(key)
+      if html is not None:
+        self._items.move_to_end(key)
+        self.hits += 1
+        return html
+      self.misses += 1
+    html = Markup(render())
+    if self.maxsize:
+      with self._lock:
+        self._items[key] = html
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+          self._items.popitem(last=False)
+    return html
+
+  def clear(self):
+    with self._lock:
+      self._items.clear()
+
+fragment_cache = FragmentCache(FRAGMENT_CACHE_SIZE)
+
+def render_fragment(name: str, key: tuple, **context) -> Markup:
+  """Render (of haal uit cache) een fragment; `key` moet alle data bevatten die de output bepaalt."""
+  return fragment_cache.get_or_render((name,) + key, lambda: TEMPLATES[name].render(context))
+
 app.secret_key = SECRET_KEY
 app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_UPLOAD_MB', '100')) * 1024 * 1024
 # Harden session cookies
@@ -748,70 +1047,315 @@ def _prefix() -> str:
   dbg(f"prefix={p!r} script_root={request.script_root!r} path={request.path!r} endpoint={request.endpoint}")
   return p
 
-def _db_is_ok() -> bool:
-  try:
-    db = get_session()
+db_health = DBHealth(engine, {
+  'services': Service, 'service_limits': ServiceLimits, 'service_features': ServiceFeatures,
+  'service_icecast': ServiceIcecast, 'service_autodj': ServiceAutoDJ, 'service_relay': ServiceRelay,
+}, DB_HEALTH_SEC, DB_COUNTS_TTL_SEC)
+
+def _db_is_ok() -> bool | None:
+  """Badge: laatste achtergrondprobe (geen query per render); None = nog onbekend."""
+  return db_health.ok()
+
+SYSTEMD_PROPS = ('Id', 'LoadState', 'ActiveState', 'SubState', 'ActiveEnterTimestamp', 'NRestarts', 'MainPID')
+
+def systemd_units() -> list[str]:
+  """Bewaakte units: Icecast, Liquidsoap, ingest-admin + SYSTEMD_EXTRA_UNITS (komma/spatie gescheiden)."""
+  units = [os.environ.get("ICECAST_UNIT","icecast-kh"), os.environ.get("LIQUIDSOAP_UNIT","liquidsoap"), "ingest-admin"]
+  units += re.split(r'[,\s]+', os.environ.get("SYSTEMD_EXTRA_UNITS", "") or "")
+  out = []
+  for u in units:
+    u = (u or '').strip()
+    if u and u not in out:
+      out.append(u)
+  return out
+
+def _unit_id(unit: str) -> str:
+  return unit if '.' in unit else unit + '.service'
+
+class SystemdStatus:
+  """Status van alle units in één `systemctl show`-aanroep, gecachet met een korte TTL."""
+
+  def __init__(self, ttl: float):
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self._key = None
+    self._at = 0.0
+    self._data = {}
+    self.queries = 0
+    self.version = 0   # verhoogd zodra de unitstatus inhoudelijk wijzigt
+
+  def _query(self, units: list[str]) -> dict:
+    self.queries += 1
     try:
-      db.execute(text("SELECT 1"))
-      return True
-    finally:
-      db.close()
-  except Exception:
-    return False
+      out = subprocess.check_output(["systemctl", "show", "--property=" + ",".join(SYSTEMD_PROPS), "--", *units],
+                                    stderr=subprocess.STDOUT, text=True, timeout=5)
+    except subprocess.CalledProcessError as e:
+      err = (e.output or "error").strip() or "error"
+      return {u: {'ActiveState': err} for u in units}
+    except Exception as e:
+      return {u: {'ActiveState': f"error: {e}"} for u in units}
+    blocks = []
+    for chunk in out.strip().split("\n\n"):
+      props = {}
+      for line in chunk.splitlines():
+        k, sep, v = line.partition("=")
+        if sep:
+          props[k] = v
+      blocks.append(props)
+    if len(blocks) == len(units):
+      data = dict(zip(units, blocks))
+    else:
+      by_id = {b.get('Id'): b for b in blocks}
+      data = {u: by_id.get(_unit_id(u), {}) for u in units}
+    for props in data.values():
+      for k in ('NRestarts', 'MainPID'):
+        try:
+          props[k] = int(props.get(k) or 0)
+        except ValueError:
+          pass
+      props.setdefault('ActiveState', 'unknown')
+      if props.get('LoadState') == 'not-found':
+        props['ActiveState'] = 'not-found'
+    return data
+
+  def get(self, units: list[str] | None = None) -> dict:
+    """{unit: {ActiveState, SubState, ActiveEnterTimestamp, NRestarts, MainPID, ...}}"""
+    units = units or systemd_units()
+    key = tuple(units)
+    with self._lock:
+      now = time.time()
+      if self._key != key or now - self._at >= self.ttl:
+        data = self._query(units)
+        if data != self._data:
+          self.version += 1
+        self._data = data
+        self._key = key
+        self._at = now
+      return self._data
+
+systemd_status = SystemdStatus(SYSTEMD_CACHE_TTL_SEC)
+
+ice_http = HTTPPool(ICE_HTTP_CONNECT_TIMEOUT, ICE_HTTP_READ_TIMEOUT, ICE_HTTP_MAX_IDLE)
+
+@functools.lru_cache(maxsize=8)
+def _basic_auth(user: str, pw: str) -> str:
+  return 'Basic ' + base64.b64encode(f"{user}:{pw}".encode('utf-8')).decode('ascii')
+
+def _admin_auth_headers(always: bool = True) -> dict:
+  user = os.environ.get('ICE_ADMIN_USER','')
+  pw   = os.environ.get('ICE_ADMIN_PASS','')
+  if not always and not (user or pw):
+    return {}
+  return {'Authorization': _basic_auth(user, pw)}
 
-def _db_is_ok() -> bool:
+def fetch_icecast(url: str):
   try:
-    db = get_session()
-    try:
-      db.execute(text("SELECT 1"))
-      return True
-    finally:
-      db.close()
+    status, body = ice_http.request(url, read_timeout=2.5)
+    if status != 200:
+      raise ValueError(f"HTTP {status}")
+    return parse_icecast_status(json.loads(body.decode("utf-8","ignore")))
   except Exception:
-    return False
+    return {"listeners": None, "mounts": None, "mounts_count": 0}
 
-def systemd_is_active(unit: str) -> str:
-  try:
-    out = subprocess.check_output(["systemctl","is-active",unit], stderr=subprocess.STDOUT, text=True).strip()
-    return out or "unknown"
-  except subprocess.CalledProcessError as e:
-    return (e.output or "error").strip() or "error"
+class IcecastPoller:
+  """Haalt de Icecast status periodiek op in een achtergrondthread.
 
-def fetch_icecast(url: str):
-  try:
-    with urllib.request.urlopen(url, timeout=2.5) as r:
-      data = json.loads(r.read().decode("utf-8","ignore"))
-    mounts = []
-    src = data.get("icestats",{}).get("source",[])
-    if isinstance(src, dict):
-      src = [src]
-    for s in src:
-      mount = s.get("listenurl") or s.get("server_name") or s.get("title") or s.get("mount")
-      if mount and mount.startswith("http"):
-        from urllib.parse import urlparse
+  Requests lezen alleen de laatst opgehaalde snapshot en blokkeren dus nooit
+  op Icecast (stale-while-revalidate). Na een fork (gunicorn workers) start
+  elk proces zijn eigen thread bij de eerste snapshot()-aanroep.
+  """
+
+  def __init__(self, url: str, interval: float, stale_max: float):
+    self.url = url
+    self.interval = max(1.0, interval)
+    self.stale_max = max(self.interval, stale_max)
+    self._lock = threading.Lock()
+    self._ready = threading.Event()
+    self._wake = threading.Event()
+    self._thread = None
+    self._pid = None
+    self._data = {"listeners": None, "mounts": None, "mounts_count": 0}
+    self._ok_at = 0.0       # laatste succesvolle fetch
+    self._checked_at = 0.0  # laatste poging
+    self._version = 0
+    self._changed = threading.Condition(self._lock)
+    self._hooks = []
+    self._change_hooks = []
+
+  def _ensure_started(self):
+    pid = os.getpid()
+    if self._pid == pid and self._thread is not None and self._thread.is_alive():
+      return
+    with self._lock:
+      if self._pid == pid and self._thread is not None and self._thread.is_alive():
+        return
+      if self._pid != pid:
+        # Nieuw (geforkt) proces: snapshot van de parent niet als vers beschouwen
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+      self._pid = pid
+      self._thread = threading.Thread(target=self._run, name="icecast-poller", daemon=True)
+      self._thread.start()
+
+  def _run(self):
+    while True:
+      try:
+        self.refresh()
+      except Exception as e:
+        log.warning('icecast poller: %s', e)
+      self._wake.wait(self.interval)
+      self._wake.clear()
+
+  def on_update(self, fn):
+    """Registreer fn(ts, data), aangeroepen na elke succesvolle fetch (in de pollerthread)."""
+    self._hooks.append(fn)
+    return fn
+
+  def on_change(self, fn):
+    """Registreer fn(version), aangeroepen (in de pollerthread) zodra de snapshot wijzigt."""
+    self._change_hooks.append(fn)
+    return fn
+
+  def refresh(self):
+    data = fetch_icecast(self.url)
+    now = time.time()
+    if data.get("listeners") is not None:
+      for fn in self._hooks:
         try:
-          p = urlparse(mount); mount = p.path or mount
-        except Exception:
-          pass
-      mounts.append({"mount": mount or "?", "listeners": int(s.get("listeners",0))})
-    total = sum(m["listeners"] for m in mounts)
-    return {"listeners": total, "mounts": mounts, "mounts_count": len(mounts)}
-  except Exception:
-    return {"listeners": None, "mounts": None, "mounts_count": 0}
+          fn(now, data)
+        except Exception as e:
+          log.warning('icecast poller hook %s: %s', getattr(fn, '__name__', fn), e)
+    with self._lock:
+      self._checked_at = now
+      version = self._version
+      if data.get("listeners") is not None:
+        if data != self._data:
+          self._version += 1
+        self._data = data
+        self._ok_at = now
+      elif not self._ok_at or now - self._ok_at > self.stale_max:
+        # Geen (recente) goede snapshot meer: toon de fout
+        if self._data.get("listeners") is not None or not self._version:
+          self._version += 1
+        self._data = data
+      changed = self._version != version
+      if changed:
+        version = self._version
+        self._changed.notify_all()
+    self._ready.set()
+    if changed:
+      for fn in self._change_hooks:
+        try:
+          fn(version)
+        except Exception as e:
+          log.warning('icecast poller change hook %s: %s', getattr(fn, '__name__', fn), e)
+
+  def request_refresh(self):
+    """Vraag een vervroegde refresh aan (bijv. na moveclients)."""
+    self._ensure_started()
+    self._wake.set()
+
+  def snapshot(self, wait: float = 2.5) -> dict:
+    """Laatste status + leeftijd. Wacht alleen bij een koude start (max `wait` s)."""
+    self._ensure_started()
+    if not self._ready.is_set():
+      self._ready.wait(wait)
+    now = time.time()
+    with self._lock:
+      data = dict(self._data)
+      ok_at = self._ok_at
+      checked_at = self._checked_at
+      version = self._version
+    data["fetched_at"] = ok_at or None
+    data["age"] = round(now - ok_at, 1) if ok_at else None
+    data["stale"] = bool(ok_at) and (checked_at > ok_at or now - ok_at > 2 * self.interval)
+    data["version"] = version
+    return data
+
+  def wait_for_change(self, version: int, timeout: float) -> dict:
+    """Blokkeer tot de snapshot-versie afwijkt van `version` (of timeout); geeft snapshot()."""
+    self._ensure_started()
+    with self._changed:
+      self._changed.wait_for(lambda: self._version != version, timeout)
+    return self.snapshot(wait=0)
+
+ice_poller = IcecastPoller(ICECAST_STATUS_URL, ICECAST_POLL_INTERVAL_SEC, ICECAST_STALE_MAX_SEC)
+
+def _service_ports() -> list[tuple[int, str, int]]:
+  db = get_session()
+  try:
+    return [tuple(r) for r in db.execute(select(Service.id, Service.name, Service.port).order_by(Service.id))]
+  finally:
+    db.close()
+
+ice_instances = MultiStatusCollector(ice_http, _service_ports, ICECAST_INSTANCE_URL, ICE_MULTI_TIMEOUT_SEC,
+                                     ICE_MULTI_WORKERS, ICE_MULTI_TTL_SEC)
+
+def _reload_instance(svc_id: int, port: int) -> tuple[str, int]:
+  return run_wrapper(ICECAST_INSTANCE_RELOAD.format(id=svc_id, port=port))
+
+icecast_conf = IcecastConfig(ICECAST_CONF_DIR, _reload_instance, {
+  'basedir': ICECAST_BASEDIR,
+  'log_dir': ICECAST_LOG_DIR,
+  'webroot': os.path.join(ICECAST_BASEDIR, 'web'),
+  'adminroot': os.path.join(ICECAST_BASEDIR, 'admin'),
+})
+listener_history = ListenerHistoryStore(
+  {10: HISTORY_RAW_RETENTION_SEC, 60: HISTORY_MIN_RETENTION_SEC, 3600: HISTORY_HOUR_RETENTION_SEC},
+  flush_interval=HISTORY_FLUSH_SEC,
+)
+_hist_flag = {'at': 0.0, 'on': False}
+
+def _history_enabled() -> bool:
+  """LISTENER_HISTORY=1/0 forceert; 'auto' volgt de hist-vlag van de services (60 s gecachet)."""
+  mode = (LISTENER_HISTORY or 'auto').strip().lower()
+  if mode != 'auto':
+    return mode in ('1','true','yes','on')
+  now = time.time()
+  if now - _hist_flag['at'] >= 60:
+    _hist_flag['at'] = now
+    try:
+      db = get_session()
+      try:
+        _hist_flag['on'] = db.query(ServiceFeatures.id).filter(ServiceFeatures.hist.is_(True)).first() is not None
+      finally:
+        db.close()
+    except Exception:
+      _hist_flag['on'] = False
+  return _hist_flag['on']
+
+@ice_poller.on_update
+def _record_listener_history(ts: float, data: dict):
+  if not _history_enabled():
+    return
+  counts = {}
+  for m in data.get('mounts') or []:
+    if m.get('mount'):
+      counts[m['mount']] = counts.get(m['mount'], 0) + int(m.get('listeners') or 0)
+  listener_history.record(ts, counts)
+
+chunked_uploads = ChunkedUploads(UPLOAD_TMP_DIR, UPLOAD_MAX_BYTES, ttl=UPLOAD_TTL_HOURS * 3600)
+duplicate_finder = DuplicateFinder(MOUNT_DIR, workers=LIBRARY_WORKERS)
+library_index = LibraryIndexer(MOUNT_DIR, lambda: list_dirs(), interval=LIBRARY_SCAN_SEC, workers=LIBRARY_WORKERS,
+                               after_scan=duplicate_finder.run if DUPLICATE_SCAN else None)
+media_index = MediaIndex(MOUNT_DIR, rescan_interval=MEDIA_RESCAN_SEC, use_inotify=MEDIA_INOTIFY)
 
 @app.route("/")
 def index():
+  if LIBRARY_INDEX:
+    library_index.start()
   ice_unit = os.environ.get("ICECAST_UNIT","icecast-kh")
   lsq_unit = os.environ.get("LIQUIDSOAP_UNIT","liquidsoap")
-  svc_ice = systemd_is_active(ice_unit)
-  svc_lsq = systemd_is_active(lsq_unit)
-  ice      = fetch_icecast(ICECAST_STATUS_URL)
+  units = systemd_status.get()
+  svc_ice = units.get(ice_unit, {}).get('ActiveState', 'unknown')
+  svc_lsq = units.get(lsq_unit, {}).get('ActiveState', 'unknown')
+  ice      = ice_poller.snapshot()
   # Flash messages pakken en mappen naar {text, ok}
   raw = get_flashed_messages(with_categories=True)
   msgs = []
   for cat, text in raw:
     ok = (cat == "ok")
-    msgs.append({"text": text, "ok": ok})
+    msgs.append({"text": text, "ok": ok, "cls": cat if cat in ("ok", "warn") else "err"})
   # Verrijk mounts met mapping + bestandlijst
   view_mounts = []
   if isinstance(ice.get('mounts'), list):
@@ -819,9 +1363,8 @@ def index():
       mnt = it.get('mount')
       d = derive_dir_from_mount(mnt or '') if mnt else None
       if d:
-        all_files = list_mp3(d)
-        files = all_files[:20]
-        files_total = len(all_files)
+        files = head_mp3(d, 20)
+        files_total = count_mp3(d)
       else:
         files, files_total = [], 0
       view_mounts.append({
@@ -831,28 +1374,33 @@ def index():
         'files': files,
         'files_total': files_total,
       })
+  # Per-mount acties/bestanden als gecachet fragment (hangt niet af van luisteraantallen)
+  pref = _prefix()
+  admin_base = (ICE_ADMIN_BASE or os.environ.get('ICE_URL_PUBLIC','') or os.environ.get('ICE_URL_PRIVATE',''))
+  admin_user = os.environ.get('ICE_ADMIN_USER','')
+  mount_names = tuple(m['mount'] for m in view_mounts if m.get('mount'))
+  for vm in view_mounts:
+    key = (vm['mount'], vm['dir'], tuple(vm['files']), vm['files_total'], mount_names, ADMIN_TOKEN, pref, admin_base, admin_user)
+    vm['card'] = render_fragment('mount_card', key,
+      m=vm, mount_names=mount_names, csrf=ADMIN_TOKEN, pref=pref, admin_base=admin_base, admin_user=admin_user)
   # Directory-overzicht (los van mounts)
   sel_dir = (request.args.get('dir','') or '').strip()
   if sel_dir and not os.path.isdir(os.path.join(MOUNT_DIR, sel_dir)):
     sel_dir = ''
-  sel_files = list_mp3(sel_dir) if sel_dir else []
-  # Paginering voor directory-weergave
-  try:
-    page = int(request.args.get('page','1') or '1')
-  except ValueError:
-    page = 1
+  # Cursor-paginering voor directory-weergave (after/before = naam op de paginagrens)
   try:
     per = int(request.args.get('per','100') or '100')
   except ValueError:
     per = 100
-  if page < 1: page = 1
   if per < 1: per = 1
   if per > 500: per = 500
-  sel_total = len(sel_files)
-  pages = (sel_total + per - 1) // per if per else 1
-  start = (page - 1) * per
-  end = start + per
-  sel_files = sel_files[start:end]
+  after = request.args.get('after','') or ''
+  before = request.args.get('before','') or ''
+  if sel_dir:
+    sel_files, has_prev, has_next = page_mp3(sel_dir, per, after, before)
+    sel_total = count_mp3(sel_dir)
+  else:
+    sel_files, has_prev, has_next, sel_total = [], False, False, 0
 
   # Liquidsoap snippet helpers
   try:
@@ -887,17 +1435,17 @@ def index():
     '# output.icecast(%mp3, host="127.0.0.1", port=8001, password="<password>", mount="/stream.mp3", radio)\n'
   )
 
-  return render_template_string(
-    HTML,
+  return render_page(
+    'index',
     title=APP_TITLE,
-    svc_ice=svc_ice, svc_lsq=svc_lsq,
+    svc_ice=svc_ice, svc_lsq=svc_lsq, units=units,
     ice=ice, ice_url=ICECAST_STATUS_URL, icecast_name=ICECAST_NAME,
     ice_unit=ice_unit, lsq_unit=lsq_unit,
     csrf=ADMIN_TOKEN,
     messages=msgs,
     public_base=ICE_URL_PUBLIC,
-    admin_base=(ICE_ADMIN_BASE or os.environ.get('ICE_URL_PUBLIC','') or os.environ.get('ICE_URL_PRIVATE','')),
-    admin_user=os.environ.get('ICE_ADMIN_USER',''),
+    admin_base=admin_base,
+    admin_user=admin_user,
     mount_dir=MOUNT_DIR,
     music_dir=MUSIC_DIR,
     mounts=view_mounts,
@@ -912,19 +1460,22 @@ def index():
     lsq_time_snippet=lsq_time_snippet,
     selected_dir=sel_dir,
     selected_files=sel_files,
-    page=page,
-    pages=pages,
+    has_prev=has_prev,
+    has_next=has_next,
     per=per,
     total_files=sel_total,
     is_dry_run=_is_dry_run(),
-    pref=_prefix(),
+    pref=pref,
     login_enabled=_login_enabled(),
     logged_in=bool(session.get('logged_in')),
     login_user=session.get('user',''),
     db_ok=_db_is_ok(),
-    mounts_names=[m.get('mount') for m in view_mounts if m.get('mount')],
+    mounts_names=list(mount_names),
+    http_pool=ice_http.stats(),
+    dupes=_dupes_summary(),
     admin_conf={
-      'bases': [b for b in [(ICE_ADMIN_BASE or ''), os.environ.get('ICE_URL_PUBLIC',''), os.environ.get('ICE_URL_PRIVATE','')] if (b or '')],
+      'bases': admin_bases(),
+      'health': base_health.snapshot(admin_bases()),
       'user': os.environ.get('ICE_ADMIN_USER',''),
       'pass_set': bool(os.environ.get('ICE_ADMIN_PASS') or os.environ.get('ICE_ADMIN_PASS_FILE')),
       'pass_source': ('env' if os.environ.get('ICE_ADMIN_PASS') else ('file' if os.environ.get('ICE_ADMIN_PASS_FILE') else '')),
@@ -932,6 +1483,27 @@ def index():
     },
   )
 
+settings_cache = SettingsCache(SessionLocal, SETTINGS_CACHE_SEC)
+
+# Schema wordt beheerd met Alembic (`alembic upgrade head`); hier alleen eenmalig controleren, nooit DDL
+_schema = {'result': None}
+
+def schema_status(refresh: bool = False) -> dict:
+  """Gecachete uitkomst van check_schema(); refresh=True controleert opnieuw."""
+  res = _schema['result']
+  if res is None or refresh:
+    res = _schema['result'] = check_schema()
+    if res['error']:
+      log.error('DB schema check failed: %s', res['error'])
+    elif not res['ok']:
+      log.error('DB schema out of date: database at %s, alembic head %s (pending: %s); run `alembic upgrade head`',
+                ', '.join(res['current']) or '(leeg)', ', '.join(res['heads']), ', '.join(res['pending']) or '?')
+    else:
+      log.info('DB schema at alembic head %s', ', '.join(res['heads']))
+  return res
+
+schema_status()
+
 @app.route('/settings', methods=['GET','POST'])
 def settings():
   tabs = [
@@ -945,148 +1517,99 @@ def settings():
   active = (request.args.get('tab','') or 'algemeen').lower()
   if active not in dict(tabs):
     active = 'algemeen'
-  # Ensure tables exist (idempotent)
-  try:
-    Base.metadata.create_all(bind=engine)
-  except Exception:
-    pass
-
   # Determine selected service id from session or default 1
   try:
     svc_id = int(session.get('service_id', 1))
   except Exception:
     svc_id = 1
-  # Load or init the service row
+  # Load or init the service row (GET: uit de cache, anders één query met alle instellingen)
   settings_data = {}
   try:
-    db = get_session()
-    svc = db.get(Service, svc_id)
-    if not svc:
-      # If DB empty, create default service
-      existing = db.query(Service).count()
-      if existing == 0:
-        svc = Service(id=1, name='Default')
-        svc_id = 1
-      else:
-        # fallback to first service
-        svc = db.query(Service).first()
-        svc_id = svc.id
-      session['service_id'] = svc_id
-      svc.limits = ServiceLimits()
-      svc.features = ServiceFeatures()
-      svc.icecast = ServiceIcecast()
-      svc.autodj = ServiceAutoDJ()
-      svc.relay = ServiceRelay()
-      db.add(svc)
-      db.commit()
-      db.refresh(svc)
-    if request.method == 'POST':
-      _require_csrf()
-      # Map form fields to models per tab
-      if active == 'algemeen':
-        svc.name = request.form.get('service_name', svc.name)
-        svc.svc_type = request.form.get('svc_type', svc.svc_type)
-        svc.owner = request.form.get('owner', svc.owner)
-        svc.uid = request.form.get('uid', svc.uid)
-        try:
-          svc.port = int(request.form.get('port', svc.port) or svc.port)
-        except ValueError:
-          pass
-        svc.admin_pass = request.form.get('admin_pass', svc.admin_pass)
-        svc.source_pass = request.form.get('source_pass', svc.source_pass)
-        svc.relay_pass = request.form.get('relay_pass', svc.relay_pass)
-        # Optional: apply Icecast settings by reloading admin endpoint
-        if request.form.get('apply_icecast') == '1':
-          msg, code = run_wrapper('icecast:reload')
-          if code == 200:
-            flash('✅ Icecast reload uitgevoerd', 'ok')
+    if request.method == 'GET':
+      settings_data = settings_cache.get(svc_id) or {}
+    if not settings_data:
+      stamp = settings_cache.stamp()
+      db = get_session()
+      try:
+        svc = load_service(db, svc_id)
+        if not svc:
+          # If DB empty, create default service
+          first = db.scalar(select(Service.id).order_by(Service.id).limit(1))
+          if first is None:
+            svc = Service(id=1, name='Default')
+            svc_id = 1
           else:
-            flash(f'❌ Icecast reload mislukt: {msg}', 'err')
-      elif active == 'limieten':
-        for key in ('mounts','autodj','bitrate','listeners','bandwidth','storage'):
-          try:
-            setattr(svc.limits, key, int(request.form.get(key, getattr(svc.limits, key))))
-          except ValueError:
-            pass
-      elif active == 'functies':
-        for key in ('hist','proxy','geoip','auth','multi','public','social','record'):
-          setattr(svc.features, key, bool(request.form.get(key)))
-      elif active == 'icecast':
-        svc.icecast.public_server = request.form.get('public_server', svc.icecast.public_server)
-        svc.icecast.intro_path = request.form.get('intro', svc.icecast.intro_path)
-        svc.icecast.yp_url = request.form.get('yp', svc.icecast.yp_url)
-        svc.icecast.redirect_path = request.form.get('redirect', svc.icecast.redirect_path)
-      elif active == 'autodj':
-        svc.autodj.autodj_type = request.form.get('autodj_type', svc.autodj.autodj_type)
-        for key in ('fade_in','fade_out','fade_min'):
-          try:
-            setattr(svc.autodj, key, int(request.form.get(key, getattr(svc.autodj, key))))
-          except ValueError:
-            pass
-        svc.autodj.smart_fade = bool(request.form.get('smart_fade'))
-        svc.autodj.replay_gain = bool(request.form.get('replay_gain'))
-      elif active == 'relays':
-        svc.relay.relay_type = request.form.get('relay_type', svc.relay.relay_type)
-      db.commit()
-      flash('✅ Instellingen opgeslagen', 'ok')
-      pref = _prefix()
-      db.close()
-      return redirect(f"{pref}/settings?tab={active}")
-    # Build settings dict for template values
-    settings_data = {
-      'name': svc.name,
-      'svc_type': svc.svc_type,
-      'owner': svc.owner,
-      'uid': svc.uid,
-      'port': svc.port,
-      'admin_pass': svc.admin_pass,
-      'source_pass': svc.source_pass,
-      'relay_pass': svc.relay_pass,
-      'limits': {
-        'mounts': svc.limits.mounts,
-        'autodj': svc.limits.autodj,
-        'bitrate': svc.limits.bitrate,
-        'listeners': svc.limits.listeners,
-        'bandwidth': svc.limits.bandwidth,
-        'storage': svc.limits.storage,
-      },
-      'features': {
-        'hist': svc.features.hist,
-        'proxy': svc.features.proxy,
-        'geoip': svc.features.geoip,
-        'auth': svc.features.auth,
-        'multi': svc.features.multi,
-        'public': svc.features.public,
-        'social': svc.features.social,
-        'record': svc.features.record,
-      },
-      'icecast': {
-        'public_server': svc.icecast.public_server,
-        'intro': svc.icecast.intro_path,
-        'yp': svc.icecast.yp_url,
-        'redirect': svc.icecast.redirect_path,
-      },
-      'autodj': {
-        'autodj_type': svc.autodj.autodj_type,
-        'fade_in': svc.autodj.fade_in,
-        'fade_out': svc.autodj.fade_out,
-        'fade_min': svc.autodj.fade_min,
-        'smart_fade': svc.autodj.smart_fade,
-        'replay_gain': svc.autodj.replay_gain,
-      },
-      'relays': {
-        'relay_type': svc.relay.relay_type,
-      }
-    }
-    db.close()
+            # fallback to first service
+            svc = load_service(db, first)
+            svc_id = svc.id
+          session['service_id'] = svc_id
+          svc.limits = svc.limits or ServiceLimits()
+          svc.features = svc.features or ServiceFeatures()
+          svc.icecast = svc.icecast or ServiceIcecast()
+          svc.autodj = svc.autodj or ServiceAutoDJ()
+          svc.relay = svc.relay or ServiceRelay()
+          db.add(svc)
+          db.commit()
+        if request.method == 'POST':
+          _require_csrf()
+          # Map form fields to models per tab
+          if active == 'algemeen':
+            svc.name = request.form.get('service_name', svc.name)
+            svc.svc_type = request.form.get('svc_type', svc.svc_type)
+            svc.owner = request.form.get('owner', svc.owner)
+            svc.uid = request.form.get('uid', svc.uid)
+            try:
+              svc.port = int(request.form.get('port', svc.port) or svc.port)
+            except ValueError:
+              pass
+            svc.admin_pass = request.form.get('admin_pass', svc.admin_pass)
+            svc.source_pass = request.form.get('source_pass', svc.source_pass)
+            svc.relay_pass = request.form.get('relay_pass', svc.relay_pass)
+          elif active == 'limieten':
+            for key in ('mounts','autodj','bitrate','listeners','bandwidth','storage'):
+              try:
+                setattr(svc.limits, key, int(request.form.get(key, getattr(svc.limits, key))))
+              except ValueError:
+                pass
+          elif active == 'functies':
+            for key in ('hist','proxy','geoip','auth','multi','public','social','record'):
+              setattr(svc.features, key, bool(request.form.get(key)))
+          elif active == 'icecast':
+            svc.icecast.public_server = request.form.get('public_server', svc.icecast.public_server)
+            svc.icecast.intro_path = request.form.get('intro', svc.icecast.intro_path)
+            svc.icecast.yp_url = request.form.get('yp', svc.icecast.yp_url)
+            svc.icecast.redirect_path = request.form.get('redirect', svc.icecast.redirect_path)
+          elif active == 'autodj':
+            svc.autodj.autodj_type = request.form.get('autodj_type', svc.autodj.autodj_type)
+            for key in ('fade_in','fade_out','fade_min'):
+              try:
+                setattr(svc.autodj, key, int(request.form.get(key, getattr(svc.autodj, key))))
+              except ValueError:
+                pass
+            svc.autodj.smart_fade = bool(request.form.get('smart_fade'))
+            svc.autodj.replay_gain = bool(request.form.get('replay_gain'))
+          elif active == 'relays':
+            svc.relay.relay_type = request.form.get('relay_type', svc.relay.relay_type)
+          db.commit()
+          flash('✅ Instellingen opgeslagen', 'ok')
+          # Optioneel: config van deze service uitrollen; herladen alleen als de XML echt verandert
+          if request.form.get('apply_icecast') == '1':
+            _flash_icecast_apply(icecast_conf.apply(db, [svc.id], dry_run=_is_dry_run()))
+          pref = _prefix()
+          return redirect(f"{pref}/settings?tab={active}")
+        # Build settings dict for template values
+        settings_data = settings_dict(svc)
+        settings_cache.put(settings_data, stamp)
+      finally:
+        db.close()
   except SQLAlchemyError as e:
     flash(f"❌ DB fout: {e}", 'err')
   raw = get_flashed_messages(with_categories=True)
   msgs = []
   for cat, text in raw:
     msgs.append({'text': text, 'ok': (cat=='ok')})
-  return render_template_string(
-    SETTINGS_HTML,
+  return render_page(
+    'settings',
     title=APP_TITLE,
     service_name=(ICECAST_NAME + (f" – {settings_data.get('name','')}" if settings_data.get('name') else "")),
     tabs=tabs,
@@ -1103,23 +1626,55 @@ SERVICES_HTML = """
 table{border-collapse:collapse;width:100%;margin-top:8px} th,td{padding:8px;border-bottom:1px solid #e5e7eb;text-align:left}
 input,button{padding:10px;border:1px solid #e5e7eb;border-radius:10px}
 .muted{color:#6b7280;font-size:12px}
+.alert{padding:6px 10px;border-radius:8px;margin:4px 0} .alert.ok{background:#ecfdf5;color:#065f46} .alert.err{background:#fef2f2;color:#991b1b}
 </style>
 <div class="card">
   <h2>Services</h2>
+  {% for cat, m in get_flashed_messages(with_categories=true) %}<div class="alert {{cat}}">{{m}}</div>{% endfor %}
   <form method="post" action="{{pref}}/services/create" style="display:flex;gap:8px;align-items:center;flex-wrap:wrap">
     <input type="hidden" name="csrf" value="{{csrf}}">
     <label>Naam <input name="name" placeholder="Naam" required></label>
     <label>Type <input name="svc_type" value="Icecast 2 KH"></label>
     <button>Aanmaken</button>
   </form>
+  <form method="post" action="{{pref}}/services/import" enctype="multipart/form-data" style="display:flex;gap:8px;align-items:center;flex-wrap:wrap;margin-top:8px">
+    <input type="hidden" name="csrf" value="{{csrf}}">
+    <label>Importeren (JSON/CSV) <input type="file" name="file" accept=".json,.csv,application/json,text/csv" required></label>
+    <label><input type="checkbox" name="dry_run" value="1" checked> alleen proefdraaien (diff)</label>
+    <button>Importeren</button>
+    <span class="muted">Exporteren: <a href="{{pref}}/services/export?format=json">JSON</a> · <a href="{{pref}}/services/export?format=csv">CSV</a></span>
+  </form>
+  <form method="post" action="{{pref}}/icecast/apply" style="display:flex;gap:8px;align-items:center;flex-wrap:wrap;margin-top:8px">
+    <input type="hidden" name="csrf" value="{{csrf}}">
+    <label><input type="checkbox" name="dry_run" value="1"> alleen proefdraaien</label>
+    <button>Icecast configs toepassen</button>
+    <span class="muted">Alleen gewijzigde configs worden geschreven en herladen · <a href="{{pref}}/api/icecast/drift">Drift-rapport</a></span>
+  </form>
+  <form method="get" action="{{pref}}/services" style="display:flex;gap:8px;align-items:center;flex-wrap:wrap;margin-top:12px">
+    <label>Zoek <input name="q" value="{{filters.q}}" placeholder="naam, eigenaar, uid of id"></label>
+    <label>Eigenaar <input name="owner" value="{{filters.owner}}"></label>
+    <label>Type <select name="type">
+      <option value="">(alle)</option>
+      {% for t in types %}<option {% if filters.type==t %}selected{% endif %}>{{t}}</option>{% endfor %}
+    </select></label>
+    <label>Sorteer <select name="sort">
+      {% for k, v in sorts %}<option value="{{k}}" {% if filters.sort==k %}selected{% endif %}>{{v}}</option>{% endfor %}
+    </select></label>
+    <input type="hidden" name="per" value="{{per}}">
+    <button>Zoeken</button>
+    <a class="muted" href="{{pref}}/services?{{qs_json}}">JSON</a>
+  </form>
   <table>
-    <thead><tr><th>ID</th><th>Naam</th><th>Type</th><th>Acties</th></tr></thead>
+    <thead><tr><th>ID</th><th>Naam</th><th>Type</th><th>Eigenaar</th><th>UID</th><th>Poort</th><th>Acties</th></tr></thead>
     <tbody>
       {% for s in services %}
         <tr>
           <td>{{s.id}}</td>
           <td>{{s.name}}</td>
           <td>{{s.svc_type}}</td>
+          <td>{{s.owner}}</td>
+          <td>{{s.uid}}</td>
+          <td>{{s.port}}</td>
           <td>
             <a href="{{pref}}/services/select?id={{s.id}}">selecteer</a>
             {% if s.id != current_id %}
@@ -1129,31 +1684,250 @@ input,button{padding:10px;border:1px solid #e5e7eb;border-radius:10px}
             {% endif %}
           </td>
         </tr>
+      {% else %}
+        <tr><td colspan="7" class="muted">Geen services gevonden</td></tr>
       {% endfor %}
     </tbody>
   </table>
+  {% if has_prev or has_next %}
+    <div style="margin-top:8px">
+      {% if has_prev %}<a href="{{pref}}/services?{{qs_first}}">« Eerste</a> | <a href="{{pref}}/services?{{qs_prev}}">← Vorige</a>{% else %}<span class="muted">← Vorige</span>{% endif %}
+      |
+      {% if has_next %}<a href="{{pref}}/services?{{qs_next}}">Volgende →</a>{% else %}<span class="muted">Volgende →</span>{% endif %}
+    </div>
+  {% endif %}
   <p class="muted" style="margin-top:8px">Actieve service wordt gebruikt in Instellen.</p>
   <p><a href="{{pref}}/settings">→ Naar Instellen</a></p>
 </div>
 """
+TEMPLATES['services'] = app.jinja_env.from_string(SERVICES_HTML)
+
+SERVICE_SORTS = (('id', 'ID'), ('name', 'Naam'), ('owner', 'Eigenaar'))
+_SERVICE_SORT_COLS = {'id': (Service.id,), 'name': (Service.name, Service.id), 'owner': (Service.owner, Service.id)}
+
+def _like_prefix(q: str) -> str:
+  return q.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def services_page(db, q: str = '', owner: str = '', svc_type: str = '', sort: str = 'id', per: int = 50,
+                  after: int = 0, before: int = 0) -> tuple[list[dict], bool, bool]:
+  """Keyset-pagina services (rijen, has_prev, has_next) na `after` of vóór `before` (id's).
+
+  Zoeken is een prefix-match op naam/eigenaar/uid (of exact id), filteren op
+  eigenaar en type is exact; zo blijven alle varianten binnen een index.
+  """
+  cols = _SERVICE_SORT_COLS.get(sort) or _SERVICE_SORT_COLS['id']
+  stmt = select(Service.id, Service.name, Service.svc_type, Service.owner, Service.uid, Service.port)
+  if q:
+    like = _like_prefix(q)
+    conds = [Service.name.like(like, escape='\\'), Service.owner.like(like, escape='\\'), Service.uid.like(like, escape='\\')]
+    if q.isdigit():
+      conds.append(Service.id == int(q))
+    stmt = stmt.where(or_(*conds))
+  if owner:
+    stmt = stmt.where(Service.owner == owner)
+  if svc_type:
+    stmt = stmt.where(Service.svc_type == svc_type)
+  cursor = after or before
+  ref = db.execute(select(*cols).where(Service.id == cursor)).first() if cursor else None
+  if ref is not None:
+    key = tuple_(*cols) if len(cols) > 1 else cols[0]
+    val = tuple_(*ref) if len(cols) > 1 else ref[0]
+    stmt = stmt.where(key > val if after else key < val)
+  backwards = ref is not None and not after
+  stmt = stmt.order_by(*[c.desc() if backwards else c.asc() for c in cols]).limit(per + 1)
+  rows = db.execute(stmt).all()
+  more = len(rows) > per
+  rows = rows[:per]
+  if backwards:
+    rows.reverse()
+    has_prev, has_next = more, True
+  else:
+    has_prev, has_next = ref is not None, more
+  items = [{'id': r.id, 'name': r.name or f'Service {r.id}', 'svc_type': r.svc_type, 'owner': r.owner, 'uid': r.uid,
+            'port': r.port} for r in rows]
+  return items, has_prev, has_next
 
 @app.get('/services')
 def services_list():
+  """Services met zoeken (q), filters (owner, type), sortering en keyset-paginering (after/before, per); ?format=json."""
+  a = request.args
+  filters = {
+    'q': (a.get('q','') or '').strip(),
+    'owner': (a.get('owner','') or '').strip(),
+    'type': (a.get('type','') or '').strip(),
+    'sort': a.get('sort','') if a.get('sort','') in _SERVICE_SORT_COLS else 'id',
+  }
+  try:
+    per = max(1, min(500, int(a.get('per','50') or '50')))
+  except ValueError:
+    per = 50
+  try:
+    after, before = int(a.get('after','0') or '0'), int(a.get('before','0') or '0')
+  except ValueError:
+    after = before = 0
   db = get_session()
   try:
-    rows = db.query(Service).order_by(Service.id.asc()).all()
+    items, has_prev, has_next = services_page(db, filters['q'], filters['owner'], filters['type'], filters['sort'],
+                                              per, after, before)
+    types = [] if _wants_json() else list(db.scalars(select(Service.svc_type).distinct().order_by(Service.svc_type)))
   finally:
     db.close()
-  cur = session.get('service_id', 1)
-  return render_template_string(
-    SERVICES_HTML,
+  base = {k: v for k, v in filters.items() if v and not (k == 'sort' and v == 'id')}
+  if per != 50:
+    base['per'] = per
+  if _wants_json():
+    return Response(json.dumps({
+      'items': items, 'per': per, 'filters': filters,
+      'prev': items[0]['id'] if has_prev and items else None,
+      'next': items[-1]['id'] if has_next and items else None,
+    }, ensure_ascii=False), mimetype='application/json')
+  return render_page(
+    'services',
     title=APP_TITLE,
-    services=[{'id': r.id, 'name': r.name or f'Service {r.id}', 'svc_type': r.svc_type} for r in rows],
-    current_id=cur,
+    services=items,
+    current_id=session.get('service_id', 1),
     csrf=ADMIN_TOKEN,
     pref=_prefix(),
+    filters=filters,
+    types=types,
+    sorts=SERVICE_SORTS,
+    per=per,
+    has_prev=has_prev,
+    has_next=has_next,
+    qs_first=urlencode(base),
+    qs_prev=urlencode(dict(base, before=items[0]['id'])) if items else '',
+    qs_next=urlencode(dict(base, after=items[-1]['id'])) if items else '',
+    qs_json=urlencode(dict(base, format='json', **({'after': after} if after else {}), **({'before': before} if before else {}))),
   )
 
+@app.get('/services/export')
+def services_export():
+  """Alle services met instellingen als JSON of CSV (?format=csv), gestreamd; wachtwoorden alleen met ?secrets=1."""
+  fmt = 'csv' if request.args.get('format') == 'csv' else 'json'
+  secrets = request.args.get('secrets') == '1'
+
+  def gen():
+    db = get_session()
+    try:
+      yield from (svcio.stream_csv(db, secrets) if fmt == 'csv' else svcio.stream_json(db, secrets))
+    finally:
+      db.close()
+  return Response(stream_with_context(gen()), mimetype='text/csv' if fmt == 'csv' else 'application/json',
+                  headers={'Content-Disposition': f'attachment; filename=services.{fmt}', 'Cache-Control': 'no-store'})
+
+@app.post('/services/import')
+def services_import():
+  """Services aanmaken/bijwerken uit JSON of CSV (bestand of body) in één transactie; dry_run=1 geeft alleen de diff."""
+  _require_csrf()
+  f = request.files.get('file')
+  data = f.read(SERVICES_IMPORT_MAX_BYTES + 1) if f else request.get_data(cache=False)
+  dry = (request.form.get('dry_run') or request.args.get('dry_run') or '') in ('1','true','on') or _is_dry_run()
+  wants_json = _wants_json() or not f
+  fmt = (request.form.get('format') or request.args.get('format') or '').strip().lower()
+  fmt = fmt if fmt in ('json', 'csv') else ''
+  if not fmt and f and f.filename:
+    fmt = 'csv' if f.filename.lower().endswith('.csv') else ('json' if f.filename.lower().endswith('.json') else '')
+  err, plan, result = '', None, None
+  if len(data) > SERVICES_IMPORT_MAX_BYTES:
+    err = f'Bestand te groot (max {SERVICES_IMPORT_MAX_BYTES // (1024 * 1024)} MB)'
+  else:
+    try:
+      records = svcio.read_records(data, fmt)
+      db = get_session()
+      try:
+        plan = svcio.plan_import(db, records)
+        if plan['ok'] and not dry:
+          result = svcio.apply_import(db, plan)
+      finally:
+        db.close()
+    except svcio.ImportFormatError as e:
+      err = str(e)
+    except SQLAlchemyError as e:
+      err = f'DB fout: {e}'
+  if result:
+    # Core-inserts lopen buiten de session-events om
+    settings_cache.invalidate(result['created'] + result['updated'])
+  if wants_json:
+    if err:
+      return Response(json.dumps({'ok': False, 'error': err}, ensure_ascii=False), status=400, mimetype='application/json')
+    out = dict(svcio.public_plan(plan), dry_run=dry or not plan['ok'], applied=result is not None)
+    return Response(json.dumps(out, ensure_ascii=False, default=str), status=200 if plan['ok'] else 422,
+                    mimetype='application/json')
+  if err:
+    flash(f'❌ Import mislukt: {err}', 'err')
+  else:
+    sm = plan['summary']
+    counts = f"{sm['create']} nieuw, {sm['update']} gewijzigd, {sm['unchanged']} ongewijzigd"
+    if not plan['ok']:
+      flash(f"❌ Import afgekeurd: {sm['error']} rij(en) met fouten ({counts}); er is niets gewijzigd", 'err')
+      for r in [r for r in plan['rows'] if r['errors']][:10]:
+        flash(f"❌ Rij {r['row']}: {'; '.join(r['errors'])}", 'err')
+    elif dry:
+      flash(f"✅ [DRY-RUN] Import zou geven: {counts}", 'ok')
+      for r in [r for r in plan['rows'] if r['action'] in ('create', 'update')][:10]:
+        flash(f"• Rij {r['row']} {r['action']} {r['name'] or r['uid'] or r['id']}: {', '.join(sorted(r['changes']))}", 'ok')
+    else:
+      flash(f"✅ Import uitgevoerd: {counts}", 'ok')
+  return redirect(_prefix() + '/services')
+
+def _flash_icecast_apply(results: list[dict]):
+  changed = [r for r in results if r['changed']]
+  prefix = '[DRY-RUN] ' if _is_dry_run() else ''
+  if not changed:
+    flash(f"✅ {prefix}Icecast config ongewijzigd ({len(results)} service(s)); niets herladen", 'ok')
+    return
+  for r in changed:
+    name = r['name'] or f"service {r['id']}"
+    if r['error']:
+      flash(f"❌ Icecast config {name}: {r['error']}", 'err')
+    elif r['reloaded'] is None:
+      flash(f"✅ {prefix}Icecast config {name} zou worden bijgewerkt", 'ok')
+    elif r['written']:
+      flash(f"✅ Icecast config {name} bijgewerkt en herladen", 'ok')
+    else:
+      flash(f"✅ Icecast config {name} stond al klaar; alsnog herladen", 'ok')
+  if len(results) > len(changed):
+    flash(f"✅ {len(results) - len(changed)} service(s) ongewijzigd; niet herladen", 'ok')
+
+@app.post('/icecast/apply')
+def icecast_apply():
+  """icecast.xml voor alle (of ?id=) services renderen; alleen gewijzigde bestanden schrijven en die instanties herladen."""
+  _require_csrf()
+  ids = [int(i) for i in request.form.getlist('id') + request.args.getlist('id') if i.isdigit()] or None
+  dry = (request.form.get('dry_run') or request.args.get('dry_run') or '') in ('1','true','on') or _is_dry_run()
+  db = get_session()
+  try:
+    results = icecast_conf.apply(db, ids, dry_run=dry)
+  except SQLAlchemyError as e:
+    if _wants_json():
+      return Response(json.dumps({'ok': False, 'error': f'DB fout: {e}'}, ensure_ascii=False), status=500, mimetype='application/json')
+    flash(f'❌ DB fout: {e}', 'err')
+    return redirect(_prefix() + '/services')
+  finally:
+    db.close()
+  if _wants_json():
+    ok = not any(r['error'] for r in results)
+    out = {'ok': ok, 'dry_run': dry, 'changed': sum(1 for r in results if r['changed']),
+           'reloaded': sum(1 for r in results if r['reloaded']), 'services': results}
+    return Response(json.dumps(out, ensure_ascii=False), status=200 if ok else 502, mimetype='application/json')
+  _flash_icecast_apply(results)
+  return redirect(_prefix() + '/services')
+
+@app.get('/api/icecast/drift')
+def api_icecast_drift():
+  """Verschil tussen DB en uitgerolde icecast.xml per service; ?diff=<id> voegt een unified diff toe (zonder wachtwoorden)."""
+  diff_for = request.args.get('diff', '')
+  db = get_session()
+  try:
+    report = icecast_conf.drift(db, int(diff_for) if diff_for.isdigit() else None)
+  except SQLAlchemyError as e:
+    return Response(json.dumps({'ok': False, 'error': f'DB fout: {e}'}, ensure_ascii=False), status=500, mimetype='application/json')
+  finally:
+    db.close()
+  c = report['counts']
+  report['ok'] = not (c['drift'] or c['missing'] or c['not_applied'] or c['orphans'])
+  return Response(json.dumps(report, ensure_ascii=False), mimetype='application/json', headers={'Cache-Control': 'no-store'})
+
 @app.post('/services/create')
 def services_create():
   _require_csrf()
@@ -1217,28 +1991,74 @@ def services_delete():
     db.close()
   return redirect(_prefix() + '/services')
 
+INSTANCES_HTML = """
+<!doctype html><meta charset="utf-8"><title>Instanties – {{title}}</title>
+<style>body{font-family:system-ui;margin:24px;color:#1f2937} .card{border:1px solid #e5e7eb;border-radius:12px;padding:16px;max-width:1100px}
+table{border-collapse:collapse;width:100%;margin-top:8px} th,td{padding:6px 8px;border-bottom:1px solid #e5e7eb;text-align:left;vertical-align:top}
+.muted{color:#6b7280;font-size:12px} .ok{color:#047857} .err{color:#b91c1c}
+</style>
+<div class="card">
+  <h2>Icecast-instanties</h2>
+  <div><strong>Totaal:</strong> {{agg.totals.listeners}} luisteraars · {{agg.totals.up}}/{{agg.totals.instances}} instanties bereikbaar · {{agg.totals.mounts}} mounts
+    <span class="muted">(opgehaald in {{agg.seconds}} s · <a href="{{pref}}/instances?refresh=1">vernieuwen</a> · <a href="{{pref}}/api/instances">JSON</a>)</span></div>
+  <h3>Per service</h3>
+  <table>
+    <thead><tr><th>ID</th><th>Naam</th><th>Poort</th><th>Status</th><th>Luisteraars</th><th>Mounts</th></tr></thead>
+    <tbody>
+      {% for i in agg.instances %}
+        <tr>
+          <td>{{i.id}}</td><td>{{i.name}}</td><td>{{i.port}}</td>
+          <td>{% if i.ok %}<span class="ok">OK</span> <span class="muted">{{ '%.0f'|format(i.elapsed * 1000) }} ms</span>{% else %}<span class="err">{{i.error}}</span>{% endif %}</td>
+          <td>{{ i.listeners if i.ok else '–' }}</td>
+          <td>{% for m in i.mounts %}<code>{{m.mount}}</code> {{m.listeners}}{% if not loop.last %}, {% endif %}{% endfor %}</td>
+        </tr>
+      {% else %}
+        <tr><td colspan="6" class="muted">Geen services met een poort</td></tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  <h3>Per mount</h3>
+  <table>
+    <thead><tr><th>Mount</th><th>Luisteraars</th><th>Services</th></tr></thead>
+    <tbody>
+      {% for m in agg.mounts %}
+        <tr><td><code>{{m.mount}}</code></td><td>{{m.listeners}}</td>
+          <td>{% for s in m.services %}#{{s.id}} (:{{s.port}}) {{s.listeners}}{% if not loop.last %}, {% endif %}{% endfor %}</td></tr>
+      {% endfor %}
+    </tbody>
+  </table>
+  <p><a href="{{pref}}/services">→ Services</a></p>
+</div>
+"""
+TEMPLATES['instances'] = app.jinja_env.from_string(INSTANCES_HTML)
+
+@app.get('/api/instances')
+def api_instances():
+  """Samengevoegde status van alle Icecast-instanties (per service en per mount); ?refresh=1 negeert de cache."""
+  agg = ice_instances.collect(refresh=request.args.get('refresh') == '1')
+  return Response(json.dumps(agg, ensure_ascii=False), mimetype='application/json')
+
+@app.get('/instances')
+def instances_page():
+  return render_page('instances', title=APP_TITLE, pref=_prefix(),
+                     agg=ice_instances.collect(refresh=request.args.get('refresh') == '1'))
+
 @app.get('/db-status')
 def db_status():
   info = { 'ok': False, 'error': '', 'engine': '', 'db': '', 'driver': '', 'counts': {} }
+  schema = schema_status(refresh=request.args.get('recheck') == '1')
+  health = db_health.snapshot()
+  pool = health['pool']
   try:
     info['engine'] = engine.url.get_backend_name()
     info['driver'] = engine.url.get_driver_name()
     info['db'] = engine.url.database or ''
-    db = get_session()
-    try:
-      info['counts'] = {
-        'services': db.query(Service).count(),
-        'service_limits': db.query(ServiceLimits).count(),
-        'service_features': db.query(ServiceFeatures).count(),
-        'service_icecast': db.query(ServiceIcecast).count(),
-        'service_autodj': db.query(ServiceAutoDJ).count(),
-        'service_relay': db.query(ServiceRelay).count(),
-      }
-      info['ok'] = True
-    finally:
-      db.close()
+    info['counts'] = db_health.counts()
+    info['ok'] = health['ok'] is not False
   except Exception as e:
     info['error'] = str(e)
+  if health['error'] and not info['error']:
+    info['error'] = health['error']
   pref = _prefix() or ''
   html = f"""<!doctype html><meta charset='utf-8'><title>DB Status</title>
   <style>body{{font-family:system-ui;margin:24px;color:#1f2937}} .card{{border:1px solid #e5e7eb;border-radius:12px;padding:16px;max-width:720px}}
@@ -1247,8 +2067,17 @@ def db_status():
   <div class='card'>
     <h2>DB Status</h2>
     <div>Engine: <code>{info['engine']}</code> · Driver: <code>{info['driver']}</code> · DB: <code>{info['db']}</code></div>
-    <div style='margin-top:8px'>Status: {('<span class=ok>OK</span>' if info['ok'] else '<span class=err>ERROR</span>')}</div>
+    <div style='margin-top:8px'>Status: {('<span class=ok>OK</span>' if info['ok'] else '<span class=err>ERROR</span>')}
+      · probe: <code>{health['latency_ms'] if health['latency_ms'] is not None else '-'} ms</code>, {health['age'] if health['age'] is not None else '-'} s geleden
+      ({health['failures']} van {health['probes']} mislukt)</div>
+    <div>Pool: <code>{pool['class']}</code>{''.join(f" · {k}: <code>{pool[k]}</code>" for k in ('size','checkedout','checkedin','overflow','invalidated','pre_ping_failures') if k in pool)}</div>
     {('<ul>'+''.join(f"<li>{k}: <code>{v}</code></li>" for k,v in info['counts'].items())+'</ul>') if info['ok'] else ("<div class='err'>"+info['error']+"</div>")}
+    <div style='margin-top:8px'>Schema: {('<span class=ok>op head</span>' if schema['ok'] else '<span class=err>NIET op head</span>')}
+      · DB: <code>{', '.join(schema['current']) or '(geen)'}</code> · head: <code>{', '.join(schema['heads']) or '?'}</code>
+      {(' · nog uit te voeren: <code>' + ', '.join(schema['pending']) + '</code> (<code>alembic upgrade head</code>)') if schema['pending'] else ''}
+      {("<div class='err'>" + schema['error'] + "</div>") if schema['error'] else ''}
+      <div style='color:#6b7280;font-size:12px'>Gecontroleerd om {time.strftime('%H:%M:%S', time.localtime(schema['checked_at']))} · <a href='{pref}/db-status?recheck=1'>opnieuw controleren</a></div>
+    </div>
     <div style='margin-top:12px'><a href='{pref or '/'}'>← Terug</a></div>
   </div>"""
   return html
@@ -1310,30 +2139,36 @@ def liquidsoap_apply():
     flash(f'❌ Snippet toepassen mislukt: {e}', 'err')
   return redirect(_prefix() + '/' if _prefix() else '/')
 
-@app.get('/logs')
-def logs():
+def _logs_cmd(args) -> list[str]:
+  """journalctl-commando voor /logs?unit=&n= (ook gebruikt door de ASGI-modus)."""
   ice_unit = os.environ.get("ICECAST_UNIT","icecast-kh")
   lsq_unit = os.environ.get("LIQUIDSOAP_UNIT","liquidsoap")
+  # Clamp lines for safety
+  lines = args.get('n','200')
   try:
-    # Clamp lines for safety
-    lines = request.args.get('n','200')
-    try:
-      n = max(10, min(1000, int(lines)))
-    except Exception:
-      n = 200
-    unit = (request.args.get('unit','') or '').strip().lower()
-    if unit in ('icecast','ice','kh'):
-      cmd = ["journalctl","-u", ice_unit, "--no-pager","-n", str(n)]
-    elif unit in ('liquidsoap','lsq','liq'):
-      cmd = ["journalctl","-u", lsq_unit, "--no-pager","-n", str(n)]
-    elif unit in ('ingest-admin','admin','ui'):
-      cmd = ["journalctl","-u", "ingest-admin", "--no-pager","-n", str(n)]
-    else:
-      cmd = ["journalctl","-u", "ingest-admin","-u", ice_unit, "-u", lsq_unit, "--no-pager","-n", str(n)]
-    out = subprocess.check_output(cmd, stderr=subprocess.STDOUT, text=True, timeout=6)
-    txt = out
+    n = max(10, min(1000, int(lines)))
+  except Exception:
+    n = 200
+  unit = (args.get('unit','') or '').strip().lower()
+  if unit in ('icecast','ice','kh'):
+    return ["journalctl","-u", ice_unit, "--no-pager","-n", str(n)]
+  if unit in ('liquidsoap','lsq','liq'):
+    return ["journalctl","-u", lsq_unit, "--no-pager","-n", str(n)]
+  if unit in ('ingest-admin','admin','ui'):
+    return ["journalctl","-u", "ingest-admin", "--no-pager","-n", str(n)]
+  return ["journalctl","-u", "ingest-admin","-u", ice_unit, "-u", lsq_unit, "--no-pager","-n", str(n)]
+
+def _logs_error(e: Exception) -> str:
+  ice_unit = os.environ.get("ICECAST_UNIT","icecast-kh")
+  lsq_unit = os.environ.get("LIQUIDSOAP_UNIT","liquidsoap")
+  return f"Unable to read logs: {e}\nTry on server: journalctl -u {ice_unit} -u {lsq_unit} -u ingest-admin --since '-1h'\n"
+
+@app.get('/logs')
+def logs():
+  try:
+    txt = subprocess.check_output(_logs_cmd(request.args), stderr=subprocess.STDOUT, text=True, timeout=6)
   except Exception as e:
-    txt = f"Unable to read logs: {e}\nTry on server: journalctl -u {ice_unit} -u {lsq_unit} -u ingest-admin --since '-1h'\n"
+    txt = _logs_error(e)
   return Response(txt, mimetype='text/plain')
 
 @app.route("/health")
@@ -1360,14 +2195,20 @@ def action():
   if request.form.get("csrf") != ADMIN_TOKEN:
     abort(403, "Bad CSRF")
   do = request.form.get("do","")
-  if do not in {"icecast:reload","icecast:restart","liquidsoap:reload","liquidsoap:restart","env:reload","admin:test","admin:probe-kill","admin:probe-move"}:
+  if do not in {"icecast:reload","icecast:restart","liquidsoap:reload","liquidsoap:restart","env:reload","mountmap:reload","admin:test","admin:probe-kill","admin:probe-move"}:
     abort(400, "Unsupported action")
   if do == 'env:reload':
     # herlaad env overlays en secret file
     _load_env_defaults()
+    mount_map.reload()
     flash("✅ Env herladen (defaults + .env + secretfile)", "ok")
     pref = _prefix()
     return redirect(f"{pref}/" if pref else "/")
+  if do == 'mountmap:reload':
+    mount_map.reload()
+    flash(f"✅ Mountmap herladen ({mount_map.path})", "ok")
+    pref = _prefix()
+    return redirect(f"{pref}/" if pref else "/")
   if do == 'admin:test':
     res = admin_test_bases()
     if not res:
@@ -1388,17 +2229,14 @@ def action():
     return redirect(f"{pref}/" if pref else "/")
   if do == 'admin:probe-kill':
     # Non-destructive: call /admin/killsource without mount to validate auth (expect 400 on valid auth)
-    bases = []
-    for b in (ICE_ADMIN_BASE or '', os.environ.get('ICE_URL_PUBLIC',''), os.environ.get('ICE_URL_PRIVATE','')):
-      b = (b or '').strip()
-      if b and b not in bases:
-        bases.append(b)
+    bases = admin_bases()
     if not bases:
       flash('❌ Geen admin bases geconfigureerd', 'err')
     else:
       user = os.environ.get('ICE_ADMIN_USER','') or 'USER'
       for base in bases:
-        status, used = _admin_call('/admin/killsource')
+        # Elke base afzonderlijk testen (geen fallback naar de volgende)
+        status, used = _admin_call('/admin/killsource', base=base)
         # In dry-run we return 200; mark as simulated
         if _is_dry_run():
           flash(f"✅ [DRY-RUN] Probe OK op {used or base} (simulatie)", 'ok')
@@ -1415,17 +2253,14 @@ def action():
     return redirect(f"{pref}/" if pref else "/")
   if do == 'admin:probe-move':
     # Non-destructive: call /admin/moveclients without params to validate auth (expect 400/405)
-    bases = []
-    for b in (ICE_ADMIN_BASE or '', os.environ.get('ICE_URL_PUBLIC',''), os.environ.get('ICE_URL_PRIVATE','')):
-      b = (b or '').strip()
-      if b and b not in bases:
-        bases.append(b)
+    bases = admin_bases()
     if not bases:
       flash('❌ Geen admin bases geconfigureerd', 'err')
     else:
       user = os.environ.get('ICE_ADMIN_USER','') or 'USER'
       for base in bases:
-        status, used = _admin_call('/admin/moveclients')
+        # Elke base afzonderlijk testen (geen fallback naar de volgende)
+        status, used = _admin_call('/admin/moveclients', base=base)
         if _is_dry_run():
           flash(f"✅ [DRY-RUN] Probe OK op {used or base} (simulatie)", 'ok')
         else:
@@ -1449,17 +2284,258 @@ def action():
   pref = _prefix()
   return redirect(f"{pref}/" if pref else "/")
 
+# Diagnostiek die per request verandert: alleen op verzoek (?fields=http,history,sse), nooit gecachet
+_STATUS_DIAG = {
+  'http': lambda: ice_http.stats(),
+  'history': lambda: dict(listener_history.stats(), enabled=_history_enabled()),
+  'sse': lambda: dict(_sse_streams),
+  'reload': lambda: reload_coalescer.stats(),
+  'settings': lambda: settings_cache.stats(),
+  'schema': lambda: schema_status(),
+  'db': lambda: db_health.snapshot(),
+  'instances': lambda: ice_instances.stats(),
+  'config': lambda: icecast_conf.stats(),
+  'library': lambda: dict(library_index.stats(), enabled=LIBRARY_INDEX, duplicates=duplicate_finder.stats()),
+}
+_status_lock = threading.Lock()
+_status_cache = {'key': None, 'since': 0.0, 'bodies': {}}   # bodies: (fields, enc) -> (etag, bytes)
+
+_ICE_VOLATILE = ('age', 'fetched_at', 'version')
+
+def _project(doc: dict, fields: tuple) -> dict:
+  """`fields=icecast.listeners,services` → alleen die (sub)sleutels."""
+  out = {}
+  for f in fields:
+    top, _, sub = f.partition('.')
+    if top not in doc:
+      continue
+    if not sub:
+      out[top] = doc[top]
+    elif isinstance(doc[top], dict) and sub in doc[top] and out.get(top) is not doc[top]:
+      out.setdefault(top, {})[sub] = doc[top][sub]
+  return out
+
+def _encode(body: bytes, enc: str | None) -> bytes:
+  if enc == 'br':
+    return brotli.compress(body, quality=5)
+  if enc == 'gzip':
+    return gzip.compress(body, 6, mtime=0)
+  return body
+
 @app.route("/api/status")
 def api_status():
+  """Status als JSON met ETag/Last-Modified (304 bij ongewijzigde toestand), gzip/br en ?fields= projectie.
+
+  Zolang Icecast-snapshot en unitstatus niet wijzigen, komt de body (per projectie
+  en encoding) uit de cache; alleen diagnostiekvelden worden per request opgebouwd.
+  De leeftijd van de snapshot staat altijd in X-Snapshot-Age/X-Snapshot-Fetched-At
+  (buiten body en ETag); expliciet `fields=icecast.age` (of fetched_at/version)
+  zet ze ook in de body, dan zonder cache.
+  """
   ice_unit = os.environ.get("ICECAST_UNIT","icecast-kh")
   lsq_unit = os.environ.get("LIQUIDSOAP_UNIT","liquidsoap")
-  return Response(json.dumps({
-    "services": {
-      "icecast": systemd_is_active(ice_unit),
-      "liquidsoap": systemd_is_active(lsq_unit),
-    },
-    "icecast": fetch_icecast(ICECAST_STATUS_URL),
-  }, ensure_ascii=False), mimetype="application/json")
+  fields = tuple(sorted({f.strip() for f in request.args.get('fields','').split(',') if f.strip()}))
+  units = systemd_status.get()
+  ice = ice_poller.snapshot()
+  key = (ice['version'], ice['stale'], systemd_status.version, ice_unit, lsq_unit)
+  live = {sub for top, _, sub in (f.partition('.') for f in fields) if top == 'icecast' and sub in _ICE_VOLATILE}
+  diag = bool(live) or any(f.partition('.')[0] in _STATUS_DIAG for f in fields)
+  encs = ['br', 'gzip'] if brotli is not None else ['gzip']
+  want = enc = request.accept_encodings.best_match(encs)
+  with _status_lock:
+    if _status_cache['key'] != key:
+      _status_cache.update(key=key, since=time.time(), bodies={})
+    since = _status_cache['since']
+    hit = None if diag else _status_cache['bodies'].get((fields, want))
+  if hit is None:
+    doc = {
+      "services": {
+        "icecast": units.get(ice_unit, {}).get('ActiveState', 'unknown'),
+        "liquidsoap": units.get(lsq_unit, {}).get('ActiveState', 'unknown'),
+      },
+      "units": units,
+      # age/fetched_at/version wisselen per poll of per worker; 'stale' zegt of de data actueel is
+      "icecast": {k: v for k, v in ice.items() if k not in _ICE_VOLATILE or k in live},
+    }
+    if diag:
+      doc.update({k: fn() for k, fn in _STATUS_DIAG.items() if any(f.partition('.')[0] == k for f in fields)})
+    if fields:
+      doc = _project(doc, fields)
+    raw = json.dumps(doc, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    if len(raw) < 512:
+      enc = None
+    etag = hashlib.sha1(raw).hexdigest()[:20] + {'br': '-br', 'gzip': '-gz'}.get(enc, '')
+    hit = (etag, _encode(raw, enc), enc)
+    if not diag:
+      with _status_lock:
+        if _status_cache['key'] == key:
+          bodies = _status_cache['bodies']
+          if len(bodies) >= 64:
+            bodies.clear()
+          bodies[(fields, want)] = hit
+  etag, body, enc = hit
+  if request.if_none_match:
+    fresh = request.if_none_match.contains_weak(etag)
+  else:
+    fresh = bool(request.if_modified_since) and int(since) <= request.if_modified_since.timestamp()
+  resp = Response(b'' if fresh else body, status=304 if fresh else 200, mimetype="application/json")
+  resp.set_etag(etag)
+  resp.last_modified = int(since)
+  resp.headers['Cache-Control'] = 'no-cache'
+  resp.headers['Vary'] = 'Accept-Encoding'
+  if ice.get('age') is not None:
+    resp.headers['X-Snapshot-Age'] = f"{ice['age']:.1f}"
+  if ice.get('fetched_at'):
+    resp.headers['X-Snapshot-Fetched-At'] = f"{ice['fetched_at']:.3f}"
+  if enc and not fresh:
+    resp.headers['Content-Encoding'] = enc
+  return resp
+
+@app.get("/api/history")
+def api_history():
+  """Luisterhistorie als JSON: ?mount=/x.mp3 (leeg = totaal) &from=&to= (epoch s, standaard 24 u)
+  &res=10|60|3600 (standaard automatisch) &offset=s (bijv. 604800 voor dezelfde periode vorige week)."""
+  mount = (request.args.get('mount','') or '').strip() or TOTAL_MOUNT
+  try:
+    end = float(request.args.get('to','') or time.time())
+    start = float(request.args.get('from','') or end - 86400)
+    res = int(request.args.get('res','') or 0) or None
+    offset = int(request.args.get('offset','') or 0)
+  except ValueError:
+    abort(400, 'Ongeldige parameter')
+  if end <= start:
+    abort(400, 'to moet na from liggen')
+  try:
+    out = listener_history.query(mount, start - offset, end - offset, res)
+  except ValueError as e:
+    abort(400, str(e))
+  except SQLAlchemyError as e:
+    return Response(json.dumps({'error': str(e)}), status=503, mimetype='application/json')
+  if offset:
+    for p in out['points']:
+      p[0] += offset
+    out['from'] += offset; out['to'] += offset; out['offset'] = offset
+  out['enabled'] = _history_enabled()
+  return Response(json.dumps(out), mimetype='application/json')
+
+@app.get("/api/library")
+def api_library():
+  """Zoeken in de metadata-index: ?q=woorden (artiest/titel/album/bestandsnaam) &dir= &limit= &offset=."""
+  try:
+    limit = max(1, min(500, int(request.args.get('limit','') or 50)))
+    offset = max(0, int(request.args.get('offset','') or 0))
+  except ValueError:
+    abort(400, 'Ongeldige parameter')
+  try:
+    tracks = library_index.search(request.args.get('q',''), (request.args.get('dir','') or '').strip(), limit, offset)
+  except SQLAlchemyError as e:
+    return Response(json.dumps({'error': str(e)}), status=503, mimetype='application/json')
+  return Response(json.dumps({'tracks': tracks, 'limit': limit, 'offset': offset}, ensure_ascii=False), mimetype='application/json')
+
+@app.get("/api/library/stats")
+def api_library_stats():
+  """Per map aantal tracks, bytes en speelduur, plus indexerstatus."""
+  try:
+    dirs = library_index.totals()
+  except SQLAlchemyError as e:
+    return Response(json.dumps({'error': str(e)}), status=503, mimetype='application/json')
+  return Response(json.dumps({'dirs': dirs, 'indexer': dict(library_index.stats(), enabled=LIBRARY_INDEX)}, ensure_ascii=False),
+                  mimetype='application/json')
+
+@app.get("/api/library/duplicates")
+def api_library_duplicates():
+  """Groepen bestanden met dezelfde inhoud (?limit=), grootste terug te winnen ruimte eerst."""
+  try:
+    limit = max(1, min(1000, int(request.args.get('limit','') or 100)))
+  except ValueError:
+    abort(400, 'Ongeldige parameter')
+  try:
+    report = duplicate_finder.report(limit)
+  except SQLAlchemyError as e:
+    return Response(json.dumps({'error': str(e)}), status=503, mimetype='application/json')
+  return Response(json.dumps(dict(report, scanner=duplicate_finder.stats()), ensure_ascii=False), mimetype='application/json')
+
+_sse_lock = threading.Lock()
+_sse_streams = {'open': 0, 'total': 0, 'rejected': 0}
+
+def _mount_counts(ice: dict) -> dict:
+  out = {}
+  for m in ice.get('mounts') or []:
+    out[m['mount']] = out.get(m['mount'], 0) + int(m.get('listeners') or 0)
+  return out
+
+def _ice_event(prev: dict | None, cur: dict) -> tuple[str, dict]:
+  """Volledige snapshot (prev=None) of compacte delta t.o.v. prev voor de SSE feed."""
+  ok = cur.get('listeners') is not None
+  ev = {'ok': ok, 'total': cur.get('listeners'), 'count': cur.get('mounts_count', 0),
+        'age': cur.get('age'), 'stale': cur.get('stale')}
+  cm = _mount_counts(cur)
+  if prev is None:
+    ev['mounts'] = cm
+    return 'snapshot', ev
+  pm = _mount_counts(prev)
+  changed = {m: n for m, n in cm.items() if pm.get(m) != n}
+  gone = [m for m in pm if m not in cm]
+  if changed:
+    ev['set'] = changed
+  if gone:
+    ev['gone'] = gone
+  return 'delta', ev
+
+def _sse(event: str, data: dict, eid: str | None = None) -> str:
+  head = f"id: {eid}\n" if eid else ''
+  return f"{head}event: {event}\ndata: {json.dumps(data, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+@app.get("/api/events")
+def api_events():
+  """Server-Sent Events: luisteraars/mounts als snapshot + deltas (event-id = worker-versie).
+
+  Na SSE_MAX_SEC sluit de stream; EventSource herverbindt met Last-Event-ID en
+  krijgt dan alleen een snapshot als er intussen iets veranderde.
+  """
+  # Controle en reservering in één keer onder de lock; vrijgeven precies één keer (einde stream of close)
+  with _sse_lock:
+    if _sse_streams['open'] >= SSE_MAX_CLIENTS:
+      _sse_streams['rejected'] += 1
+      return Response('Te veel live verbindingen', status=503, headers={'Retry-After': '30'})
+    _sse_streams['open'] += 1
+    _sse_streams['total'] += 1
+  released = []
+
+  def release():
+    with _sse_lock:
+      if not released:
+        released.append(True)
+        _sse_streams['open'] -= 1
+
+  last_id = request.headers.get('Last-Event-ID', '')
+  tag = f"{os.getpid()}-"
+
+  def stream():
+    try:
+      cur = ice_poller.snapshot()
+      yield "retry: 3000\n"
+      eid = tag + str(cur['version'])
+      if last_id == eid:
+        yield _sse('ping', {'age': cur['age'], 'stale': cur['stale']})
+      else:
+        yield _sse(*_ice_event(None, cur), eid)
+      until = time.time() + SSE_MAX_SEC
+      while time.time() < until:
+        nxt = ice_poller.wait_for_change(cur['version'], min(SSE_KEEPALIVE_SEC, max(0.0, until - time.time())))
+        if nxt['version'] == cur['version']:
+          yield _sse('ping', {'age': nxt['age'], 'stale': nxt['stale']})
+          continue
+        yield _sse(*_ice_event(cur, nxt), tag + str(nxt['version']))
+        cur = nxt
+    finally:
+      release()
+
+  resp = Response(stream(), mimetype='text/event-stream', headers={
+    'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no',
+  })
+  resp.call_on_close(release)
+  return resp
 
 # ---------- Helpers: mapping, admin, files ----------
 
@@ -1468,62 +2544,138 @@ def admin_test_bases() -> list[dict]:
   Returns list of {base, url, status, ok, note}.
   """
   results = []
-  bases = []
-  for b in (ICE_ADMIN_BASE or '', os.environ.get('ICE_URL_PUBLIC',''), os.environ.get('ICE_URL_PRIVATE','')):
-    b = (b or '').strip()
-    if b and b not in bases:
-      bases.append(b)
-  user = os.environ.get('ICE_ADMIN_USER','')
-  pw   = os.environ.get('ICE_ADMIN_PASS','')
-  for base in bases:
-    base_clean = base.rstrip('/')
+  headers = _admin_auth_headers(always=False)
+  for base_clean in admin_bases():
     url = f"{base_clean}/admin/stats"
     status = 0; ok=False; note=''
+    t0 = time.time()
     try:
-      req = urllib.request.Request(url)
-      if user or pw:
-        import base64
-        req.add_header('Authorization','Basic '+base64.b64encode(f"{user}:{pw}".encode('utf-8')).decode('ascii'))
-      with urllib.request.urlopen(req, timeout=5) as r:
-        status = r.status
-        ok = (200 <= status < 300)
-    except urllib.error.HTTPError as e:
-      status = e.code
+      status, _ = ice_http.request(url, headers=headers)
       ok = (200 <= status < 300)
       if status in (401,403):
         note = 'unauthorized'
-      else:
+      elif not ok:
         note = f'http {status}'
+      base_health.record(base_clean, status, time.time() - t0)
     except Exception as e:
       status = 0
       note = f"error: {e}"
+      base_health.record(base_clean, 0, time.time() - t0, str(e))
     results.append({'base': base_clean, 'url': url, 'status': status, 'ok': ok, 'note': note})
   return results
 
+# Standaard mount → map (afstemmen met menu); env MOUNT_MAP_<NAME> en het mapfile gaan voor
+MOUNT_MAP_DEFAULTS = {
+  'teamfmdab.mp3':'ML5DAB2', 'ML5.mp3':'ML5', 'ML5NL.mp3':'ML5NL', 'ML5MIX.mp3':'ML5MIX',
+  'ML5DAB2.mp3':'ML5DAB2', 'alltimehits.mp3':'ALLTIMEHITS', 'jumbo.mp3':'JUMBO', 'achterhoeksepiraten.mp3':'ACHTERHOEKSEPIRATEN'
+}
+INGEST_MOUNTMAP_FILE = os.environ.get('INGEST_MOUNTMAP_FILE', '/etc/ingest-mountmap')
+_MOUNT_KEY_RE = re.compile(r'[^A-Za-z0-9_]')
+
+def _mount_base(mount: str) -> str:
+  return (mount or '').lstrip('/').split('/')[-1]
+
+def _mount_env_key(base: str) -> str:
+  return 'MOUNT_MAP_' + _MOUNT_KEY_RE.sub('_', base.upper())
+
+class MountMap:
+  """Geïndexeerde mount → map mapping (env overrides > mapfile > defaults).
+
+  Het mapfile wordt alleen opnieuw ingelezen als inode/mtime/grootte wijzigt
+  (gecontroleerd hooguit eens per `check_interval` s). Houdt ook een
+  omgekeerde index map → mounts bij voor upload/delete.
+  """
+
+  def __init__(self, path: str, defaults: dict, check_interval: float = 1.0):
+    self.path = path
+    self.defaults = dict(defaults)
+    self.check_interval = check_interval
+    self._lock = threading.Lock()
+    self._sig = None
+    self._checked_at = 0.0
+    self._env = {}
+    self._file = {}
+    self._resolved = {}
+    self._by_dir = {}
+    self.loads = 0
+
+  def _file_sig(self):
+    try:
+      st = os.stat(self.path)
+      return (st.st_ino, st.st_mtime_ns, st.st_size)
+    except OSError:
+      return None
+
+  def _read_file(self) -> dict:
+    entries = {}
+    try:
+      with open(self.path, 'r', encoding='utf-8', errors='ignore') as fh:
+        for line in fh:
+          line = line.strip()
+          if not line or line.startswith('#'): continue
+          parts = line.split()
+          # Eerste match wint (zelfde gedrag als de oude lineaire scan)
+          if len(parts) >= 2 and parts[0] not in entries:
+            entries[parts[0]] = parts[1]
+    except Exception:
+      pass
+    return entries
+
+  def reload(self):
+    """Lees env overrides, mapfile en defaults opnieuw in (ook na env:reload)."""
+    sig = self._file_sig()
+    file_map = self._read_file() if sig else {}
+    env_map = {k: v for k, v in os.environ.items() if k.startswith('MOUNT_MAP_')}
+    with self._lock:
+      self._sig = sig
+      self._checked_at = time.time()
+      self._env = env_map
+      self._file = file_map
+      self._resolved = {}
+      self._by_dir = {}
+      for base in list(self.defaults) + list(file_map):
+        self._resolve_locked(base)
+      self.loads += 1
+
+  def _maybe_reload(self):
+    now = time.time()
+    if self.loads:
+      if now - self._checked_at < self.check_interval:
+        return
+      if self._file_sig() == self._sig:
+        self._checked_at = now
+        return
+    self.reload()
+
+  def _resolve_locked(self, base: str) -> str | None:
+    if base in self._resolved:
+      return self._resolved[base]
+    d = self._env.get(_mount_env_key(base))
+    if d is None:
+      d = self._file.get(base)
+    if d is None:
+      d = self.defaults.get(base)
+    self._resolved[base] = d
+    if d:
+      self._by_dir.setdefault(d, set()).add(base)
+    return d
+
+  def resolve(self, mount: str) -> str | None:
+    self._maybe_reload()
+    base = _mount_base(mount)
+    with self._lock:
+      return self._resolve_locked(base)
+
+  def mounts_for_dir(self, dir_name: str) -> list[str]:
+    """Bekende mounts (als '/naam') die op `dir_name` uitkomen."""
+    self._maybe_reload()
+    with self._lock:
+      return sorted('/' + b for b in self._by_dir.get(dir_name, ()))
+
+mount_map = MountMap(INGEST_MOUNTMAP_FILE, MOUNT_MAP_DEFAULTS)
+
 def derive_dir_from_mount(mount: str) -> str | None:
-  base = (mount or '').lstrip('/')
-  base = base.split('/')[-1]
-  # 1) env override MOUNT_MAP_<NAME>
-  key = 'MOUNT_MAP_' + re.sub(r'[^A-Za-z0-9_]', '_', base.upper())
-  if key in os.environ:
-    return os.environ[key]
-  # 2) mapping file
-  try:
-    with open('/etc/ingest-mountmap', 'r', encoding='utf-8', errors='ignore') as fh:
-      for line in fh:
-        line=line.strip()
-        if not line or line.startswith('#'): continue
-        parts=line.split()
-        if len(parts)>=2 and parts[0]==base:
-          return parts[1]
-  except Exception:
-    pass
-  # 3) defaults (afstemmen met menu)
-  defaults = {
-    'teamfmdab.mp3':'ML5DAB2', 'ML5.mp3':'ML5', 'ML5NL.mp3':'ML5NL', 'ML5MIX.mp3':'ML5MIX',
-    'ML5DAB2.mp3':'ML5DAB2', 'alltimehits.mp3':'ALLTIMEHITS', 'jumbo.mp3':'JUMBO', 'achterhoeksepiraten.mp3':'ACHTERHOEKSEPIRATEN'
-  }
-  return defaults.get(base)
+  return mount_map.resolve(mount)
 
 def _safe_dir_join(base_dir: str, subdir: str) -> str | None:
   try:
@@ -1535,47 +2687,209 @@ def _safe_dir_join(base_dir: str, subdir: str) -> str | None:
   except Exception:
     return None
 
-def _admin_call(path: str) -> tuple[int, str]:
-  """Try admin bases in order; return (status, base_used). 0 if none reachable."""
+def admin_bases() -> list[str]:
+  """Geconfigureerde admin bases (ICE_ADMIN_BASE, ICE_URL_PUBLIC, ICE_URL_PRIVATE), ontdubbeld."""
+  bases = []
+  for b in (ICE_ADMIN_BASE or '', os.environ.get('ICE_URL_PUBLIC',''), os.environ.get('ICE_URL_PRIVATE','')):
+    b = (b or '').strip().rstrip('/')
+    if b and b not in bases:
+      bases.append(b)
+  return bases
+
+class AdminBaseHealth:
+  """Gezondheid per admin base met circuit breaker.
+
+  Een base die `threshold` keer achter elkaar faalt (netwerkfout of HTTP 5xx)
+  gaat 'open' en wordt overgeslagen tot de backoff
+  verloopt (base_sec, verdubbelend tot max_sec). Daarna is hij 'half-open':
+  precies één caller krijgt hem (vooraan) als proefcall, alle anderen blijven
+  op de overige bases tot die proef is vastgelegd (of na `trial_sec` als de
+  proef nooit terugmeldt). De laatst geslaagde base wordt als eerste geprobeerd.
+  """
+
+  def __init__(self, threshold: int, base_sec: float, max_sec: float, trial_sec: float = 30.0):
+    self.threshold = max(1, threshold)
+    self.base_sec = base_sec
+    self.max_sec = max_sec
+    self.trial_sec = trial_sec
+    self._lock = threading.Lock()
+    self._state = {}   # base -> dict
+    self._last_ok = ''
+
+  def _get(self, base: str) -> dict:
+    st = self._state.get(base)
+    if st is None:
+      st = self._state[base] = {'failures': 0, 'open_until': 0.0, 'last_status': None, 'last_error': '',
+                                'last_ok_at': 0.0, 'last_fail_at': 0.0, 'latency': None, 'trial_at': 0.0}
+    return st
+
+  def record(self, base: str, status: int, elapsed: float, error: str = ''):
+    """Verwerk een resultaat; status 0 = geen respons."""
+    now = time.time()
+    with self._lock:
+      st = self._get(base)
+      st['last_status'] = status
+      st['latency'] = round(elapsed, 3)
+      st['trial_at'] = 0.0
+      # Elke antwoord < 500 (ook 400/401/404) betekent: base bereikbaar
+      reachable = bool(status) and status < 500
+      if reachable:
+        st['failures'] = 0
+        st['open_until'] = 0.0
+        st['last_error'] = ''
+        st['last_ok_at'] = now
+        self._last_ok = base
+      else:
+        st['failures'] += 1
+        st['last_error'] = error or (f'http {status}' if status else 'geen respons')
+        st['last_fail_at'] = now
+        if st['failures'] >= self.threshold:
+          backoff = min(self.max_sec, self.base_sec * (2 ** (st['failures'] - self.threshold)))
+          st['open_until'] = now + backoff
+        if self._last_ok == base:
+          self._last_ok = ''
+
+  def _half_open(self, st: dict, now: float) -> bool:
+    return st['failures'] >= self.threshold and st['open_until'] <= now
+
+  def order(self, bases: list[str]) -> list[str]:
+    """Bases in routeringsvolgorde; open circuits alleen als er niets anders is.
+
+    Een half-open base waarvan de proef nog vrij is, wordt door deze caller
+    geclaimd en vooraan gezet; zolang die proef loopt telt hij als open.
+    """
+    now = time.time()
+    closed, trial, opened = [], [], []
+    with self._lock:
+      for b in bases:
+        st = self._get(b)
+        if st['open_until'] > now:
+          opened.append(b)
+        elif not self._half_open(st, now):
+          closed.append(b)
+        elif now - st['trial_at'] >= self.trial_sec:
+          st['trial_at'] = now
+          trial.append(b)
+        else:
+          opened.append(b)
+      opened.sort(key=lambda b: max(self._state[b]['open_until'], self._state[b]['trial_at'] + self.trial_sec))
+      last_ok = self._last_ok
+    if last_ok in closed:
+      closed.remove(last_ok)
+      closed.insert(0, last_ok)
+    return trial + closed or opened[:1]
+
+  def snapshot(self, bases: list[str]) -> list[dict]:
+    now = time.time()
+    out = []
+    with self._lock:
+      for b in bases:
+        st = dict(self._get(b))
+        if st['open_until'] > now:
+          state = 'open'
+        elif self._half_open(st, now):
+          state = 'half-open'
+        elif st['failures']:
+          state = 'failing'
+        elif st['last_ok_at']:
+          state = 'ok'
+        else:
+          state = 'unknown'
+        st['open_for'] = max(0, int(st['open_until'] - now))
+        st['trial'] = state == 'half-open' and now - st['trial_at'] < self.trial_sec
+        out.append({'base': b, 'state': state, 'preferred': b == self._last_ok, **st})
+    return out
+
+base_health = AdminBaseHealth(ADMIN_CB_FAILURES, ADMIN_CB_BASE_SEC, ADMIN_CB_MAX_SEC)
+
+def _admin_call(path: str, base: str | None = None) -> tuple[int, str]:
+  """Try admin bases (healthiest first); return (status, base_used). 0 if none reachable.
+
+  Met `base` wordt alleen die base gebruikt (zonder fallback), bijv. voor probes.
+  """
   if _is_dry_run():
     try:
       print(f"[DRY-RUN] would call {path}")
     except Exception:
       pass
     # When dry-run, pretend success and use preferred base
-    b = (ICE_ADMIN_BASE or os.environ.get('ICE_URL_PUBLIC','') or os.environ.get('ICE_URL_PRIVATE','')).rstrip('/')
+    b = (base or ICE_ADMIN_BASE or os.environ.get('ICE_URL_PUBLIC','') or os.environ.get('ICE_URL_PRIVATE','')).rstrip('/')
     return (200, b)
-  bases = [ICE_ADMIN_BASE or '', os.environ.get('ICE_URL_PUBLIC',''), os.environ.get('ICE_URL_PRIVATE','')]
-  for base in bases:
-    base = (base or '').rstrip('/')
-    if not base:
-      continue
+  bases = [base.rstrip('/')] if base else base_health.order(admin_bases())
+  headers = _admin_auth_headers()
+  for b in bases:
+    t0 = time.time()
     try:
-      req = urllib.request.Request(f"{base}{path}")
-      auth = (os.environ.get('ICE_ADMIN_USER','')+":"+os.environ.get('ICE_ADMIN_PASS','')).encode('utf-8')
-      import base64
-      req.add_header('Authorization', 'Basic ' + base64.b64encode(auth).decode('ascii'))
-      with urllib.request.urlopen(req, timeout=5) as r:
-        return (r.status, base)
-    except urllib.error.HTTPError as e:
-      # Auth error: return immediately so we can hint with this base
-      if e.code in (401,403):
-        return (e.code, base)
-      # other HTTP errors: try next base
-      continue
-    except Exception:
+      status, _ = ice_http.request(f"{b}{path}", headers=headers)
+    except Exception as e:
+      base_health.record(b, 0, time.time() - t0, str(e))
       continue
+    base_health.record(b, status, time.time() - t0)
+    if status < 400:
+      return (status, b)
+    # Auth error: return immediately so we can hint with this base
+    if status in (401,403):
+      return (status, b)
+    # other HTTP errors: try next base
+    if base:
+      return (status, b)
   return (0, '')
 
+def admin_path(op: str, src: str, dst: str = '') -> str:
+  """Admin-pad met gequote mountnamen; spatie, # of & in een mount breekt anders de request line of query."""
+  if op == 'killsource':
+    return f"/admin/killsource?mount={quote(src, safe='/')}"
+  return f"/admin/moveclients?mount={quote(src, safe='/')}&destination={quote(dst, safe='/')}"
+
 def admin_killsource(mount: str) -> tuple[int, str]:
   """Return (HTTP status code, base_used). 0 on error."""
-  return _admin_call(f"/admin/killsource?mount={mount}")
+  return _admin_call(admin_path('killsource', mount))
 
 def admin_moveclients(src: str, dst: str) -> tuple[int, str]:
   """Return (HTTP status code, base_used). 0 on error."""
-  return _admin_call(f"/admin/moveclients?mount={src}&destination={dst}")
+  return _admin_call(admin_path('moveclients', src, dst))
+
+def admin_bulk(op: str, mounts: list[str], dst: str = '', parallel: int | None = None, deadline: float | None = None) -> list[dict]:
+  """Voer killsource/moveclients uit over `mounts` met begrensde parallelliteit en een totale deadline.
+
+  Geeft per mount (in invoervolgorde) {mount, op, status, base, ok, elapsed, error}.
+  Calls die na de deadline nog lopen of wachten krijgen status 0 en error 'timeout'.
+  """
+  parallel = max(1, parallel or ADMIN_PARALLEL)
+  deadline = deadline if deadline is not None else ADMIN_DEADLINE_SEC
+
+  def one(src: str) -> dict:
+    t0 = time.time()
+    try:
+      if op == 'killsource':
+        code, base = admin_killsource(src)
+      else:
+        code, base = admin_moveclients(src, dst)
+      err = ''
+    except Exception as e:
+      code, base, err = 0, '', str(e)
+    return {'mount': src, 'op': op, 'status': code, 'base': base, 'ok': code in (200,204),
+            'elapsed': round(time.time() - t0, 3), 'error': err}
+
+  if not mounts:
+    return []
+  pool = ThreadPoolExecutor(max_workers=min(parallel, len(mounts)), thread_name_prefix='admin-bulk')
+  try:
+    futures = [pool.submit(one, m) for m in mounts]
+    futures_wait(futures, timeout=deadline)
+    results = []
+    for m, f in zip(mounts, futures):
+      if f.done() and not f.cancelled():
+        results.append(f.result())
+      else:
+        results.append({'mount': m, 'op': op, 'status': 0, 'base': '', 'ok': False, 'elapsed': None, 'error': 'timeout'})
+    return results
+  finally:
+    # Niet wachten op calls die de deadline overschreden; nog niet gestarte calls annuleren
+    pool.shutdown(wait=False, cancel_futures=True)
 
 def poke_dir(dir_name: str) -> bool:
+  """Maak en verwijder een tijdelijk bestand zodat Liquidsoaps watcher de map herleest; via soft_reload()."""
   try:
     full = os.path.join(MOUNT_DIR, dir_name)
     os.makedirs(full, exist_ok=True)
@@ -1586,16 +2900,49 @@ def poke_dir(dir_name: str) -> bool:
   except Exception:
     return False
 
+reload_coalescer = ReloadCoalescer(poke_dir, RELOAD_DEBOUNCE_SEC, RELOAD_MAX_WAIT_SEC, RELOAD_STATE_DIR)
+
+def soft_reload(dir_name: str) -> bool:
+  """Soft reload aanvragen; verzoeken binnen het venster worden (ook over workers heen) één poke."""
+  return reload_coalescer.request(dir_name)
+
+@app.before_request
+def _start_reload_coalescer():
+  # Elke worker flusht mee, ook zonder eigen verzoek: pokes van een gerecyclede worker blijven niet hangen
+  reload_coalescer.start()
+
 def list_mp3(dir_name: str) -> list[str]:
+  """Alle gesorteerde mp3's in MOUNT_DIR/dir_name; voor grote mappen head_mp3()/page_mp3()."""
   try:
-    full = os.path.join(MOUNT_DIR, dir_name)
-    return sorted([f for f in os.listdir(full) if f.lower().endswith('.mp3') and os.path.isfile(os.path.join(full,f))])
+    if MEDIA_INDEX:
+      return media_index.list_files(dir_name)
+    return sorted(de.name for de in iter_files(os.path.join(MOUNT_DIR, dir_name)))
   except Exception:
     return []
 
+def count_mp3(dir_name: str) -> int:
+  if MEDIA_INDEX:
+    return media_index.count(dir_name)
+  return count_files(os.path.join(MOUNT_DIR, dir_name))
+
+def head_mp3(dir_name: str, n: int) -> list[str]:
+  """Eerste `n` mp3's (gesorteerd) zonder de volledige lijst op te bouwen."""
+  if MEDIA_INDEX:
+    return media_index.head(dir_name, n)
+  return first_files(os.path.join(MOUNT_DIR, dir_name), n)
+
+def page_mp3(dir_name: str, per: int, after: str = '', before: str = '') -> tuple[list[str], bool, bool]:
+  """Cursor-pagina (namen, has_prev, has_next) na `after` of vóór `before`."""
+  if MEDIA_INDEX:
+    return media_index.page(dir_name, per, after or None, before or None)
+  return page_files(os.path.join(MOUNT_DIR, dir_name), per, after or None, before or None)
+
 def list_dirs() -> list[str]:
   try:
-    return sorted([d for d in os.listdir(MOUNT_DIR) if os.path.isdir(os.path.join(MOUNT_DIR, d))])
+    if MEDIA_INDEX:
+      return media_index.list_dirs()
+    with os.scandir(MOUNT_DIR) as it:
+      return sorted(de.name for de in it if de.is_dir() and not de.name.startswith('.'))
   except Exception:
     return []
 
@@ -1697,9 +3044,18 @@ def logout():
   session.clear()
   return redirect(url_for('login'))
 
+def _csrf_error(header_tok: str | None, form_tok: str | None) -> tuple[int, str] | None:
+  """CSRF-regel voor Flask én de native ASGI-routes: (status, melding) of None als het token klopt."""
+  if not ADMIN_TOKEN:
+    return (503, 'ADMIN_TOKEN not configured')
+  # Header voor requests zonder formulierbody (chunked uploads: PUT/DELETE)
+  if (header_tok or form_tok) != ADMIN_TOKEN:
+    return (403, 'Bad CSRF')
+  return None
+
 def _require_csrf():
-  if not ADMIN_TOKEN: abort(503, 'ADMIN_TOKEN not configured')
-  if request.form.get('csrf') != ADMIN_TOKEN: abort(403, 'Bad CSRF')
+  err = _csrf_error(request.headers.get('X-CSRF-Token'), request.form.get('csrf'))
+  if err: abort(*err)
 
 @app.post('/mount/soft-reload')
 def mount_soft_reload():
@@ -1708,8 +3064,8 @@ def mount_soft_reload():
   d = derive_dir_from_mount(m or '')
   if not d:
     flash(f"❌ Geen mapping bekend voor {m}", 'err'); return redirect(url_for('index'))
-  if poke_dir(d):
-    flash(f"✅ Soft reload uitgevoerd voor {m} (map {d})", 'ok')
+  if soft_reload(d):
+    flash(f"✅ Soft reload aangevraagd voor {m} (map {d})", 'ok')
   else:
     flash(f"❌ Soft reload mislukt voor {m}", 'err')
   pref = _prefix()
@@ -1720,6 +3076,7 @@ def mount_disconnect():
   _require_csrf()
   m = request.form.get('mount','')
   code, base_used = admin_killsource(m)
+  ice_poller.request_refresh()
   if code in (200,204):
     prefix = "[DRY-RUN] " if _is_dry_run() else ""
     flash(f"✅ {prefix}Disconnect verstuurd voor {m} (HTTP {code})", 'ok')
@@ -1741,6 +3098,7 @@ def mount_moveclients():
   if src == dst:
     flash("❌ Bron en doel mogen niet gelijk zijn", 'err'); return redirect(url_for('index'))
   code, base_used = admin_moveclients(src, dst)
+  ice_poller.request_refresh()
   if code in (200,204):
     prefix = "[DRY-RUN] " if _is_dry_run() else ""
     flash(f"✅ {prefix}Moveclients: {src} → {dst} (HTTP {code})", 'ok')
@@ -1774,68 +3132,350 @@ def mount_moveclients_all():
       fh.write(str(int(now)))
   except Exception:
     pass
-  # Haal actuele mounts op
-  ice = fetch_icecast(ICECAST_STATUS_URL)
+  # Actuele mounts uit de poller-snapshot
+  ice = ice_poller.snapshot()
   sources = []
   if isinstance(ice.get('mounts'), list):
     sources = [it.get('mount') for it in ice['mounts'] if it.get('mount') and it.get('mount') != dst]
   if not sources:
     flash('❌ Geen bron-mounts gevonden om te verplaatsen', 'err'); return redirect(url_for('index'))
-  ok = 0; unauthorized = False; errors = 0
-  for src in sources:
-    code, base_used = admin_moveclients(src, dst)
-    if code in (200,204):
-      ok += 1
-    elif code in (401,403):
-      unauthorized = True
-    else:
-      errors += 1
+  results = admin_bulk('moveclients', sources, dst)
+  ice_poller.request_refresh()
+  if _wants_json():
+    return _bulk_json(results)
+  _flash_bulk_results('Move all', results, dst)
+  pref = _prefix()
+  return redirect(f"{pref}/" if pref else "/")
+
+FILE_OPS = ('delete', 'move', 'copy')
+
+def _parse_file_bulk(form) -> tuple[str, str, str, list[str], str]:
+  """(op, dir, dst, namen, fout) uit het bestanden-bulkformulier; fout is '' als de invoer klopt."""
+  op = (form.get('op','') or '').strip()
+  if op not in FILE_OPS:
+    return op, '', '', [], 'Unsupported file op'
+  d = (form.get('dir','') or '').strip() or derive_dir_from_mount(form.get('mount','') or '')
+  dst = (form.get('dst','') or '').strip() if op != 'delete' else ''
+  names = []
+  for n in form.getlist('names'):
+    n = os.path.basename((n or '').strip())
+    if n and n not in names:
+      names.append(n)
+  if not d:
+    return op, d, dst, names, 'Geen map gekozen'
+  if op != 'delete' and not dst:
+    return op, d, dst, names, 'Doelmap is verplicht'
+  if op != 'delete' and dst == d:
+    return op, d, dst, names, 'Bron- en doelmap zijn gelijk'
+  if not names:
+    return op, d, dst, names, 'Geen bestanden geselecteerd'
+  return op, d, dst, names, ''
+
+def files_bulk_apply(op: str, d: str, dst: str, names: list[str]) -> tuple[list[dict], list[str]]:
+  """Voer `op` uit op `names` in map `d` (naar `dst`); geeft (resultaten, betrokken mappen).
+
+  Eerst wordt alles gevalideerd (bestaat de bron, is het doel vrij); bij een
+  fout gebeurt er niets. Elk bestand gaat daarna atomair (rename/link, nooit
+  overschrijven). Mislukt bij move/copy halverwege toch een bestand, dan
+  stopt de batch en worden de al verwerkte bestanden teruggedraaid (terug
+  verplaatst of kopie verwijderd); delete is niet terug te draaien en gaat per
+  bestand door. Het resultaat per bestand zegt wat er echt gebeurd is. Pas aan
+  het eind krijgt elke betrokken map één soft reload.
+  """
+  src_dir = _safe_dir_join(MOUNT_DIR, d)
+  if not src_dir or not os.path.isdir(src_dir):
+    raise UploadError('Ongeldige bronmap')
+  dst_dir = None
+  if op != 'delete':
+    dst_dir = _safe_dir_join(MOUNT_DIR, dst)
+    if not dst_dir or not os.path.isdir(dst_dir):
+      raise UploadError('Ongeldige doelmap')
+  missing = [n for n in names if not os.path.isfile(os.path.join(src_dir, n))]
+  if missing:
+    raise UploadError(f"Bestaat niet: {', '.join(missing[:5])}", 404, missing=missing)
+  if dst_dir:
+    taken = [n for n in names if os.path.exists(os.path.join(dst_dir, n))]
+    if taken:
+      raise UploadError(f"Bestaat al in {dst}: {', '.join(taken[:5])}", 409, exists=taken)
+  results = []
+  failed = False
+  for n in names:
+    if failed and op != 'delete':
+      results.append({'name': n, 'ok': False, 'error': 'niet uitgevoerd (batch afgebroken)'})
+      continue
+    src = os.path.join(src_dir, n)
+    try:
+      if op == 'delete':
+        os.remove(src)
+      elif op == 'move':
+        move_file(src, os.path.join(dst_dir, n), UPLOAD_TMP_DIR)
+      else:
+        copy_file(src, UPLOAD_TMP_DIR, os.path.join(dst_dir, n))
+      results.append({'name': n, 'ok': True, 'error': ''})
+    except Exception as e:
+      failed = True
+      results.append({'name': n, 'ok': False, 'error': str(e)})
+  if failed and op != 'delete':
+    # Alles of niets: al verwerkte bestanden terugdraaien (omgekeerde volgorde)
+    for r in reversed([r for r in results if r['ok']]):
+      try:
+        if op == 'move':
+          move_file(os.path.join(dst_dir, r['name']), os.path.join(src_dir, r['name']), UPLOAD_TMP_DIR)
+        else:
+          os.remove(os.path.join(dst_dir, r['name']))
+        r.update(ok=False, error='teruggedraaid')
+      except Exception as e:
+        # Blijft staan waar hij nu is; ok=True houdt index en reload daarmee in lijn
+        r['error'] = f'terugdraaien mislukt: {e}'
+  done = [r['name'] for r in results if r['ok']]
+  touched = []
+  if done and op in ('delete', 'move'):
+    for n in done:
+      media_index.forget_file(d, n)
+    touched.append(d)
+  if done and op in ('move', 'copy'):
+    for n in done:
+      media_index.note_file(dst, n)
+    touched.append(dst)
+  # Eén soft reload (en één herindexering) per map, hoeveel bestanden het ook zijn
+  for t in touched:
+    soft_reload(t)
+    if LIBRARY_INDEX:
+      library_index.touch(t)
+  return results, touched
+
+@app.post('/files/bulk')
+def files_bulk():
+  """Meerdere bestanden tegelijk verwijderen, verplaatsen of kopiëren (dir, names[], op, dst)."""
+  _require_csrf()
+  op, d, dst, names, err = _parse_file_bulk(request.form)
+  if op not in FILE_OPS:
+    abort(400, err)
+  if err:
+    if _wants_json():
+      return _upload_json({'error': err}, 400)
+    flash(f'❌ {err}', 'err'); return redirect(url_for('index'))
+  pref = _prefix()
+  if _is_dry_run():
+    if _wants_json():
+      return _upload_json({'ok': True, 'dry_run': True, 'op': op, 'dir': d, 'dst': dst, 'names': names})
+    flash(f"✅ [DRY-RUN] Zou {op} uitvoeren op {len(names)} bestand(en) in {d}" + (f" naar {dst}" if dst else ''), 'ok')
+    return redirect(f"{pref}/" if pref else "/")
+  try:
+    results, touched = files_bulk_apply(op, d, dst, names)
+  except UploadError as e:
+    if _wants_json():
+      raise
+    flash(f'❌ {e}', 'err'); return redirect(url_for('index'))
+  failed = [r for r in results if not r['ok']]
+  affected = sorted({m for t in touched for m in mount_map.mounts_for_dir(t)})
+  if _wants_json():
+    return _upload_json({'ok': len(results) - len(failed), 'total': len(results), 'op': op, 'dir': d, 'dst': dst,
+                         'reloaded': touched, 'mounts': affected, 'results': results})
+  ok = len(results) - len(failed)
+  if ok:
+    label = {'delete': 'Verwijderd', 'move': 'Verplaatst', 'copy': 'Gekopieerd'}[op]
+    flash(f"✅ {label}: {ok} bestand(en) uit {d}" + (f" naar {dst}" if dst else '') + f", soft reload van {', '.join(touched)}"
+          + (f" (mounts: {', '.join(affected)})" if affected else ''), 'ok')
+  for r in failed[:5]:
+    flash(f"❌ {r['name']}: {r['error']}", 'err')
+  if len(failed) > 5:
+    flash(f"❌ … en nog {len(failed) - 5} mislukt", 'err')
+  return redirect(f"{pref}/" if pref else "/")
+
+BULK_OPS = ('killsource', 'moveclients')
+
+def _parse_bulk(form) -> tuple[str, str, list[str], str]:
+  """(op, dst, mounts, fout) uit het bulkformulier; fout is '' als de invoer klopt."""
+  op = (form.get('op','') or '').strip()
+  if op not in BULK_OPS:
+    return op, '', [], 'Unsupported bulk op'
+  dst = (form.get('dst','') or '').strip()
+  mounts = []
+  for m in form.getlist('mounts'):
+    m = (m or '').strip()
+    if m and m not in mounts and not (op == 'moveclients' and m == dst):
+      mounts.append(m)
+  if op == 'moveclients' and not dst:
+    return op, dst, mounts, 'Doelmount is verplicht'
+  if not mounts:
+    return op, dst, mounts, 'Geen mounts geselecteerd'
+  return op, dst, mounts, ''
+
+@app.post('/mount/bulk')
+def mount_bulk():
+  """Killsource of moveclients voor een selectie van mounts (parallel, met deadline)."""
+  _require_csrf()
+  op, dst, mounts, err = _parse_bulk(request.form)
+  if op not in BULK_OPS:
+    abort(400, err)
+  if err:
+    flash(f'❌ {err}', 'err'); return redirect(url_for('index'))
+  results = admin_bulk(op, mounts, dst)
+  ice_poller.request_refresh()
+  if _wants_json():
+    return _bulk_json(results)
+  _flash_bulk_results('Disconnect' if op == 'killsource' else 'Moveclients', results, dst)
+  pref = _prefix()
+  return redirect(f"{pref}/" if pref else "/")
+
+def _wants_json() -> bool:
+  return request.args.get('format') == 'json' or request.accept_mimetypes.best == 'application/json'
+
+def _bulk_json(results: list[dict]) -> Response:
+  return Response(json.dumps({
+    'ok': sum(1 for r in results if r['ok']),
+    'total': len(results),
+    'dry_run': _is_dry_run(),
+    'results': results,
+  }, ensure_ascii=False), mimetype='application/json')
+
+def _flash_bulk_results(label: str, results: list[dict], dst: str = ''):
+  ok = [r for r in results if r['ok']]
+  unauthorized = [r for r in results if r['status'] in (401,403)]
+  timeouts = [r for r in results if r['error'] == 'timeout']
+  failed = [r for r in results if not r['ok'] and r not in unauthorized and r not in timeouts]
   if ok:
     prefix = "[DRY-RUN] " if _is_dry_run() else ""
-    flash(f"✅ {prefix}Move all: {ok}/{len(sources)} bronnen → {dst}", 'ok')
-  if errors:
-    flash(f"❌ {errors} bronnen gaven geen succesmelding", 'err')
+    flash(f"✅ {prefix}{label}: {len(ok)}/{len(results)} mounts" + (f" → {dst}" if dst else ''), 'ok')
+  if failed:
+    flash("❌ Geen succesmelding voor: " + ', '.join(f"{r['mount']} ({r['status'] or r['error'] or 'geen respons'})" for r in failed), 'err')
+  if timeouts:
+    flash(f"❌ Deadline ({ADMIN_DEADLINE_SEC:g}s) overschreden voor: " + ', '.join(r['mount'] for r in timeouts), 'err')
   if unauthorized:
     user=os.environ.get('ICE_ADMIN_USER','') or 'USER'
     flash(f"❌ Unauthorized/Forbidden — controleer ICE_ADMIN_BASE/USER/PASS (user: {user})", 'err')
-  pref = _prefix()
-  return redirect(f"{pref}/" if pref else "/")
+
+def _upload_target(mount: str, dir_override: str, filename: str) -> tuple[str, str, str]:
+  """(dir, bestandsnaam, doelmap) voor een upload; UploadError bij ongeldige invoer."""
+  d = (dir_override or '').strip() or derive_dir_from_mount(mount or '')
+  if not d:
+    raise UploadError(f"Geen mapping bekend voor {mount}")
+  name = secure_filename(filename or '')
+  if not name:
+    raise UploadError('Geen bestand gekozen')
+  if not name.lower().endswith('.mp3'):
+    raise UploadError('Alleen .mp3 toegestaan')
+  # Validate destination directory strictly
+  dest_dir = _safe_dir_join(MOUNT_DIR, d)
+  if not dest_dir or not os.path.isdir(dest_dir):
+    raise UploadError('Ongeldige doelmap')
+  return d, name, dest_dir
+
+def _published(d: str, name: str) -> list[str]:
+  """Na een geslaagde (atomaire) rename: soft reload + index bijwerken; geeft de betrokken mounts."""
+  soft_reload(d)
+  media_index.note_file(d, name)
+  if LIBRARY_INDEX:
+    library_index.touch(d)
+  return mount_map.mounts_for_dir(d)
+
+def _dupes_summary() -> dict | None:
+  if not (LIBRARY_INDEX and DUPLICATE_SCAN):
+    return None
+  try:
+    return duplicate_finder.report(10)
+  except SQLAlchemyError:
+    return None
+
+def _warn_duplicate(d: str, name: str, size: int, digest: str) -> list[str]:
+  """Flash een waarschuwing als dezelfde inhoud al elders in de bibliotheek staat."""
+  if not (LIBRARY_INDEX and DUPLICATE_SCAN):
+    return []
+  try:
+    # Hash van de upload meteen opslaan: ook een tweede upload vóór de volgende volledige ronde wordt herkend
+    library_index.note_file(d, name, digest)
+    same = duplicate_finder.existing(d, name, size, digest)
+  except Exception as e:
+    log.warning('duplicate check: %s', e)
+    return []
+  if same:
+    more = f" (+{len(same) - 5})" if len(same) > 5 else ''
+    flash(f"⚠️ Zelfde inhoud bestaat al: {', '.join(same[:5])}{more}", 'warn')
+  return same
 
 @app.post('/files/upload')
 def files_upload():
   _require_csrf()
-  m = request.form.get('mount','')
-  dir_override = (request.form.get('dir','') or '').strip()
   file = request.files.get('file')
   if not file or not file.filename:
     flash('❌ Geen bestand gekozen', 'err'); return redirect(url_for('index'))
-  if dir_override:
-    d = dir_override
-  else:
-    d = derive_dir_from_mount(m or '')
-  if not d:
-    flash(f"❌ Geen mapping bekend voor {m}", 'err'); return redirect(url_for('index'))
-  name = secure_filename(file.filename)
-  if not name.lower().endswith('.mp3'):
-    flash('❌ Alleen .mp3 toegestaan', 'err'); return redirect(url_for('index'))
-  # Validate destination directory strictly
-  dest_dir = _safe_dir_join(MOUNT_DIR, d)
-  if not dest_dir or not os.path.isdir(dest_dir):
-    flash('❌ Ongeldige doelmap', 'err'); return redirect(url_for('index'))
-  dest = os.path.join(dest_dir, name)
+  try:
+    d, name, dest_dir = _upload_target(request.form.get('mount',''), request.form.get('dir',''), file.filename)
+  except UploadError as e:
+    flash(f'❌ {e}', 'err'); return redirect(url_for('index'))
   try:
     if _is_dry_run():
       flash(f"✅ [DRY-RUN] Zou uploaden naar {d}/{name} en soft reload triggeren", 'ok')
     else:
-      os.makedirs(dest_dir, exist_ok=True)
-      file.save(dest)
-      poke_dir(d)
-      flash(f"✅ Geüpload naar {d}/{name} en soft reload getriggerd", 'ok')
+      # Eerst volledig naar een tempfile (zelfde filesystem), dan atomair op zijn plek:
+      # Liquidsoap (reload_mode="watch") ziet zo nooit een half geschreven bestand
+      size, digest = save_stream(file.stream, UPLOAD_TMP_DIR, os.path.join(dest_dir, name))
+      affected = _published(d, name)
+      flash(f"✅ Geüpload naar {d}/{name} en soft reload getriggerd" + (f" (mounts: {', '.join(affected)})" if affected else ''), 'ok')
+      _warn_duplicate(d, name, size, digest)
   except Exception as e:
     flash(f"❌ Upload mislukt: {e}", 'err')
   pref = _prefix()
   return redirect(f"{pref}/" if pref else "/")
 
+@app.errorhandler(UploadError)
+def _upload_error(e: UploadError):
+  return Response(json.dumps(dict(e.extra, error=str(e)), ensure_ascii=False), status=e.status, mimetype='application/json')
+
+def _upload_json(data: dict, status: int = 200) -> Response:
+  return Response(json.dumps(data, ensure_ascii=False), status=status, mimetype='application/json')
+
+@app.post('/files/upload/start')
+def files_upload_start():
+  """Begin een hervatbare upload: mount|dir, name, size (bytes), optioneel sha256 → {id, offset, chunk_size}."""
+  _require_csrf()
+  d, name, _ = _upload_target(request.form.get('mount',''), request.form.get('dir',''), request.form.get('name',''))
+  try:
+    size = int(request.form.get('size',''))
+  except ValueError:
+    raise UploadError('size (bytes) is verplicht')
+  meta = chunked_uploads.start(d, name, size, request.form.get('sha256',''))
+  return _upload_json(dict(meta, chunk_size=UPLOAD_CHUNK_BYTES), 201)
+
+@app.get('/files/upload/<uid>')
+def files_upload_status(uid: str):
+  return _upload_json(dict(chunked_uploads.status(uid), chunk_size=UPLOAD_CHUNK_BYTES))
+
+@app.put('/files/upload/<uid>')
+def files_upload_chunk(uid: str):
+  """Chunk als ruwe body op ?offset=N (moet aansluiten op wat er al is; anders 409 met de huidige offset)."""
+  _require_csrf()
+  try:
+    offset = int(request.args.get('offset',''))
+  except ValueError:
+    raise UploadError('offset is verplicht')
+  new = chunked_uploads.append(uid, offset, request.stream, request.content_length)
+  return _upload_json({'id': uid, 'offset': new})
+
+@app.post('/files/upload/<uid>/finish')
+def files_upload_finish(uid: str):
+  """Controleer grootte/sha256, fsync en rename atomair naar de doelmap; pas daarna soft reload."""
+  _require_csrf()
+  meta = chunked_uploads.status(uid)
+  d, name, dest_dir = _upload_target('', meta['dir'], meta['name'])
+  if _is_dry_run():
+    chunked_uploads.abort(uid)
+    flash(f"✅ [DRY-RUN] Zou uploaden naar {d}/{name} en soft reload triggeren", 'ok')
+    return _upload_json({'ok': True, 'dry_run': True, 'dir': d, 'name': name})
+  done = chunked_uploads.finish(uid, dest_dir)
+  affected = _published(d, name)
+  flash(f"✅ Geüpload naar {d}/{name} en soft reload getriggerd" + (f" (mounts: {', '.join(affected)})" if affected else ''), 'ok')
+  dupes = _warn_duplicate(d, name, done['size'], done['sha256'])
+  return _upload_json({'ok': True, 'dir': d, 'name': name, 'size': done['size'], 'sha256': done['sha256'], 'mounts': affected,
+                       'duplicates': dupes})
+
+@app.delete('/files/upload/<uid>')
+def files_upload_abort(uid: str):
+  _require_csrf()
+  chunked_uploads.abort(uid)
+  return _upload_json({'ok': True})
+
 @app.post('/files/delete')
 def files_delete():
   _require_csrf()
@@ -1857,8 +3497,12 @@ def files_delete():
         flash(f"✅ [DRY-RUN] Zou verwijderen: {d}/{name}", 'ok')
       else:
         os.remove(full)
-        poke_dir(d)
-        flash(f"✅ Verwijderd: {d}/{name} en soft reload", 'ok')
+        soft_reload(d)
+        media_index.forget_file(d, name)
+        if LIBRARY_INDEX:
+          library_index.touch(d)
+        affected = mount_map.mounts_for_dir(d)
+        flash(f"✅ Verwijderd: {d}/{name} en soft reload" + (f" (mounts: {', '.join(affected)})" if affected else ''), 'ok')
     else:
       flash(f"❌ Bestaat niet: {d}/{name}", 'err')
   except Exception as e:
@@ -0,0 +1,349 @@
+# ASGI-entrypoint (asyncio): bijv. `gunicorn -k uvicorn_worker.UvicornWorker asgi:app`
+# of `uvicorn asgi:app`. wsgi.py blijft het standaard (sync) entrypoint.
+#
+# I/O-gebonden endpoints draaien hier native async (aio.*, met timeouts per call):
+#   GET  /api/events    live feed, wacht op de Icecast poller zonder thread per stream
+#   GET  /logs          journalctl
+#   POST /mount/bulk    JSON-variant (Accept: application/json of ?format=json): admin calls parallel, met deadline
+#   GET  /health
+# Alle overige routes lopen via de Flask-app in een begrensde threadpool (a2wsgi, ASGI_THREADS),
+# zodat een trage sync handler één thread bezet houdt in plaats van een hele worker.
+from __future__ import annotations
+import os, json, time, asyncio
+from http.cookies import SimpleCookie
+from urllib.parse import parse_qsl, quote
+
+from a2wsgi import WSGIMiddleware
+from werkzeug.datastructures import MultiDict, MIMEAccept
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_accept_header
+
+import aio
+import app as panel
+
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', '16') or '16')
+
+
+class _Request:
+  """Minimale requestweergave voor de native routes."""
+
+  def __init__(self, scope):
+    self.scope = scope
+    self.method = scope['method']
+    self.path = scope['path']
+    self.args = MultiDict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+    self.headers = {}
+    for k, v in scope.get('headers', []):
+      k = k.decode('latin-1').lower()
+      v = v.decode('latin-1')
+      self.headers[k] = f"{self.headers[k]}, {v}" if k in self.headers else v
+    cookie = SimpleCookie()
+    try:
+      cookie.load(self.headers.get('cookie', ''))
+    except Exception:
+      pass
+    self.cookies = {k: m.value for k, m in cookie.items()}
+
+  def wants_json(self) -> bool:
+    accept = parse_accept_header(self.headers.get('accept', ''), MIMEAccept)
+    return self.args.get('format') == 'json' or accept.best == 'application/json'
+
+  def prefix(self) -> str:
+    return (self.headers.get('x-forwarded-prefix') or self.headers.get('x-script-name') or '').rstrip('/')
+
+
+async def _read_body(receive, limit: int | None = None) -> bytes | None:
+  """Lees de volledige body; None bij disconnect of als `limit` overschreden wordt."""
+  body = bytearray()
+  while True:
+    msg = await receive()
+    if msg['type'] == 'http.disconnect':
+      return None
+    body += msg.get('body', b'')
+    if limit is not None and len(body) > limit:
+      return None
+    if not msg.get('more_body'):
+      return bytes(body)
+
+
+async def _respond(send, status: int, body: bytes | str, ctype: str = 'text/plain; charset=utf-8', headers: dict | None = None):
+  if isinstance(body, str):
+    body = body.encode('utf-8')
+  hdrs = [(b'content-type', ctype.encode('latin-1')), (b'content-length', str(len(body)).encode())]
+  hdrs += [(k.lower().encode('latin-1'), str(v).encode('latin-1')) for k, v in (headers or {}).items()]
+  await send({'type': 'http.response.start', 'status': status, 'headers': hdrs})
+  await send({'type': 'http.response.body', 'body': body})
+
+
+def _logged_in(req: _Request) -> bool:
+  """Zelfde regel als _enforce_login: Flask-sessiecookie (ondertekend) met logged_in."""
+  if not panel._login_enabled():
+    return True
+  raw = req.cookies.get(panel.app.config.get('SESSION_COOKIE_NAME', 'session'))
+  if not raw:
+    return False
+  try:
+    data = panel.app.session_interface.get_signing_serializer(panel.app).loads(
+      raw, max_age=int(panel.app.permanent_session_lifetime.total_seconds()))
+  except Exception:
+    return False
+  return bool(data.get('logged_in'))
+
+
+async def _login_redirect(req: _Request, send):
+  qs = req.scope.get('query_string', b'').decode('latin-1')
+  nxt = req.prefix() + req.path + (('?' + qs) if qs else '')
+  await _respond(send, 302, '', headers={'Location': f"{req.prefix()}/login?next={quote(nxt, safe='')}"})
+
+
+# ---------- async varianten van de blokkerende helpers ----------
+
+async def admin_call(path: str, base: str | None = None) -> tuple[int, str]:
+  """Async tegenhanger van _admin_call: zelfde base-volgorde (circuit breaker) en statusregels."""
+  if panel._is_dry_run():
+    b = (base or panel.ICE_ADMIN_BASE or os.environ.get('ICE_URL_PUBLIC','') or os.environ.get('ICE_URL_PRIVATE','')).rstrip('/')
+    return (200, b)
+  bases = [base.rstrip('/')] if base else panel.base_health.order(panel.admin_bases())
+  headers = panel._admin_auth_headers()
+  for b in bases:
+    t0 = time.time()
+    try:
+      status, _ = await aio.http_request(f"{b}{path}", headers=headers, connect_timeout=panel.ICE_HTTP_CONNECT_TIMEOUT,
+                                         read_timeout=panel.ICE_HTTP_READ_TIMEOUT)
+    except Exception as e:
+      panel.base_health.record(b, 0, time.time() - t0, str(e) or type(e).__name__)
+      continue
+    panel.base_health.record(b, status, time.time() - t0)
+    if status < 400 or status in (401,403) or base:
+      return (status, b)
+  return (0, '')
+
+
+async def admin_bulk(op: str, mounts: list[str], dst: str = '', parallel: int | None = None, deadline: float | None = None) -> list[dict]:
+  """Async tegenhanger van admin_bulk; calls na de deadline worden echt geannuleerd."""
+  parallel = max(1, parallel or panel.ADMIN_PARALLEL)
+  deadline = deadline if deadline is not None else panel.ADMIN_DEADLINE_SEC
+  sem = asyncio.Semaphore(parallel)
+
+  async def one(src: str) -> dict:
+    async with sem:
+      t0 = time.time()
+      try:
+        code, base = await admin_call(panel.admin_path(op, src, dst))
+        err = ''
+      except Exception as e:
+        code, base, err = 0, '', str(e)
+      return {'mount': src, 'op': op, 'status': code, 'base': base, 'ok': code in (200,204),
+              'elapsed': round(time.time() - t0, 3), 'error': err}
+
+  if not mounts:
+    return []
+  tasks = [asyncio.ensure_future(one(m)) for m in mounts]
+  done, pending = await asyncio.wait(tasks, timeout=deadline)
+  for t in pending:
+    t.cancel()
+  results = []
+  for m, t in zip(mounts, tasks):
+    if t in done and not t.cancelled() and t.exception() is None:
+      results.append(t.result())
+    else:
+      results.append({'mount': m, 'op': op, 'status': 0, 'base': '', 'ok': False, 'elapsed': None, 'error': 'timeout'})
+  return results
+
+
+class _IceWatch:
+  """Brug van de pollerthread naar de event loop: één asyncio.Event per snapshotversie."""
+
+  def __init__(self):
+    self.loop = None
+    self.event = None
+    self._hooked = False
+
+  def current(self) -> asyncio.Event:
+    loop = asyncio.get_running_loop()
+    if self.loop is not loop:
+      self.loop = loop
+      self.event = asyncio.Event()
+    if not self._hooked:
+      panel.ice_poller.on_change(self._changed)
+      self._hooked = True
+    return self.event
+
+  def _changed(self, version: int):
+    loop = self.loop
+    if loop is not None and not loop.is_closed():
+      loop.call_soon_threadsafe(self._fire)
+
+  def _fire(self):
+    ev, self.event = self.event, asyncio.Event()
+    ev.set()
+
+
+_ice_watch = _IceWatch()
+
+
+# ---------- native routes ----------
+
+async def health(req, receive, send):
+  await _respond(send, 200, 'OK')
+
+
+async def logs(req, receive, send):
+  if not _logged_in(req):
+    return await _login_redirect(req, send)
+  try:
+    _, txt = await aio.run(panel._logs_cmd(req.args), timeout=6, check=True)
+  except Exception as e:
+    txt = panel._logs_error(e)
+  await _respond(send, 200, txt)
+
+
+async def events(req, receive, send):
+  if not _logged_in(req):
+    return await _login_redirect(req, send)
+  with panel._sse_lock:
+    if panel._sse_streams['open'] >= panel.SSE_MAX_CLIENTS:
+      panel._sse_streams['rejected'] += 1
+      return await _respond(send, 503, 'Te veel live verbindingen', headers={'Retry-After': '30'})
+    panel._sse_streams['open'] += 1
+    panel._sse_streams['total'] += 1
+  # Eerst de (lege) requestbody lezen; daarna levert receive() alleen nog http.disconnect
+  if await _read_body(receive, limit=64 * 1024) is None:
+    with panel._sse_lock:
+      panel._sse_streams['open'] -= 1
+    return
+  gone = asyncio.ensure_future(receive())
+  try:
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+      (b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'), (b'x-accel-buffering', b'no')]})
+
+    async def emit(chunk: str):
+      await send({'type': 'http.response.body', 'body': chunk.encode('utf-8'), 'more_body': True})
+
+    tag = f"{os.getpid()}-"
+    cur = await asyncio.get_running_loop().run_in_executor(None, panel.ice_poller.snapshot)
+    await emit("retry: 3000\n")
+    eid = tag + str(cur['version'])
+    if req.headers.get('last-event-id', '') == eid:
+      await emit(panel._sse('ping', {'age': cur['age'], 'stale': cur['stale']}))
+    else:
+      await emit(panel._sse(*panel._ice_event(None, cur), eid))
+    until = time.time() + panel.SSE_MAX_SEC
+    while time.time() < until and not gone.done():
+      ev = _ice_watch.current()
+      nxt = panel.ice_poller.snapshot(wait=0)
+      if nxt['version'] == cur['version']:
+        waiter = asyncio.ensure_future(ev.wait())
+        await asyncio.wait([waiter, gone], timeout=min(panel.SSE_KEEPALIVE_SEC, max(0.0, until - time.time())),
+                           return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        if gone.done():
+          break
+        nxt = panel.ice_poller.snapshot(wait=0)
+      if nxt['version'] == cur['version']:
+        await emit(panel._sse('ping', {'age': nxt['age'], 'stale': nxt['stale']}))
+        continue
+      await emit(panel._sse(*panel._ice_event(cur, nxt), tag + str(nxt['version'])))
+      cur = nxt
+    if not gone.done():
+      await send({'type': 'http.response.body', 'body': b''})
+  finally:
+    gone.cancel()
+    with panel._sse_lock:
+      panel._sse_streams['open'] -= 1
+
+
+async def mount_bulk(req, receive, send):
+  """JSON-variant van POST /mount/bulk; HTML-formulieren (flash + redirect) gaan via Flask."""
+  if not _logged_in(req):
+    return await _login_redirect(req, send)
+  body = await _read_body(receive, limit=1024 * 1024)
+  if body is None:
+    return await _respond(send, 413, 'Request too large')
+  form = MultiDict(parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True))
+  err = panel._csrf_error(req.headers.get('x-csrf-token'), form.get('csrf'))
+  if err:
+    return await _respond(send, *err)
+  op, dst, mounts, err = panel._parse_bulk(form)
+  if err:
+    return await _respond(send, 400, json.dumps({'error': err}, ensure_ascii=False), 'application/json')
+  results = await admin_bulk(op, mounts, dst)
+  panel.ice_poller.request_refresh()
+  await _respond(send, 200, json.dumps({
+    'ok': sum(1 for r in results if r['ok']),
+    'total': len(results),
+    'dry_run': panel._is_dry_run(),
+    'results': results,
+  }, ensure_ascii=False), 'application/json')
+
+
+def _native(req: _Request):
+  if req.method == 'GET':
+    return {'/health': health, '/logs': logs, '/api/events': events}.get(req.path)
+  if req.method == 'POST' and req.path == '/mount/bulk' and req.wants_json() \
+     and req.headers.get('content-type', '').startswith('application/x-www-form-urlencoded'):
+    return mount_bulk
+  return None
+
+
+# ---------- WSGI-brug voor de overige Flask routes ----------
+
+class _MaxBody:
+  """wsgi.input dat 413 geeft zodra de body MAX_CONTENT_LENGTH overschrijdt, ook zonder Content-Length (chunked).
+
+  werkzeug kapt zo'n stream op de limiet stilletjes af; daarom wordt hier bij
+  het bereiken van de limiet één byte vooruit gelezen.
+  """
+
+  def __init__(self, stream, limit: int):
+    self._stream = stream
+    self._left = limit
+
+  def _count(self, data: bytes) -> bytes:
+    self._left -= len(data)
+    if self._left < 0 or (self._left == 0 and data and self._stream.read(1)):
+      raise RequestEntityTooLarge()
+    return data
+
+  def read(self, size: int = -1) -> bytes:
+    if size is None or size < 0:
+      out = bytearray()
+      while chunk := self.read(64 * 1024):
+        out += chunk
+      return bytes(out)
+    return self._count(self._stream.read(min(size, self._left + 1)))
+
+  def readline(self, size: int = -1) -> bytes:
+    return self._count(self._stream.readline(self._left + 1 if size is None or size < 0 else min(size, self._left + 1)))
+
+
+def _flask(environ, start_response):
+  # a2wsgi leest de body gestreamd uit receive() en sluit hem zelf af (ook chunked)
+  environ['wsgi.input_terminated'] = True
+  limit = panel.app.config.get('MAX_CONTENT_LENGTH')
+  if limit is not None:
+    environ['wsgi.input'] = _MaxBody(environ['wsgi.input'], limit)
+  return panel.app(environ, start_response)
+
+
+_bridge = WSGIMiddleware(_flask, workers=ASGI_THREADS)
+
+
+async def app(scope, receive, send):
+  if scope['type'] == 'lifespan':
+    while True:
+      msg = await receive()
+      if msg['type'] == 'lifespan.startup':
+        await send({'type': 'lifespan.startup.complete'})
+      elif msg['type'] == 'lifespan.shutdown':
+        await aio.aclose()
+        _bridge.executor.shutdown(wait=False, cancel_futures=True)
+        await send({'type': 'lifespan.shutdown.complete'})
+        return
+  if scope['type'] != 'http':
+    return
+  req = _Request(scope)
+  handler = _native(req)
+  if handler is None:
+    return await _bridge(scope, receive, send)
+  await handler(req, receive, send)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Benchmark: render_template_string per request vs. voorgecompileerde templates + fragment cache.
+
+Gebruik (vanuit /opt/ingest-admin):
+  DB_URL=sqlite:///:memory: venv/bin/python contrib/bench-render.py [mounts] [iteraties]
+"""
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('DB_URL', 'sqlite:///:memory:')
+
+from flask import render_template_string  # noqa: E402
+import app as A  # noqa: E402
+
+
+def _context(n_mounts: int):
+  names = tuple(f'/M{i}.mp3' for i in range(n_mounts))
+  mounts = [{'mount': n, 'listeners': i, 'dir': f'M{i}', 'files': [f'track{j:02d}.mp3' for j in range(20)], 'files_total': 250}
+            for i, n in enumerate(names)]
+  common = dict(csrf='tok', pref='/admin', admin_base='http://127.0.0.1:8001', admin_user='admin')
+  page = dict(
+    title=A.APP_TITLE, svc_ice='active', svc_lsq='active',
+    ice={'listeners': sum(m['listeners'] for m in mounts), 'mounts_count': len(mounts), 'age': 1.0, 'stale': False},
+    ice_url=A.ICECAST_STATUS_URL, icecast_name=A.ICECAST_NAME, ice_unit='icecast-kh', lsq_unit='liquidsoap',
+    messages=[], public_base='http://127.0.0.1:8000', mount_dir='/srv', music_dir='Music',
+    mounts=mounts, dirs=[m['dir'] for m in mounts], playlists_dir='PLAYLISTS', jingles_dir='Jingles',
+    playlists=[], jingles=[], lsq_ratio=10, lsq_snippet='', lsq_minutes=10, lsq_time_snippet='',
+    selected_dir='', selected_files=[], has_prev=False, has_next=False, per=100, total_files=0, is_dry_run=False,
+    login_enabled=False, logged_in=False, login_user='', db_ok=True, mounts_names=list(names),
+    units={},
+    http_pool=A.ice_http.stats(),
+    dupes=None,
+    admin_conf={'bases': [], 'health': {}, 'user': 'admin', 'pass_set': True, 'pass_source': 'env', 'pass_file': ''},
+    **common,
+  )
+  return names, mounts, common, page
+
+
+def _cards(names, mounts, common, cached: bool):
+  # Oude situatie: de kaart zat inline in HTML en werd dus één keer per request gecompileerd
+  tpl = None if cached else A.app.jinja_env.from_string(A.MOUNT_CARD_HTML)
+  for m in mounts:
+    ctx = dict(m=m, mount_names=names, **common)
+    if cached:
+      key = (m['mount'], m['dir'], tuple(m['files']), m['files_total'], names) + tuple(common.values())
+      m['card'] = A.render_fragment('mount_card', key, **ctx)
+    else:
+      m['card'] = A.Markup(tpl.render(ctx))
+
+
+def run(n_mounts: int, iterations: int):
+  names, mounts, common, page = _context(n_mounts)
+  with A.app.test_request_context('/'):
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+      _cards(names, mounts, common, cached=False)
+      render_template_string(A.HTML, **page)
+    before = (time.perf_counter() - t0) / iterations
+    A.fragment_cache.clear()
+    t0 = time.perf_counter()
+    for _ in range(iterations):
+      _cards(names, mounts, common, cached=True)
+      A.render_page('index', **page)
+    after = (time.perf_counter() - t0) / iterations
+  print(f'mounts={n_mounts} iteraties={iterations}')
+  print(f'  render_template_string : {before * 1000:8.2f} ms/request')
+  print(f'  precompiled + fragments: {after * 1000:8.2f} ms/request  (x{before / after:.1f})')
+
+
+if __name__ == '__main__':
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+  it = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+  run(n, it)
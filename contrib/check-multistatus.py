@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Controle: MultiStatusCollector tegen lokale nep-Icecasts (up, traag, geweigerd).
+
+Start per soort een kleine HTTP-server met status-json.xsl en controleert dat
+gezonde instanties altijd binnenkomen, ook als er meer hangende instanties zijn
+dan `workers` (dan staan de gezonde in de wachtrij), dat trage als 'timeout'
+en geweigerde als fout gemeld worden, en dat de totalen kloppen.
+
+Gebruik (vanuit /opt/ingest-admin):
+  venv/bin/python contrib/check-multistatus.py [hangend] [workers]
+Exitcode 0 = alles goed.
+"""
+import os, sys, json, time, socket, threading
+import http.server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from httppool import HTTPPool  # noqa: E402
+from multistatus import MultiStatusCollector  # noqa: E402
+
+
+def _server(listeners: dict, delay: float = 0.0) -> int:
+  body = json.dumps({'icestats': {'source': [{'listenurl': f'http://x{m}', 'listeners': n} for m, n in listeners.items()]}}).encode()
+
+  class H(http.server.BaseHTTPRequestHandler):
+    def log_message(self, *a):
+      pass
+
+    def do_GET(self):
+      time.sleep(delay)
+      try:
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+      except OSError:
+        pass
+
+  srv = http.server.ThreadingHTTPServer(('127.0.0.1', 0), H)
+  srv.daemon_threads = True
+  threading.Thread(target=srv.serve_forever, daemon=True).start()
+  return srv.server_address[1]
+
+
+def _refused_port() -> int:
+  s = socket.socket()
+  s.bind(('127.0.0.1', 0))
+  port = s.getsockname()[1]
+  s.close()
+  return port
+
+
+def run(hung: int, workers: int) -> int:
+  timeout = 0.5
+  services = []
+  # Eerst de hangende instanties, zodat de gezonde achter in de wachtrij van de pool staan
+  for i in range(hung):
+    services.append((100 + i, f'Traag {i}', _server({'/slow.mp3': 1}, delay=timeout * 4)))
+  services.append((1, 'A', _server({'/live.mp3': 5, '/auto.mp3': 2})))
+  services.append((2, 'B', _server({'/live.mp3': 7})))
+  services.append((3, 'Weg', _refused_port()))
+  http_pool = HTTPPool(connect_timeout=0.5, read_timeout=timeout)
+  coll = MultiStatusCollector(http_pool, lambda: services, 'http://127.0.0.1:{port}/status-json.xsl',
+                              timeout=timeout, workers=workers, ttl=0)
+  t0 = time.time()
+  data = coll.collect(refresh=True)
+  took = time.time() - t0
+  by_id = {i['id']: i for i in data['instances']}
+  failures = []
+
+  def check(cond, msg):
+    if not cond:
+      failures.append(msg)
+  check(by_id[1]['ok'] and by_id[1]['listeners'] == 7, f"A: {by_id[1]}")
+  check(by_id[2]['ok'] and by_id[2]['listeners'] == 7, f"B: {by_id[2]}")
+  check(not by_id[3]['ok'] and by_id[3]['error'] and by_id[3]['error'] != 'timeout', f"Weg: {by_id[3]}")
+  check(all(not by_id[100 + i]['ok'] for i in range(hung)), 'trage instanties horen te falen')
+  check(data['totals']['listeners'] == 14 and data['totals']['up'] == 2, f"totalen: {data['totals']}")
+  live = next((m for m in data['mounts'] if m['mount'] == '/live.mp3'), None)
+  check(live is not None and live['listeners'] == 12, f"per mount: {data['mounts']}")
+  waves = -(-len(services) // workers)
+  check(took < waves * (timeout + 0.5 + 0.5) + 1.0, f'duurde {took:.2f} s')
+  print(f'instanties={len(services)} hangend={hung} workers={workers} duur={took:.2f}s')
+  for f in failures:
+    print(f'  FOUT: {f}')
+  print('OK' if not failures else f'{len(failures)} fout(en)')
+  return 1 if failures else 0
+
+
+if __name__ == '__main__':
+  hung = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+  workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+  sys.exit(run(hung, workers))
@@ -16,3 +16,43 @@ SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expi
 def get_session():
     return SessionLocal()
 
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic")
+
+def check_schema() -> dict:
+    """Vergelijk de Alembic-head(s) in alembic/versions met de revisie in de database.
+
+    Geeft {ok, heads, current, pending, error, checked_at}; 'ok' alleen als de
+    database precies op de head staat. Raakt de database met één query
+    (alembic_version) en voert nooit DDL uit.
+    """
+    import time
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    from alembic.runtime.migration import MigrationContext
+
+    out = {'ok': False, 'heads': [], 'current': [], 'pending': [], 'error': '', 'checked_at': time.time()}
+    try:
+        cfg = Config()
+        cfg.set_main_option("script_location", ALEMBIC_DIR)
+        script = ScriptDirectory.from_config(cfg)
+        out['heads'] = sorted(script.get_heads())
+        with engine.connect() as conn:
+            out['current'] = sorted(MigrationContext.configure(conn).get_current_heads())
+        if out['current'] != out['heads']:
+            # Revisies tussen de huidige stand en de head(s): wat `alembic upgrade head` nog zou doen
+            base = out['current'] or [None]
+            pending = []
+            for head in out['heads']:
+                for cur in base:
+                    try:
+                        for rev in script.iterate_revisions(head, cur):
+                            if rev.revision not in pending:
+                                pending.append(rev.revision)
+                    except Exception:
+                        continue
+            out['pending'] = pending[::-1]   # in volgorde van uitvoeren
+        out['ok'] = out['current'] == out['heads']
+    except Exception as e:
+        out['error'] = str(e)
+    return out
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import os, time, logging, threading
+
+from sqlalchemy import event, select, func, text
+
+log = logging.getLogger('ingest-admin')
+
+
+class DBHealth:
+  """DB-gezondheid zonder de pool bij elke paginaweergave te belasten.
+
+  Een achtergrondthread doet elke `interval` seconden een `SELECT 1` en
+  onthoudt uitkomst en latency; de badge en /db-status lezen alleen die
+  momentopname. Tabeltellingen komen uit één query met scalar subqueries en
+  worden `counts_ttl` seconden gecachet. Pool-events tellen invalidaties en
+  mislukte pre-pings.
+  """
+
+  def __init__(self, engine, tables: dict, interval: float = 15.0, counts_ttl: float = 60.0):
+    self.engine = engine
+    self.tables = tables   # naam -> model
+    self.interval = max(1.0, interval)
+    self.counts_ttl = counts_ttl
+    self._lock = threading.Lock()
+    self._thread = None
+    self._pid = None
+    self._last = None      # {ok, latency_ms, error, at}
+    self._counts = None    # (at, {naam: n})
+    self.probes = 0
+    self.failures = 0
+    self.pre_ping_failures = 0
+    self.invalidated = 0
+    event.listen(engine, 'handle_error', self._on_error)
+    event.listen(engine.pool, 'invalidate', self._on_invalidate)
+
+  def _on_error(self, ctx):
+    if getattr(ctx, 'is_pre_ping', False):
+      with self._lock:
+        self.pre_ping_failures += 1
+
+  def _on_invalidate(self, dbapi_conn, record, exc):
+    with self._lock:
+      self.invalidated += 1
+
+  # -- achtergrond --
+
+  def start(self):
+    if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+      return
+    with self._lock:
+      if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+        return
+      self._pid = os.getpid()
+      self._last = None   # momentopname van de parent hoort niet bij deze worker
+      self._thread = threading.Thread(target=self._run, name='db-health', daemon=True)
+      self._thread.start()
+
+  def _run(self):
+    while True:
+      self.probe()
+      time.sleep(self.interval)
+
+  def probe(self) -> dict:
+    t0 = time.perf_counter()
+    try:
+      with self.engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+      res = {'ok': True, 'error': ''}
+    except Exception as e:
+      res = {'ok': False, 'error': str(e)}
+    res.update(latency_ms=round((time.perf_counter() - t0) * 1000, 1), at=time.time())
+    with self._lock:
+      self.probes += 1
+      if not res['ok']:
+        self.failures += 1
+      if not res['ok'] and (self._last is None or self._last['ok']):
+        log.warning('DB health: %s', res['error'])
+      self._last = res
+    return res
+
+  # -- lezen --
+
+  def ok(self) -> bool | None:
+    """Uitkomst van de laatste probe; None als er (nog) geen recente is."""
+    self.start()
+    last = self._last
+    if last is None or time.time() - last['at'] > 3 * self.interval:
+      return None
+    return last['ok']
+
+  def counts(self) -> dict:
+    """Rijen per tabel in één query (gecachet)."""
+    now = time.time()
+    with self._lock:
+      if self._counts is not None and now - self._counts[0] < self.counts_ttl:
+        return self._counts[1]
+    stmt = select(*[select(func.count()).select_from(model).scalar_subquery().label(name)
+                    for name, model in self.tables.items()])
+    with self.engine.connect() as conn:
+      row = conn.execute(stmt).one()
+    out = dict(zip(self.tables, row))
+    with self._lock:
+      self._counts = (now, out)
+    return out
+
+  def pool_stats(self) -> dict:
+    pool = self.engine.pool
+    out = {'class': type(pool).__name__}
+    for key in ('size', 'checkedin', 'checkedout', 'overflow'):
+      fn = getattr(pool, key, None)
+      if callable(fn):
+        try:
+          out[key] = fn()
+        except Exception:
+          pass
+    with self._lock:
+      out.update(invalidated=self.invalidated, pre_ping_failures=self.pre_ping_failures)
+    return out
+
+  def snapshot(self) -> dict:
+    self.start()
+    with self._lock:
+      last = dict(self._last) if self._last else None
+      probes, failures = self.probes, self.failures
+    return {
+      'ok': self.ok(),
+      'latency_ms': last['latency_ms'] if last else None,
+      'error': last['error'] if last else '',
+      'checked_at': last['at'] if last else None,
+      'age': round(time.time() - last['at'], 1) if last else None,
+      'interval': self.interval,
+      'probes': probes,
+      'failures': failures,
+      'pool': self.pool_stats(),
+    }
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import os, mmap, time, hashlib, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, update, func
+
+from db import get_session
+from models import MediaTrack
+
+CHUNK = 8 * 1024 * 1024
+PROBE = 64 * 1024
+
+
+def file_sha256(path: str) -> str:
+  """sha256 van het hele bestand via mmap in chunks (hashlib geeft de GIL vrij, dus parallel per thread)."""
+  h = hashlib.sha256()
+  with open(path, 'rb') as f:
+    size = os.fstat(f.fileno()).st_size
+    if not size:
+      return h.hexdigest()
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      try:
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+      except (AttributeError, OSError):
+        pass
+      with memoryview(mm) as mv:
+        for off in range(0, size, CHUNK):
+          h.update(mv[off:off + CHUNK])
+  return h.hexdigest()
+
+
+def _probe(path: str) -> bytes:
+  """Goedkope voorselectie: hash van eerste en laatste PROBE bytes."""
+  with open(path, 'rb') as f:
+    size = os.fstat(f.fileno()).st_size
+    head = os.pread(f.fileno(), PROBE, 0)
+    tail = os.pread(f.fileno(), PROBE, max(0, size - PROBE)) if size > PROBE else b''
+  return hashlib.blake2b(head + tail, digest_size=16).digest()
+
+
+class DuplicateFinder:
+  """Dubbele bestanden (zelfde inhoud) over alle mappen, op basis van media_tracks.
+
+  Alleen bestanden met een gedeelde grootte komen in aanmerking; daarbinnen
+  worden eerst kop+staart vergeleken en pas bij een match het hele bestand
+  gehasht. De sha256 blijft in media_tracks staan (de indexer wist hem bij een
+  gewijzigde size/mtime), dus een volgende ronde hasht alleen nieuwe kandidaten.
+  """
+
+  def __init__(self, root: str, workers: int = 4, report_ttl: float = 60.0):
+    self.root = root
+    self.workers = max(1, workers)
+    self.report_ttl = report_ttl
+    self._lock = threading.Lock()
+    self._report = None
+    self._report_at = 0.0
+    self.hashed = 0
+    self.hashed_bytes = 0
+    self.last_run = None
+
+  def _path(self, d: str, name: str) -> str:
+    return os.path.join(self.root, d, name)
+
+  def _hash_rows(self, db, rows, pool) -> int:
+    """rows: [(id, dir, name, size)] → sha256 opslaan; geeft aantal gehashte bestanden."""
+    def one(r):
+      try:
+        return r[0], file_sha256(self._path(r[1], r[2]))
+      except OSError:
+        return r[0], None
+    done = [(tid, digest) for tid, digest in pool.map(one, rows) if digest]
+    for i in range(0, len(done), 500):
+      db.execute(update(MediaTrack), [{'id': tid, 'sha256': digest} for tid, digest in done[i:i + 500]])
+    db.commit()
+    self.hashed += len(done)
+    self.hashed_bytes += sum(r[3] for r in rows)
+    return len(done)
+
+  def run(self) -> dict:
+    """Hash alle kandidaten zonder sha256; bedoeld als stap na een indexronde."""
+    t0 = time.time()
+    db = get_session()
+    pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dupes-hash')
+    try:
+      sizes = select(MediaTrack.size).where(MediaTrack.size > 0).group_by(MediaTrack.size).having(func.count() > 1).subquery()
+      rows = db.execute(select(MediaTrack.id, MediaTrack.dir, MediaTrack.name, MediaTrack.size, MediaTrack.sha256)
+                        .where(MediaTrack.size.in_(select(sizes.c.size))).order_by(MediaTrack.size)).all()
+      groups = {}
+      for r in rows:
+        groups.setdefault(r.size, []).append(r)
+      todo = []
+      probe_rows = [r for g in groups.values() if any(x.sha256 is None for x in g) for r in g]
+
+      def probe(r):
+        try:
+          return r, _probe(self._path(r.dir, r.name))
+        except OSError:
+          return r, None
+      by_probe = {}
+      for r, p in pool.map(probe, probe_rows):
+        if p is not None:
+          by_probe.setdefault((r.size, p), []).append(r)
+      for members in by_probe.values():
+        if len(members) > 1:
+          todo.extend((r.id, r.dir, r.name, r.size) for r in members if r.sha256 is None)
+      hashed = self._hash_rows(db, todo, pool) if todo else 0
+    finally:
+      pool.shutdown(wait=True)
+      db.close()
+    with self._lock:
+      self._report = None
+    self.last_run = {'at': t0, 'candidates': len(rows), 'probed': len(probe_rows), 'hashed': hashed,
+                     'seconds': round(time.time() - t0, 3)}
+    return self.last_run
+
+  def report(self, limit: int = 50) -> dict:
+    """Dubbele groepen (grootste winst eerst) en totaal terug te winnen bytes; kort gecachet."""
+    now = time.time()
+    with self._lock:
+      if self._report is not None and self._report[0] == limit and now - self._report_at < self.report_ttl:
+        return self._report[1]
+    db = get_session()
+    try:
+      dup = (select(MediaTrack.sha256, func.count().label('n'), func.max(MediaTrack.size).label('size'))
+             .where(MediaTrack.sha256.is_not(None)).group_by(MediaTrack.sha256).having(func.count() > 1).subquery())
+      totals = db.execute(select(func.count(), func.sum(dup.c.n - 1), func.sum(dup.c.size * (dup.c.n - 1)))).one()
+      top = db.execute(select(dup.c.sha256, dup.c.n, dup.c.size)
+                       .order_by((dup.c.size * (dup.c.n - 1)).desc()).limit(limit)).all()
+      files = {}
+      if top:
+        for t in db.execute(select(MediaTrack.sha256, MediaTrack.dir, MediaTrack.name)
+                            .where(MediaTrack.sha256.in_([t.sha256 for t in top])).order_by(MediaTrack.dir, MediaTrack.name)):
+          files.setdefault(t.sha256, []).append(f"{t.dir}/{t.name}")
+    finally:
+      db.close()
+    out = {
+      'groups': int(totals[0] or 0),
+      'redundant_files': int(totals[1] or 0),
+      'reclaimable_bytes': int(totals[2] or 0),
+      'top': [{'sha256': t.sha256, 'size': t.size, 'count': t.n, 'reclaimable': t.size * (t.n - 1), 'files': files.get(t.sha256, [])}
+              for t in top],
+    }
+    with self._lock:
+      self._report = (limit, out)
+      self._report_at = now
+    return out
+
+  def existing(self, d: str, name: str, size: int, sha256: str) -> list[str]:
+    """Bestanden met dezelfde inhoud als het net geüploade `d/name` (sha256 al berekend bij het schrijven).
+
+    Kandidaten met dezelfde grootte en een opgeslagen hash worden direct
+    vergeleken. Kandidaten zonder hash krijgen eerst de kop+staart-probe (meestal
+    0-1 bestanden); alleen bij een match wordt het hele bestand gehasht en die
+    hash opgeslagen. De eigen rij staat via LibraryIndexer.note_file al met hash
+    in media_tracks.
+    """
+    db = get_session()
+    try:
+      rows = db.execute(select(MediaTrack.id, MediaTrack.dir, MediaTrack.name, MediaTrack.sha256)
+                        .where(MediaTrack.size == size)).all()
+      rows = [r for r in rows if (r.dir, r.name) != (d, name)]
+      same = [r for r in rows if r.sha256 == sha256]
+      unknown = [r for r in rows if r.sha256 is None]
+      if unknown:
+        own = _probe(self._path(d, name))
+        hashed = []
+        for r in unknown:
+          path = self._path(r.dir, r.name)
+          try:
+            if _probe(path) != own:
+              continue
+            digest = file_sha256(path)
+          except OSError:
+            continue
+          hashed.append({'id': r.id, 'sha256': digest})
+          if digest == sha256:
+            same.append(r)
+        if hashed:
+          db.execute(update(MediaTrack), hashed)
+          db.commit()
+          self.hashed += len(hashed)
+          self.hashed_bytes += size * len(hashed)
+          with self._lock:
+            self._report = None
+    finally:
+      db.close()
+    return sorted(f"{r.dir}/{r.name}" for r in same)
+
+  def stats(self) -> dict:
+    return {'hashed': self.hashed, 'hashed_bytes': self.hashed_bytes, 'last_run': self.last_run}
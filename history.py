@@ -0,0 +1,309 @@
+from __future__ import annotations
+import os, sys, time, fcntl, logging, tempfile, threading
+from array import array
+
+from sqlalchemy import select, delete, and_, or_, tuple_
+
+from db import get_session
+from models import ListenerHistory
+
+log = logging.getLogger('ingest-admin')
+
+MISSING = 0xFFFFFFFF
+TOTAL_MOUNT = '*'   # pseudo-mount met het totaal over alle mounts
+
+# (resolutie in s, slots per chunk): raw 10 s → 1 h per rij, 1 min → 6 h, 1 h → 15 dagen
+TIERS = ((10, 360), (60, 360), (3600, 360))
+AUTO_POINTS = 2000    # automatische resolutie: grofste die hieronder blijft
+MAX_POINTS = 10000    # harde grens per antwoord, ook bij een expliciete res
+
+
+def _pack(arr: array) -> bytes:
+  if sys.byteorder == 'big':
+    arr = array('I', arr); arr.byteswap()
+  return arr.tobytes()
+
+
+def _unpack(raw: bytes) -> array:
+  arr = array('I')
+  arr.frombytes(raw or b'')
+  if sys.byteorder == 'big':
+    arr.byteswap()
+  return arr
+
+
+class _Chunk:
+  __slots__ = ('avg', 'peak', 'dirty')
+
+  def __init__(self, slots: int):
+    self.avg = array('I', [MISSING]) * slots
+    self.peak = array('I', [MISSING]) * slots
+    self.dirty = False
+
+
+class _Acc:
+  """Lopende aggregatie (som/aantal/max) voor het huidige slot van één tier."""
+  __slots__ = ('slot', 'total', 'count', 'peak')
+
+  def __init__(self, slot: int):
+    self.slot = slot
+    self.total = 0
+    self.count = 0
+    self.peak = 0
+
+
+class ListenerHistoryStore:
+  """In-memory, array-backed luisterhistorie per mount met batch-flush naar de DB.
+
+  Elke meting (van de Icecast poller) gaat direct in alle resoluties (TIERS);
+  per slot worden gemiddelde en piek bijgehouden. Chunks van `slots` waarden
+  worden als één rij (uint32 arrays) opgeslagen; flush() schrijft alle
+  gewijzigde chunks in één transactie en vult lege slots aan met wat al in de
+  DB stond (een herstart overschrijft dus niets).
+
+  Alle workers aggregeren in het geheugen (het lopende slot is zo overal
+  zichtbaar), maar alleen de worker met de flock op `lock_path` schrijft naar
+  de DB; valt die weg, dan neemt een andere het bij de volgende flush over.
+  Chunks blijven in het geheugen tot ze geschreven zijn. Oude chunks worden
+  per resolutie opgeruimd volgens `retention`.
+  """
+
+  def __init__(self, retention: dict, flush_interval: float = 300.0, tiers=TIERS, lock_path: str | None = None):
+    self.tiers = tuple(tiers)
+    self.retention = dict(retention)
+    self.flush_interval = flush_interval
+    self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), 'ingest-admin-history.lock')
+    self._writer = None   # (pid, open lockbestand) zolang deze worker de schrijver is
+    self._lock = threading.Lock()
+    self._chunks = {}   # (mount, res, chunk_start) -> _Chunk
+    self._acc = {}      # (mount, res) -> _Acc
+    self._thread = None
+    self._pid = None
+    self.samples = 0
+    self.flushes = 0
+    self.rows_written = 0
+    self.last_flush = 0.0
+
+  # -- schrijven --
+
+  def _chunk_for(self, mount: str, res: int, slots: int, slot: int) -> tuple[_Chunk, int]:
+    span = res * slots
+    start = (slot * res) // span * span
+    key = (mount, res, start)
+    ch = self._chunks.get(key)
+    if ch is None:
+      ch = self._chunks[key] = _Chunk(slots)
+    return ch, (slot * res - start) // res
+
+  def _finalize(self, mount: str, res: int, slots: int, acc: _Acc):
+    if not acc.count:
+      return
+    ch, i = self._chunk_for(mount, res, slots, acc.slot)
+    ch.avg[i] = int(round(acc.total / acc.count))
+    ch.peak[i] = acc.peak
+    ch.dirty = True
+
+  def record(self, ts: float, counts: dict):
+    """Verwerk één meting {mount: luisteraars}; het totaal komt onder TOTAL_MOUNT."""
+    counts = dict(counts)
+    counts[TOTAL_MOUNT] = sum(counts.values())
+    with self._lock:
+      self.samples += 1
+      for mount, value in counts.items():
+        value = max(0, int(value))
+        for res, slots in self.tiers:
+          slot = int(ts) // res
+          acc = self._acc.get((mount, res))
+          if acc is None or acc.slot != slot:
+            acc = self._acc[(mount, res)] = _Acc(slot)
+          acc.total += value
+          acc.count += 1
+          if value > acc.peak:
+            acc.peak = value
+          # Slotwaarde direct bijwerken: het lopende slot is zo ook zichtbaar voor queries
+          self._finalize(mount, res, slots, acc)
+    self._ensure_started()
+
+  # -- flush / retentie --
+
+  def _ensure_started(self):
+    if self._pid == os.getpid() or not self.flush_interval:
+      return
+    self._pid = os.getpid()
+    self._thread = threading.Thread(target=self._run, name='listener-history', daemon=True)
+    self._thread.start()
+
+  def _run(self):
+    while True:
+      time.sleep(self.flush_interval)
+      try:
+        self.flush()
+      except Exception as e:
+        log.warning('listener history flush: %s', e)
+
+  def _is_writer(self) -> bool:
+    """Probeer (opnieuw) de schrijverslock te pakken; blijft vastgehouden tot het proces stopt."""
+    if self._writer is not None and self._writer[0] == os.getpid():
+      return True
+    f = open(self.lock_path, 'a')
+    try:
+      fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+      f.close()
+      return False
+    self._writer = (os.getpid(), f)
+    return True
+
+  def _evict(self, now: float):
+    """Afgesloten, al geschreven chunks (ouder dan het lopende) uit het geheugen halen."""
+    with self._lock:
+      for (mount, res, start) in list(self._chunks):
+        span = res * dict(self.tiers)[res]
+        if start + span < now - span and not self._chunks[(mount, res, start)].dirty:
+          del self._chunks[(mount, res, start)]
+
+  def flush(self) -> int:
+    """Schrijf gewijzigde chunks in één transactie; geeft het aantal rijen (0 als een andere worker schrijft)."""
+    now = time.time()
+    if not self._is_writer():
+      # De schrijver heeft dezelfde metingen; hier alleen het geheugen opruimen
+      with self._lock:
+        for c in self._chunks.values():
+          c.dirty = False
+      self._evict(now)
+      return 0
+    with self._lock:
+      dirty = {k: (array('I', c.avg), array('I', c.peak)) for k, c in self._chunks.items() if c.dirty}
+      for k in dirty:
+        self._chunks[k].dirty = False
+    if not dirty:
+      self._evict(now)
+      self._purge(now)
+      return 0
+    db = None
+    try:
+      db = get_session()
+      existing = {}
+      keys = list(dirty)
+      for i in range(0, len(keys), 500):
+        batch = keys[i:i + 500]
+        rows = db.execute(select(ListenerHistory).where(
+          tuple_(ListenerHistory.mount, ListenerHistory.resolution, ListenerHistory.bucket_start).in_(batch)
+        )).scalars()
+        for row in rows:
+          existing[(row.mount, row.resolution, row.bucket_start)] = row
+      for key, (avg, peak) in dirty.items():
+        row = existing.get(key)
+        if row is None:
+          db.add(ListenerHistory(mount=key[0], resolution=key[1], bucket_start=key[2], samples=_pack(avg), peaks=_pack(peak)))
+          continue
+        old_avg, old_peak = _unpack(row.samples), _unpack(row.peaks)
+        for j in range(min(len(avg), len(old_avg))):
+          if avg[j] == MISSING:
+            avg[j] = old_avg[j]
+            peak[j] = old_peak[j]
+        row.samples = _pack(avg)
+        row.peaks = _pack(peak)
+      db.commit()
+    except Exception:
+      if db is not None:
+        db.rollback()
+      # Niet geschreven: chunks blijven (dirty) in het geheugen voor de volgende flush
+      with self._lock:
+        for k in dirty:
+          self._chunks[k].dirty = True
+      raise
+    finally:
+      if db is not None:
+        db.close()
+    self.flushes += 1
+    self.rows_written += len(dirty)
+    self.last_flush = now
+    self._evict(now)
+    self._purge(now)
+    return len(dirty)
+
+  def _purge(self, now: float):
+    conds = []
+    for res, slots in self.tiers:
+      keep = self.retention.get(res)
+      if keep:
+        conds.append(and_(ListenerHistory.resolution == res, ListenerHistory.bucket_start < int(now - keep - res * slots)))
+    if not conds:
+      return
+    db = get_session()
+    try:
+      db.execute(delete(ListenerHistory).where(or_(*conds)))
+      db.commit()
+    finally:
+      db.close()
+
+  # -- lezen --
+
+  def pick_resolution(self, start: float, end: float, now: float | None = None) -> int:
+    """Fijnste resolutie die ~<= AUTO_POINTS punten geeft en waarvan `start` nog binnen de retentie valt."""
+    now = time.time() if now is None else now
+    for res, _ in self.tiers:
+      keep = self.retention.get(res)
+      if keep and start < now - keep:
+        continue
+      if (end - start) / res <= AUTO_POINTS:
+        return res
+    return self.tiers[-1][0]
+
+  def query(self, mount: str, start: float, end: float, res: int | None = None) -> dict:
+    """Punten [ts, gemiddelde, piek] voor `mount` in [start, end), uit DB + geheugen."""
+    res = res or self.pick_resolution(start, end)
+    slots = dict(self.tiers).get(res)
+    if not slots:
+      raise ValueError(f'onbekende resolutie {res}')
+    if (end - start) / res > MAX_POINTS:
+      raise ValueError(f'te veel punten ({int((end - start) // res)} > {MAX_POINTS}); kies een grovere res of korter bereik')
+    span = res * slots
+    first = int(start) // span * span
+    chunks = {}
+    db = get_session()
+    try:
+      rows = db.execute(select(ListenerHistory).where(
+        ListenerHistory.mount == mount, ListenerHistory.resolution == res,
+        ListenerHistory.bucket_start >= first, ListenerHistory.bucket_start < int(end),
+      )).scalars()
+      for row in rows:
+        chunks[row.bucket_start] = (_unpack(row.samples), _unpack(row.peaks))
+    finally:
+      db.close()
+    with self._lock:
+      for (m, r, cs), ch in self._chunks.items():
+        if m != mount or r != res or cs < first or cs >= end:
+          continue
+        avg, peak = array('I', ch.avg), array('I', ch.peak)
+        old = chunks.get(cs)
+        if old is not None:
+          for j in range(min(len(avg), len(old[0]))):
+            if avg[j] == MISSING:
+              avg[j] = old[0][j]
+              peak[j] = old[1][j]
+        chunks[cs] = (avg, peak)
+    points = []
+    for cs in sorted(chunks):
+      avg, peak = chunks[cs]
+      for j, v in enumerate(avg):
+        ts = cs + j * res
+        if v != MISSING and start <= ts < end:
+          points.append([ts, v, peak[j]])
+    return {'mount': mount, 'resolution': res, 'from': int(start), 'to': int(end), 'points': points}
+
+  def mounts(self) -> list[str]:
+    with self._lock:
+      return sorted({m for (m, _r) in self._acc})
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {
+        'samples': self.samples,
+        'chunks_in_memory': len(self._chunks),
+        'flushes': self.flushes,
+        'rows_written': self.rows_written,
+        'last_flush': self.last_flush or None,
+        'writer': self._writer is not None and self._writer[0] == os.getpid(),
+      }
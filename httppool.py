@@ -0,0 +1,143 @@
+from __future__ import annotations
+import os, ssl, time, threading, http.client
+from urllib.parse import urlsplit
+
+
+class HTTPPool:
+  """Keep-alive HTTP(S) verbindingen per base (scheme, host, port).
+
+  Verbindingen worden na een volledig gelezen response teruggezet in de pool
+  en bij de volgende request hergebruikt (geen nieuwe TCP/TLS handshake).
+  Connect- en read-timeout zijn apart instelbaar. Een hergebruikte verbinding
+  die de server intussen sloot wordt één keer transparant opnieuw opgezet.
+  """
+
+  def __init__(self, connect_timeout: float = 2.0, read_timeout: float = 5.0, max_idle: int = 4, idle_ttl: float = 30.0):
+    self.connect_timeout = connect_timeout
+    self.read_timeout = read_timeout
+    self.max_idle = max(0, max_idle)
+    self.idle_ttl = idle_ttl
+    self._lock = threading.Lock()
+    self._idle = {}    # (scheme, netloc) -> [(conn, last_used)]
+    self._busy = 0
+    self._pid = os.getpid()
+    self._ssl = None
+    self.requests = 0
+    self.reused = 0
+    self.opened = 0
+    self.retries = 0
+    self.errors = 0
+
+  def _check_fork(self):
+    if self._pid != os.getpid():
+      # Sockets van de parent niet delen met een geforkte worker
+      self._pid = os.getpid()
+      self._idle = {}
+      self._busy = 0
+
+  def _new_conn(self, scheme: str, netloc: str):
+    if scheme == 'https':
+      if self._ssl is None:
+        self._ssl = ssl.create_default_context()
+      conn = http.client.HTTPSConnection(netloc, timeout=self.connect_timeout, context=self._ssl)
+    else:
+      conn = http.client.HTTPConnection(netloc, timeout=self.connect_timeout)
+    conn.connect()
+    with self._lock:
+      self.opened += 1
+    return conn
+
+  def _acquire(self, key):
+    now = time.time()
+    with self._lock:
+      self._check_fork()
+      idle = self._idle.get(key) or []
+      while idle:
+        conn, last = idle.pop()
+        if now - last <= self.idle_ttl and conn.sock is not None:
+          self._busy += 1
+          return conn, True
+        conn.close()
+      self._busy += 1
+    try:
+      return self._new_conn(*key), False
+    except Exception:
+      with self._lock:
+        self._busy -= 1
+      raise
+
+  def _release(self, key, conn, reusable: bool):
+    with self._lock:
+      self._busy = max(0, self._busy - 1)
+      idle = self._idle.setdefault(key, [])
+      if reusable and conn.sock is not None and len(idle) < self.max_idle:
+        idle.append((conn, time.time()))
+        return
+    conn.close()
+
+  def request(self, url: str, headers: dict | None = None, method: str = 'GET', read_timeout: float | None = None) -> tuple[int, bytes]:
+    """Voer een request uit; geeft (status, body). Gooit bij netwerkfouten (zoals urlopen)."""
+    parts = urlsplit(url)
+    key = (parts.scheme or 'http', parts.netloc)
+    path = parts.path or '/'
+    if parts.query:
+      path += '?' + parts.query
+    hdrs = {'Connection': 'keep-alive'}
+    if headers:
+      hdrs.update(headers)
+    with self._lock:
+      self.requests += 1
+    for attempt in (0, 1):
+      conn, reused = self._acquire(key)
+      try:
+        conn.sock.settimeout(read_timeout or self.read_timeout)
+        conn.request(method, path, headers=hdrs)
+        resp = conn.getresponse()
+        body = resp.read()
+      except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError, http.client.BadStatusLine) as e:
+        self._release(key, conn, False)
+        if reused and attempt == 0 and method in ('GET', 'HEAD'):
+          # Server sloot de idle verbinding: overige idle verbindingen zijn vermoedelijk ook dood,
+          # dus één keer opnieuw met een verse verbinding
+          with self._lock:
+            self.retries += 1
+            stale = self._idle.pop(key, [])
+          for c, _ in stale:
+            c.close()
+          continue
+        with self._lock:
+          self.errors += 1
+        raise e
+      except Exception:
+        self._release(key, conn, False)
+        with self._lock:
+          self.errors += 1
+        raise
+      if reused:
+        with self._lock:
+          self.reused += 1
+      self._release(key, conn, not resp.will_close)
+      return resp.status, body
+    raise http.client.HTTPException('request failed')  # pragma: no cover
+
+  def stats(self) -> dict:
+    with self._lock:
+      self._check_fork()
+      idle = {f"{k[0]}://{k[1]}": len(v) for k, v in self._idle.items() if v}
+      return {
+        'requests': self.requests,
+        'reused': self.reused,
+        'reuse_rate': round(self.reused / self.requests, 3) if self.requests else 0.0,
+        'opened': self.opened,
+        'retries': self.retries,
+        'errors': self.errors,
+        'open': sum(idle.values()) + self._busy,
+        'idle': idle,
+      }
+
+  def close(self):
+    with self._lock:
+      pools, self._idle = self._idle, {}
+    for idle in pools.values():
+      for conn, _ in idle:
+        conn.close()
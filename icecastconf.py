@@ -0,0 +1,234 @@
+from __future__ import annotations
+import os, re, time, difflib, hashlib, tempfile, threading
+from xml.sax.saxutils import escape
+
+from models import Service
+from svcsettings import iter_services, load_services
+
+_FILE_RE = re.compile(r'^service-(\d+)\.xml$')
+_SECRET_RE = re.compile(r'(<(?:source|relay|admin)-password>)[^<]*(</)')
+
+
+def _t(tag: str, value, indent: int = 4) -> str:
+  return f"{' ' * indent}<{tag}>{escape(str(value))}</{tag}>\n"
+
+
+def render_xml(svc: Service, paths: dict) -> bytes:
+  """Icecast-KH config voor één service (deterministisch: zelfde instellingen → zelfde bytes).
+
+  Uit de DB: poort, wachtwoorden, limieten (sources = mounts, clients =
+  listeners + mounts, limit-rate per mount = bitrate) en de Icecast-tab
+  (intro, YP, fallback/redirect, public). Bandbreedte/opslag zijn quota van
+  het panel en staan niet in icecast.xml.
+  """
+  lim, ice = svc.limits, svc.icecast
+  listeners = getattr(lim, 'listeners', None) or 0
+  mounts = getattr(lim, 'mounts', None) or 1
+  log_dir = os.path.join(paths['log_dir'], str(svc.id))
+  x = ['<?xml version="1.0"?>\n',
+       f'<!-- Gegenereerd door ingest-admin voor service {svc.id}; niet handmatig wijzigen -->\n',
+       '<icecast>\n',
+       _t('location', svc.name or f'Service {svc.id}', 2),
+       _t('admin', svc.owner or 'admin', 2),
+       '  <limits>\n',
+       _t('clients', listeners + mounts),
+       _t('sources', mounts),
+       '  </limits>\n',
+       '  <authentication>\n',
+       _t('source-password', svc.source_pass or ''),
+       _t('relay-user', 'relay'),
+       _t('relay-password', svc.relay_pass or ''),
+       _t('admin-user', 'admin'),
+       _t('admin-password', svc.admin_pass or ''),
+       '  </authentication>\n']
+  yp = getattr(ice, 'yp_url', '') or ''
+  if yp:
+    x += ['  <directory>\n', _t('yp-url-timeout', 15), _t('yp-url', yp), '  </directory>\n']
+  x += ['  <listen-socket>\n', _t('port', svc.port), '  </listen-socket>\n',
+        '  <mount type="default">\n',
+        _t('max-listeners', listeners)]
+  if getattr(lim, 'bitrate', None):
+    x.append(_t('limit-rate', f"{lim.bitrate}k"))
+  public = (getattr(ice, 'public_server', '') or '').strip().lower()
+  if public and not public.startswith('default'):
+    # Anders bepaalt de bron het zelf (ice-public header)
+    x.append(_t('public', 1 if public.startswith(('ja', 'altijd', 'yes', 'always')) else 0))
+  if getattr(ice, 'intro_path', ''):
+    x.append(_t('intro', ice.intro_path))
+  if getattr(ice, 'redirect_path', ''):
+    x += [_t('fallback-mount', ice.redirect_path), _t('fallback-override', 1)]
+  x += ['  </mount>\n',
+        '  <paths>\n',
+        _t('basedir', paths['basedir']),
+        _t('logdir', log_dir),
+        _t('webroot', paths['webroot']),
+        _t('adminroot', paths['adminroot']),
+        _t('pidfile', os.path.join(log_dir, 'icecast.pid')),
+        '  </paths>\n',
+        '  <logging>\n',
+        _t('accesslog', 'access.log'),
+        _t('errorlog', 'error.log'),
+        _t('loglevel', 3),
+        '  </logging>\n',
+        '</icecast>\n']
+  return ''.join(x).encode('utf-8')
+
+
+def _sha256(data: bytes) -> str:
+  return hashlib.sha256(data).hexdigest()
+
+
+def _mask(text: str) -> str:
+  return _SECRET_RE.sub(r'\1***\2', text)
+
+
+class IcecastConfig:
+  """Rendert per service `conf_dir/service-<id>.xml` en rolt alleen gewijzigde configs uit.
+
+  Vergelijking gaat op sha256 van de gerenderde bytes tegen het bestand op
+  disk; alleen bij een verschil wordt atomair geschreven (tempfile in
+  dezelfde map, fsync, rename) en `reload(id, poort)` aangeroepen, zodat opslaan
+  zonder echte wijziging geen enkele instantie herstart. Pas na een
+  geslaagde reload komt de hash in `.service-<id>.applied`; een config die
+  wel geschreven maar (nog) niet herladen is, telt daardoor als gewijzigd
+  (volgende apply probeert de reload opnieuw) en in drift() als 'not_applied'.
+  """
+
+  def __init__(self, conf_dir: str, reload, paths: dict, mode: int = 0o640):
+    self.conf_dir = conf_dir
+    self.reload = reload   # reload(svc_id, port) -> (melding, http-achtige code)
+    self.paths = paths
+    self.mode = mode
+    self._lock = threading.Lock()
+    self.runs = 0
+    self.written = 0
+    self.reloads = 0
+    self.reload_failures = 0
+    self.last_at = None
+
+  def path_for(self, svc_id: int) -> str:
+    return os.path.join(self.conf_dir, f'service-{svc_id}.xml')
+
+  def applied_path(self, svc_id: int) -> str:
+    return os.path.join(self.conf_dir, f'.service-{svc_id}.applied')
+
+  def _applied(self, svc_id: int) -> str:
+    """sha256 van de config die de instantie na de laatste geslaagde reload draait ('' = onbekend)."""
+    try:
+      with open(self.applied_path(svc_id)) as f:
+        return f.read().strip()
+    except OSError:
+      return ''
+
+  def _deployed(self, svc_id: int) -> bytes | None:
+    try:
+      with open(self.path_for(svc_id), 'rb') as f:
+        return f.read()
+    except FileNotFoundError:
+      return None
+
+  def _write(self, path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.service-', suffix='.xml.tmp', dir=os.path.dirname(path))
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+      os.chmod(tmp, self.mode)
+      os.replace(tmp, path)
+    except BaseException:
+      try:
+        os.unlink(tmp)
+      except OSError:
+        pass
+      raise
+    dfd = os.open(os.path.dirname(path), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+      os.fsync(dfd)
+    finally:
+      os.close(dfd)
+
+  def _services(self, db, ids=None):
+    return load_services(db, ids) if ids is not None else iter_services(db)
+
+  def apply(self, db, ids=None, reload: bool = True, dry_run: bool = False) -> list[dict]:
+    """Schrijf gewijzigde configs (None = alle services) en herlaad alleen die instanties."""
+    out = []
+    for svc in self._services(db, ids):
+      data = render_xml(svc, self.paths)
+      digest = _sha256(data)
+      cur = self._deployed(svc.id)
+      on_disk = cur is not None and _sha256(cur) == digest
+      r = {'id': svc.id, 'name': svc.name, 'port': svc.port, 'sha256': digest,
+           'changed': not on_disk or self._applied(svc.id) != digest,
+           'written': False, 'reloaded': None, 'error': ''}
+      if r['changed'] and not dry_run:
+        if not on_disk:
+          try:
+            self._write(self.path_for(svc.id), data)
+            r['written'] = True
+          except OSError as e:
+            r['error'] = str(e)
+        if not r['error'] and reload:
+          msg, code = self.reload(svc.id, svc.port)
+          r['reloaded'] = code == 200
+          if code == 200:
+            try:
+              self._write(self.applied_path(svc.id), (digest + '\n').encode())
+            except OSError as e:
+              r['error'] = f'herladen, maar {self.applied_path(svc.id)} niet bijgewerkt: {e}'
+          else:
+            r['error'] = msg
+      out.append(r)
+    if not dry_run:
+      with self._lock:
+        self.runs += 1
+        self.written += sum(1 for r in out if r['written'])
+        self.reloads += sum(1 for r in out if r['reloaded'])
+        self.reload_failures += sum(1 for r in out if r['reloaded'] is False)
+        self.last_at = time.time()
+    return out
+
+  def drift(self, db, diff_for: int | None = None) -> dict:
+    """DB vs. uitgerolde config: per service in_sync/drift/missing/not_applied, plus bestanden zonder service.
+
+    not_applied: het bestand klopt met de DB, maar de instantie is er (nog) niet
+    succesvol mee herladen.
+
+    Met `diff_for` krijgt die service een unified diff (wachtwoorden gemaskeerd).
+    """
+    services, known = [], set()
+    for svc in self._services(db):
+      known.add(svc.id)
+      data = render_xml(svc, self.paths)
+      cur = self._deployed(svc.id)
+      digest = _sha256(data)
+      if cur is None:
+        state = 'missing'
+      elif _sha256(cur) != digest:
+        state = 'drift'
+      else:
+        state = 'in_sync' if self._applied(svc.id) == digest else 'not_applied'
+      entry = {'id': svc.id, 'name': svc.name, 'port': svc.port, 'state': state, 'path': self.path_for(svc.id)}
+      if diff_for == svc.id and state in ('drift', 'missing'):
+        entry['diff'] = ''.join(difflib.unified_diff(
+          _mask((cur or b'').decode('utf-8', 'replace')).splitlines(True), _mask(data.decode('utf-8')).splitlines(True),
+          'deployed', 'database'))
+      services.append(entry)
+    orphans = []
+    try:
+      for name in sorted(os.listdir(self.conf_dir)):
+        m = _FILE_RE.match(name)
+        if m and int(m.group(1)) not in known:
+          orphans.append(os.path.join(self.conf_dir, name))
+    except OSError:
+      pass
+    counts = {k: sum(1 for s in services if s['state'] == k) for k in ('in_sync', 'drift', 'missing', 'not_applied')}
+    return {'conf_dir': self.conf_dir, 'counts': dict(counts, orphans=len(orphans)),
+            'services': services, 'orphans': orphans}
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {'conf_dir': self.conf_dir, 'runs': self.runs, 'written': self.written, 'reloads': self.reloads,
+              'reload_failures': self.reload_failures, 'age': round(time.time() - self.last_at, 1) if self.last_at else None}
@@ -0,0 +1,273 @@
+from __future__ import annotations
+import os, time, fcntl, logging, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, insert, update, delete, func, or_
+from sqlalchemy.exc import IntegrityError
+
+from db import get_session
+from models import MediaTrack
+from mediaindex import iter_files
+from mp3meta import read_tags
+
+log = logging.getLogger('ingest-admin')
+
+BATCH = 256
+
+
+class LibraryIndexer:
+  """Achtergrondindex van ID3/Xing-metadata voor alle mp3's onder `root` (tabel media_tracks).
+
+  Per map worden size/mtime_ns van disk vergeleken met de DB; alleen nieuwe of
+  gewijzigde bestanden worden (door een pool van `workers` threads) gelezen,
+  verdwenen bestanden worden verwijderd. Een volledige ronde draait elke
+  `interval` seconden; touch(dir) plant een map direct opnieuw in. Een flock
+  zorgt dat bij meerdere workers maar één proces tegelijk indexeert; het
+  tijdstip van de laatste volledige ronde staat naast de lock (`<lock>.full`),
+  zodat die ronde ook over workers heen maar eens per `interval` draait. Na
+  een fout (bijv. DB of tabel ontbreekt) wacht de lus exponentieel langer, tot
+  maximaal `interval`.
+  """
+
+  def __init__(self, root: str, list_dirs, interval: float = 900.0, workers: int = 4, lock_path: str | None = None,
+               after_scan=None):
+    self.root = root
+    self.list_dirs = list_dirs
+    self.interval = max(10.0, interval)
+    self.workers = max(1, workers)
+    self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), 'ingest-admin-library.lock')
+    self.after_scan = after_scan   # bijv. DuplicateFinder.run, onder dezelfde lock en alleen na een volledige ronde
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._dirty = set()
+    self._full_at = 0.0
+    self._failures = 0
+    self._thread = None
+    self._pid = None
+    self.scans = 0
+    self.files_read = 0
+    self.errors = 0
+    self.last_scan = None   # {at, dirs, files, read, removed, seconds}
+
+  # -- achtergrond --
+
+  def start(self):
+    if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+      return
+    with self._lock:
+      if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+        return
+      self._pid = os.getpid()
+      self._thread = threading.Thread(target=self._run, name='library-index', daemon=True)
+      self._thread.start()
+
+  def touch(self, dir_name: str):
+    """Map opnieuw laten indexeren (na upload/verwijderen)."""
+    with self._lock:
+      self._dirty.add(dir_name)
+    self.start()
+    self._wake.set()
+
+  def note_file(self, dir_name: str, name: str, sha256: str | None = None):
+    """Rij voor één net gepubliceerd bestand direct vastleggen, met de sha256 die de upload al berekende.
+
+    size/mtime_ns komen van disk, dus de volgende ronde ziet het bestand als
+    ongewijzigd en laat tags en hash staan.
+    """
+    full = os.path.join(self.root, dir_name, name)
+    st = os.stat(full)
+    row = dict(self._read(full), size=st.st_size, mtime_ns=st.st_mtime_ns, indexed_at=int(time.time()), sha256=sha256)
+    db = get_session()
+    try:
+      tid = db.execute(select(MediaTrack.id).where(MediaTrack.dir == dir_name, MediaTrack.name == name)).scalar()
+      if tid is None:
+        try:
+          db.execute(insert(MediaTrack), [dict(row, dir=dir_name, name=name)])
+          db.commit()
+          return
+        except IntegrityError:
+          # Net door een indexronde aangemaakt
+          db.rollback()
+          tid = db.execute(select(MediaTrack.id).where(MediaTrack.dir == dir_name, MediaTrack.name == name)).scalar()
+      db.execute(update(MediaTrack), [dict(row, id=tid)])
+      db.commit()
+    finally:
+      db.close()
+
+  def _stamp_path(self) -> str:
+    return self.lock_path + '.full'
+
+  def _last_full(self) -> float:
+    """Laatste volledige ronde van welke worker dan ook (mtime van het stampbestand)."""
+    try:
+      return max(self._full_at, os.stat(self._stamp_path()).st_mtime)
+    except OSError:
+      return self._full_at
+
+  def _run(self):
+    while True:
+      with self._lock:
+        full = time.time() - self._last_full() >= self.interval
+        dirs = None if full else sorted(self._dirty)
+      busy = False
+      if full or dirs:
+        try:
+          busy = not self._scan_locked(dirs)
+          self._failures = 0
+        except Exception as e:
+          self.errors += 1
+          self._failures += 1
+          log.warning('library index (poging %d): %s', self._failures, e)
+      with self._lock:
+        pending = bool(self._dirty)
+      if self._failures:
+        wait = min(self.interval, 5 * 2 ** (self._failures - 1))
+      elif busy or pending:
+        # Lock bezet door een andere worker: over 5 s opnieuw proberen
+        wait = 5
+      else:
+        wait = max(1.0, self._last_full() + self.interval - time.time())
+      self._wake.wait(wait)
+      self._wake.clear()
+
+  def _scan_locked(self, dirs: list[str] | None) -> bool:
+    with open(self.lock_path, 'a') as lf:
+      try:
+        fcntl.flock(lf, fcntl.LOCK_EX | fcntl.LOCK_NB)
+      except BlockingIOError:
+        return False
+      try:
+        # Onder de lock opnieuw kijken: een andere worker kan de volledige ronde net gedaan hebben
+        if dirs is None and time.time() - self._last_full() < self.interval:
+          return True
+        self.scan(dirs)
+        if dirs is None:
+          self._full_at = time.time()
+          with open(self._stamp_path(), 'w') as f:
+            f.write(f'{self._full_at:.3f}\n')
+          if self.after_scan:
+            self.after_scan()
+      finally:
+        fcntl.flock(lf, fcntl.LOCK_UN)
+    return True
+
+  # -- indexeren --
+
+  def scan(self, dirs: list[str] | None = None) -> dict:
+    """Indexeer `dirs` (None = alle mappen); geeft samenvatting van de ronde."""
+    t0 = time.time()
+    full = dirs is None
+    if full:
+      dirs = list(self.list_dirs())
+    with self._lock:
+      self._dirty.difference_update(dirs)
+    stats = {'at': t0, 'dirs': len(dirs), 'files': 0, 'read': 0, 'removed': 0}
+    pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='library-read')
+    db = get_session()
+    try:
+      for d in dirs:
+        files, read, removed = self._scan_dir(db, pool, d)
+        stats['files'] += files
+        stats['read'] += read
+        stats['removed'] += removed
+      if full:
+        # Mappen die niet meer bestaan
+        gone = db.execute(delete(MediaTrack).where(MediaTrack.dir.not_in(dirs))) if dirs else db.execute(delete(MediaTrack))
+        stats['removed'] += gone.rowcount or 0
+        db.commit()
+    finally:
+      db.close()
+      pool.shutdown(wait=True)
+    stats['seconds'] = round(time.time() - t0, 3)
+    self.scans += 1
+    self.last_scan = stats
+    return stats
+
+  def _read(self, full: str) -> dict:
+    try:
+      tags = read_tags(full)
+      tags['error'] = ''
+    except Exception as e:
+      tags = {'artist': None, 'title': None, 'album': None, 'duration': None, 'bitrate': None, 'vbr': False,
+              'error': str(e)[:255]}
+    for k in ('artist', 'title', 'album'):
+      if tags.get(k):
+        tags[k] = tags[k][:255]
+    return tags
+
+  def _scan_dir(self, db, pool, d: str) -> tuple[int, int, int]:
+    path = os.path.join(self.root, d)
+    on_disk = {}
+    try:
+      for de in iter_files(path):
+        try:
+          st = de.stat()
+        except OSError:
+          continue
+        on_disk[de.name] = (st.st_size, st.st_mtime_ns)
+    except OSError:
+      on_disk = {}
+    known = {name: (tid, size, mtime) for tid, name, size, mtime in db.execute(
+      select(MediaTrack.id, MediaTrack.name, MediaTrack.size, MediaTrack.mtime_ns).where(MediaTrack.dir == d))}
+    todo = [n for n, sig in on_disk.items() if n not in known or known[n][1:] != sig]
+    gone = [tid for n, (tid, _, _) in known.items() if n not in on_disk]
+    for i in range(0, len(todo), BATCH):
+      names = todo[i:i + BATCH]
+      now = int(time.time())
+      inserts, updates = [], []
+      for name, tags in zip(names, pool.map(self._read, [os.path.join(path, n) for n in names])):
+        size, mtime = on_disk[name]
+        # Inhoud gewijzigd: opgeslagen hash is niet meer geldig
+        row = dict(tags, size=size, mtime_ns=mtime, indexed_at=now, sha256=None)
+        if tags['error']:
+          self.errors += 1
+        if name in known:
+          updates.append(dict(row, id=known[name][0]))
+        else:
+          inserts.append(dict(row, dir=d, name=name))
+      if inserts:
+        db.execute(insert(MediaTrack), inserts)
+      if updates:
+        db.execute(update(MediaTrack), updates)
+      db.commit()
+      self.files_read += len(names)
+    for i in range(0, len(gone), 500):
+      db.execute(delete(MediaTrack).where(MediaTrack.id.in_(gone[i:i + 500])))
+    if gone:
+      db.commit()
+    return len(on_disk), len(todo), len(gone)
+
+  # -- lezen --
+
+  def search(self, q: str = '', dir_name: str = '', limit: int = 50, offset: int = 0) -> list[dict]:
+    stmt = select(MediaTrack)
+    if dir_name:
+      stmt = stmt.where(MediaTrack.dir == dir_name)
+    for word in (q or '').split():
+      like = f"%{word}%"
+      stmt = stmt.where(or_(MediaTrack.artist.ilike(like), MediaTrack.title.ilike(like),
+                            MediaTrack.album.ilike(like), MediaTrack.name.ilike(like)))
+    stmt = stmt.order_by(MediaTrack.dir, MediaTrack.name).limit(limit).offset(offset)
+    db = get_session()
+    try:
+      return [{'dir': t.dir, 'name': t.name, 'artist': t.artist, 'title': t.title, 'album': t.album,
+               'duration': t.duration, 'bitrate': t.bitrate, 'vbr': t.vbr, 'size': t.size, 'error': t.error or None}
+              for t in db.execute(stmt).scalars()]
+    finally:
+      db.close()
+
+  def totals(self) -> list[dict]:
+    """Per map: aantal tracks, bytes en totale speelduur (quota/rapportage)."""
+    db = get_session()
+    try:
+      rows = db.execute(select(MediaTrack.dir, func.count(), func.sum(MediaTrack.size), func.sum(MediaTrack.duration))
+                        .group_by(MediaTrack.dir).order_by(MediaTrack.dir)).all()
+    finally:
+      db.close()
+    return [{'dir': d, 'tracks': n, 'bytes': int(b or 0), 'duration': round(float(s or 0), 1)} for d, n, b, s in rows]
+
+  def stats(self) -> dict:
+    with self._lock:
+      dirty = sorted(self._dirty)
+    return {'scans': self.scans, 'files_read': self.files_read, 'errors': self.errors, 'failures': self._failures,
+            'last_full': self._last_full() or None, 'workers': self.workers, 'interval': self.interval, 'pending': dirty, 'last_scan': self.last_scan}
@@ -0,0 +1,445 @@
+from __future__ import annotations
+import os, select, struct, threading, time, logging, ctypes, ctypes.util, heapq, bisect
+
+log = logging.getLogger('ingest-admin')
+
+# inotify(7) constanten
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM  = 0x00000040
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF   = 0x00000800
+IN_Q_OVERFLOW  = 0x00004000
+IN_IGNORED     = 0x00008000
+IN_ONLYDIR     = 0x01000000
+IN_ISDIR       = 0x40000000
+
+_DIR_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT = struct.Struct('iIII')
+
+
+class Inotify:
+  """Minimale inotify binding via ctypes (Linux, geen extra dependency)."""
+
+  def __init__(self):
+    libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    self._add = libc.inotify_add_watch
+    self._add.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    self._rm = libc.inotify_rm_watch
+    self._rm.argtypes = [ctypes.c_int, ctypes.c_int]
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+      raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+    self.fd = fd
+
+  def add_watch(self, path: str, mask: int) -> int:
+    wd = self._add(self.fd, os.fsencode(path), mask)
+    if wd < 0:
+      raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+    return wd
+
+  def rm_watch(self, wd: int):
+    self._rm(self.fd, wd)
+
+  def read(self) -> list[tuple[int, int, str]]:
+    """Lees beschikbare events als (wd, mask, name)."""
+    try:
+      buf = os.read(self.fd, 64 * 1024)
+    except BlockingIOError:
+      return []
+    events = []
+    i = 0
+    while i + _EVENT.size <= len(buf):
+      wd, mask, _cookie, ln = _EVENT.unpack_from(buf, i)
+      i += _EVENT.size
+      name = buf[i:i + ln].rstrip(b'\0').decode('utf-8', 'surrogateescape')
+      i += ln
+      events.append((wd, mask, name))
+    return events
+
+  def close(self):
+    try:
+      os.close(self.fd)
+    except OSError:
+      pass
+
+
+# ---------- Streaming listing (zonder volledige lijsten) ----------
+
+def iter_files(path: str, suffix: str = '.mp3'):
+  """Generator over DirEntry's met `suffix`; is_file() gebruikt d_type, dus geen stat per entry."""
+  with os.scandir(path) as it:
+    for de in it:
+      if not de.name.lower().endswith(suffix):
+        continue
+      try:
+        if de.is_file():
+          yield de
+      except OSError:
+        continue
+
+def count_files(path: str, suffix: str = '.mp3') -> int:
+  try:
+    return sum(1 for _ in iter_files(path, suffix))
+  except OSError:
+    return 0
+
+def first_files(path: str, n: int, suffix: str = '.mp3', after: str | None = None) -> list[str]:
+  """De eerste `n` namen (gesorteerd) na `after` via een begrensde heap: O(n) geheugen."""
+  try:
+    names = (de.name for de in iter_files(path, suffix))
+    if after:
+      names = (x for x in names if x > after)
+    return heapq.nsmallest(n, names)
+  except OSError:
+    return []
+
+def last_files(path: str, n: int, before: str, suffix: str = '.mp3') -> list[str]:
+  """De laatste `n` namen (gesorteerd) vóór `before`."""
+  try:
+    names = (de.name for de in iter_files(path, suffix) if de.name < before)
+    return sorted(heapq.nlargest(n, names))
+  except OSError:
+    return []
+
+def page_files(path: str, n: int, after: str | None = None, before: str | None = None, suffix: str = '.mp3') -> tuple[list[str], bool, bool]:
+  """Cursor-pagina: (namen, has_prev, has_next). Cursor = eerste/laatste naam van de vorige pagina."""
+  if before:
+    names = last_files(path, n + 1, before, suffix)
+    has_prev = len(names) > n
+    return (names[1:] if has_prev else names), has_prev, True
+  names = first_files(path, n + 1, suffix, after)
+  has_next = len(names) > n
+  return names[:n], bool(after), has_next
+
+
+class _DirEntry:
+  __slots__ = ('files', 'scanned_at', 'mtime_ns', 'wd', 'dirty', '_sorted')
+
+  def __init__(self):
+    self.files = {}        # naam -> (size, mtime)
+    self.scanned_at = 0.0
+    self.mtime_ns = None   # mtime van de map zelf bij laatste scan
+    self.wd = None         # inotify watch descriptor
+    self.dirty = True
+    self._sorted = None
+
+  def sorted_names(self) -> list[str]:
+    if self._sorted is None:
+      self._sorted = sorted(self.files)
+    return self._sorted
+
+
+class MediaIndex:
+  """Index van mp3-bestanden (naam, grootte, mtime) per submap van `root`.
+
+  Mappen worden pas bij eerste gebruik gescand en daarna bijgehouden via
+  inotify. Zonder inotify (of op netwerkopslag, waar events van andere hosts
+  ontbreken: zet dan use_inotify uit) valt de index terug op een goedkope
+  mtime-check van de map, bij gebruik en elke `rescan_interval`; alleen bij een
+  gewijzigde mtime volgt een herscan. Upload/delete werken de index direct bij
+  via note_file()/forget_file().
+  """
+
+  def __init__(self, root: str, rescan_interval: float = 60.0, use_inotify: bool = True, suffix: str = '.mp3'):
+    self.root = root
+    self.rescan_interval = max(1.0, rescan_interval)
+    self.use_inotify = use_inotify
+    self.suffix = suffix
+    self._lock = threading.RLock()
+    self._dirs = {}
+    self._subdirs = None
+    self._root_mtime = None
+    self._root_wd = None
+    self._wd_dir = {}
+    self._ino = None
+    self._pid = None
+    self._thread = None
+    self.scans = 0
+    self.events = 0
+
+  # -- achtergrondthread (inotify + periodieke herscan) --
+
+  def _ensure_started(self):
+    pid = os.getpid()
+    if self._pid == pid:
+      return
+    with self._lock:
+      if self._pid == pid:
+        return
+      # Na fork: watches/fd van de parent niet hergebruiken
+      self._pid = pid
+      self._ino = None
+      self._wd_dir = {}
+      self._root_wd = None
+      for e in self._dirs.values():
+        e.wd = None
+        e.dirty = True
+      self._subdirs = None
+      if self.use_inotify:
+        try:
+          self._ino = Inotify()
+        except Exception as e:
+          log.info('media index: inotify niet beschikbaar (%s), alleen periodieke herscan', e)
+      self._thread = threading.Thread(target=self._run, name='media-index', daemon=True)
+      self._thread.start()
+
+  def _run(self):
+    while True:
+      try:
+        ino = self._ino
+        if ino is not None:
+          r, _, _ = select.select([ino.fd], [], [], self.rescan_interval / 2)
+          if r:
+            self._apply_events(ino.read())
+        else:
+          time.sleep(self.rescan_interval / 2)
+        self._rescan_stale()
+      except Exception as e:
+        log.warning('media index: %s', e)
+        time.sleep(1)
+
+  def _watch(self, path: str):
+    if self._ino is None:
+      return None
+    try:
+      return self._ino.add_watch(path, _DIR_MASK)
+    except OSError as e:
+      log.info('media index: geen watch op %s (%s)', path, e)
+      return None
+
+  def _apply_events(self, events):
+    with self._lock:
+      for wd, mask, name in events:
+        self.events += 1
+        if mask & IN_Q_OVERFLOW:
+          for e in self._dirs.values():
+            e.dirty = True
+          self._subdirs = None
+          continue
+        if wd == self._root_wd:
+          if mask & IN_ISDIR or mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+            self._subdirs = None
+            if name and mask & (IN_DELETE | IN_MOVED_FROM) and name in self._dirs:
+              self._drop_dir(name)
+          continue
+        dir_name = self._wd_dir.get(wd)
+        if dir_name is None:
+          continue
+        entry = self._dirs.get(dir_name)
+        if entry is None:
+          continue
+        if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+          self._wd_dir.pop(wd, None)
+          entry.wd = None
+          entry.dirty = True
+          continue
+        if not name or mask & IN_ISDIR or not name.lower().endswith(self.suffix):
+          continue
+        if mask & (IN_DELETE | IN_MOVED_FROM):
+          self._forget(entry, name)
+        else:
+          self._note(entry, dir_name, name)
+
+  def _rescan_stale(self):
+    """Herscan vuile mappen; mappen zonder watch alleen als hun mtime veranderd is.
+
+    Mappen met een werkende watch worden niet periodiek aangeraakt. Voor de rest
+    kost de controle één stat per map: publiceren, verplaatsen en verwijderen
+    gaan via rename/unlink en veranderen dus de mtime van de map.
+    """
+    now = time.time()
+    with self._lock:
+      stale = [d for d, e in self._dirs.items() if e.dirty]
+      check = [(d, e) for d, e in self._dirs.items()
+               if not e.dirty and e.wd is None and now - e.scanned_at >= self.rescan_interval]
+    for d, e in check:
+      try:
+        mtime_ns = os.stat(self._full(d)).st_mtime_ns
+      except OSError:
+        mtime_ns = None
+      if mtime_ns is None or mtime_ns != e.mtime_ns:
+        stale.append(d)
+      else:
+        with self._lock:
+          e.scanned_at = now
+    for d in stale:
+      self._scan(d)
+
+  # -- scannen --
+
+  def _full(self, dir_name: str) -> str:
+    return os.path.join(self.root, dir_name)
+
+  def _scan(self, dir_name: str):
+    full = self._full(dir_name)
+    files = {}
+    try:
+      mtime_ns = os.stat(full).st_mtime_ns
+      for de in iter_files(full, self.suffix):
+        try:
+          st = de.stat()
+        except OSError:
+          continue
+        files[de.name] = (st.st_size, st.st_mtime)
+    except OSError:
+      mtime_ns = None
+    with self._lock:
+      entry = self._dirs.get(dir_name)
+      if entry is None:
+        entry = self._dirs[dir_name] = _DirEntry()
+      entry.files = files
+      entry._sorted = None
+      entry.mtime_ns = mtime_ns
+      entry.scanned_at = time.time()
+      entry.dirty = False
+      if entry.wd is None and mtime_ns is not None:
+        entry.wd = self._watch(full)
+        if entry.wd is not None:
+          self._wd_dir[entry.wd] = dir_name
+      self.scans += 1
+    return entry
+
+  def _entry(self, dir_name: str) -> _DirEntry:
+    self._ensure_started()
+    with self._lock:
+      entry = self._dirs.get(dir_name)
+    if entry is None or entry.dirty:
+      return self._scan(dir_name)
+    if entry.wd is None:
+      # Geen inotify voor deze map: goedkope mtime-check i.p.v. volledige scan
+      try:
+        mtime_ns = os.stat(self._full(dir_name)).st_mtime_ns
+      except OSError:
+        mtime_ns = None
+      if mtime_ns != entry.mtime_ns:
+        return self._scan(dir_name)
+    return entry
+
+  def _drop_dir(self, dir_name: str):
+    entry = self._dirs.pop(dir_name, None)
+    if entry is not None and entry.wd is not None:
+      self._wd_dir.pop(entry.wd, None)
+      if self._ino is not None:
+        try:
+          self._ino.rm_watch(entry.wd)
+        except Exception:
+          pass
+
+  def _note(self, entry: _DirEntry, dir_name: str, name: str):
+    try:
+      st = os.stat(os.path.join(self._full(dir_name), name))
+    except OSError:
+      self._forget(entry, name)
+      return
+    if not os.path.isfile(os.path.join(self._full(dir_name), name)):
+      return
+    if name not in entry.files and entry._sorted is not None:
+      bisect.insort(entry._sorted, name)
+    entry.files[name] = (st.st_size, st.st_mtime)
+
+  def _forget(self, entry: _DirEntry, name: str):
+    if entry.files.pop(name, None) is not None and entry._sorted is not None:
+      i = bisect.bisect_left(entry._sorted, name)
+      if i < len(entry._sorted) and entry._sorted[i] == name:
+        del entry._sorted[i]
+
+  # -- publieke API --
+
+  def list_files(self, dir_name: str) -> list[str]:
+    """Gesorteerde mp3-namen in `dir_name` (kopie; voor grote mappen liever head()/page())."""
+    entry = self._entry(dir_name)
+    with self._lock:
+      return list(entry.sorted_names())
+
+  def stats(self, dir_name: str) -> dict:
+    """Kopie van {naam: (size, mtime)} voor `dir_name`."""
+    entry = self._entry(dir_name)
+    with self._lock:
+      return dict(entry.files)
+
+  def count(self, dir_name: str) -> int:
+    entry = self._entry(dir_name)
+    with self._lock:
+      return len(entry.files)
+
+  def head(self, dir_name: str, n: int) -> list[str]:
+    entry = self._entry(dir_name)
+    with self._lock:
+      return entry.sorted_names()[:n]
+
+  def page(self, dir_name: str, n: int, after: str | None = None, before: str | None = None) -> tuple[list[str], bool, bool]:
+    """Cursor-pagina zoals page_files(), maar via bisect op de gesorteerde index."""
+    entry = self._entry(dir_name)
+    with self._lock:
+      names = entry.sorted_names()
+      if before:
+        j = bisect.bisect_left(names, before)
+        i = max(0, j - n)
+        return names[i:j], i > 0, j < len(names)
+      i = bisect.bisect_right(names, after) if after else 0
+      return names[i:i + n], i > 0, i + n < len(names)
+
+  def list_dirs(self) -> list[str]:
+    self._ensure_started()
+    with self._lock:
+      subdirs = self._subdirs
+      root_mtime = self._root_mtime
+      root_wd = self._root_wd
+    if subdirs is not None and root_wd is None:
+      try:
+        if os.stat(self.root).st_mtime_ns != root_mtime:
+          subdirs = None
+      except OSError:
+        subdirs = None
+    if subdirs is None:
+      try:
+        root_mtime = os.stat(self.root).st_mtime_ns
+        with os.scandir(self.root) as it:
+          subdirs = sorted(de.name for de in it if de.is_dir() and not de.name.startswith('.'))
+      except OSError:
+        root_mtime, subdirs = None, []
+      with self._lock:
+        self._subdirs = subdirs
+        self._root_mtime = root_mtime
+        if self._root_wd is None and root_mtime is not None:
+          self._root_wd = self._watch(self.root)
+    return subdirs
+
+  def _sync_mtime(self, entry: _DirEntry, dir_name: str):
+    # Eigen wijziging verwerkt: voorkom dat de mtime-check een volledige herscan triggert
+    if entry.wd is None:
+      try:
+        entry.mtime_ns = os.stat(self._full(dir_name)).st_mtime_ns
+      except OSError:
+        entry.dirty = True
+
+  def note_file(self, dir_name: str, name: str):
+    """Bestand is toegevoegd/gewijzigd (bijv. na upload)."""
+    with self._lock:
+      entry = self._dirs.get(dir_name)
+      if entry is not None:
+        self._note(entry, dir_name, name)
+        self._sync_mtime(entry, dir_name)
+
+  def forget_file(self, dir_name: str, name: str):
+    """Bestand is verwijderd."""
+    with self._lock:
+      entry = self._dirs.get(dir_name)
+      if entry is not None:
+        self._forget(entry, name)
+        self._sync_mtime(entry, dir_name)
+
+  def invalidate(self, dir_name: str | None = None):
+    """Forceer een herscan van één map of de hele index."""
+    with self._lock:
+      targets = [self._dirs.get(dir_name)] if dir_name else list(self._dirs.values())
+      for e in targets:
+        if e is not None:
+          e.dirty = True
+      if not dir_name:
+        self._subdirs = None
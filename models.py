@@ -1,6 +1,6 @@
 from __future__ import annotations
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
-from sqlalchemy import String, Integer, Boolean, ForeignKey
+from sqlalchemy import String, Integer, BigInteger, Float, Boolean, ForeignKey, LargeBinary, UniqueConstraint, Index
 
 
 class Base(DeclarativeBase):
@@ -9,6 +9,13 @@ class Base(DeclarativeBase):
 
 class Service(Base):
     __tablename__ = "services"
+    # Zoeken/filteren met keyset-paginering: (kolom, id) zodat ook de volgorde uit de index komt
+    __table_args__ = (
+        Index("ix_services_name_id", "name", "id"),
+        Index("ix_services_owner_id", "owner", "id"),
+        Index("ix_services_svc_type_id", "svc_type", "id"),
+        Index("ix_services_uid", "uid"),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(128), default="")
     svc_type: Mapped[str] = mapped_column(String(64), default="Icecast 2 KH")
@@ -89,3 +96,45 @@ class ServiceRelay(Base):
     relay_type: Mapped[str] = mapped_column(String(64), default="Uitgeschakeld")
 
     service: Mapped[Service] = relationship(back_populates="relay")
+
+
+class ListenerHistory(Base):
+    """Luisteraantallen per mount als compacte chunks: één rij per (mount, resolutie, chunk).
+
+    `samples`/`peaks` zijn little-endian uint32 arrays (gemiddelde resp. piek per slot van
+    `resolution` seconden vanaf `bucket_start`); 0xFFFFFFFF = geen meting.
+    """
+    __tablename__ = "listener_history"
+    __table_args__ = (UniqueConstraint("mount", "resolution", "bucket_start", name="uq_listener_history_chunk"),)
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    mount: Mapped[str] = mapped_column(String(255))
+    resolution: Mapped[int] = mapped_column(Integer)
+    bucket_start: Mapped[int] = mapped_column(Integer)
+    samples: Mapped[bytes] = mapped_column(LargeBinary)
+    peaks: Mapped[bytes] = mapped_column(LargeBinary)
+
+
+class MediaTrack(Base):
+    """Metadata per mp3 onder MOUNT_DIR (ID3v1/v2 + Xing/VBRI), herlezen zodra size of mtime wijzigt."""
+    __tablename__ = "media_tracks"
+    __table_args__ = (
+        UniqueConstraint("dir", "name", name="uq_media_tracks_file"),
+        Index("ix_media_tracks_artist", "artist"),
+        Index("ix_media_tracks_title", "title"),
+        Index("ix_media_tracks_size", "size"),
+        Index("ix_media_tracks_sha256", "sha256"),
+    )
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    dir: Mapped[str] = mapped_column(String(255))
+    name: Mapped[str] = mapped_column(String(255))
+    size: Mapped[int] = mapped_column(BigInteger, default=0)
+    mtime_ns: Mapped[int] = mapped_column(BigInteger, default=0)
+    artist: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    title: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    album: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    duration: Mapped[float | None] = mapped_column(Float, nullable=True)
+    bitrate: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    vbr: Mapped[bool] = mapped_column(Boolean, default=False)
+    error: Mapped[str] = mapped_column(String(255), default="")
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)   # alleen voor kandidaat-duplicaten
+    indexed_at: Mapped[int] = mapped_column(Integer, default=0)
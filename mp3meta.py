@@ -0,0 +1,170 @@
+from __future__ import annotations
+import os, struct
+
+# Alleen de kop (ID3v2-frames die we nodig hebben + eerste MPEG-frame) en de staart (ID3v1) worden gelezen;
+# grote frames zoals APIC (cover art) worden overgeslagen met seek().
+HEAD_PROBE = 4096
+_TEXT_FRAMES = {
+  'TIT2': 'title', 'TPE1': 'artist', 'TALB': 'album', 'TLEN': 'tlen',
+  'TT2': 'title', 'TP1': 'artist', 'TAL': 'album', 'TLE': 'tlen',
+}
+
+# bitrate (kbps) per [versie-index][layer-index][bitrate-index]; versie 0 = MPEG1, 1 = MPEG2/2.5
+_BITRATES = (
+  (None,
+   (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),     # Layer III
+   (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),    # Layer II
+   (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448)),  # Layer I
+  (None,
+   (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+   (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+   (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256)),
+)
+_SAMPLERATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _syncsafe(b: bytes) -> int:
+  return (b[0] << 21) | (b[1] << 14) | (b[2] << 7) | b[3]
+
+
+def _text(data: bytes) -> str:
+  if not data:
+    return ''
+  enc, raw = data[0], data[1:]
+  try:
+    if enc == 0:
+      s = raw.decode('latin-1')
+    elif enc == 1:
+      s = raw.decode('utf-16')
+    elif enc == 2:
+      s = raw.decode('utf-16-be')
+    else:
+      s = raw.decode('utf-8')
+  except UnicodeDecodeError:
+    s = raw.decode('latin-1', 'replace')
+  # meerdere waarden zijn \0-gescheiden; eerste is genoeg
+  return s.split('\x00', 1)[0].strip()
+
+
+def _read_id3v2(f, out: dict) -> int:
+  """Lees de gewenste tekstframes; geeft de offset waar de audio begint."""
+  f.seek(0)
+  hdr = f.read(10)
+  if len(hdr) < 10 or hdr[:3] != b'ID3':
+    return 0
+  major, flags = hdr[3], hdr[5]
+  end = 10 + _syncsafe(hdr[6:10]) + (10 if flags & 0x10 else 0)
+  pos = 10
+  if flags & 0x40 and major >= 3:
+    ext = f.read(4)
+    pos += (_syncsafe(ext) if major == 4 else struct.unpack('>I', ext)[0] + 4)
+  id_len, hdr_len = (3, 6) if major == 2 else (4, 10)
+  while pos + hdr_len <= end:
+    f.seek(pos)
+    fh = f.read(hdr_len)
+    if len(fh) < hdr_len or fh[0] == 0:
+      break   # padding
+    fid = fh[:id_len].decode('latin-1', 'replace')
+    if major == 2:
+      size = int.from_bytes(fh[3:6], 'big')
+    elif major == 4:
+      size = _syncsafe(fh[4:8])
+    else:
+      size = struct.unpack('>I', fh[4:8])[0]
+    pos += hdr_len
+    key = _TEXT_FRAMES.get(fid)
+    if key and key not in out and 0 < size <= 64 * 1024:
+      out[key] = _text(f.read(size))
+    pos += size
+  return end
+
+
+def _read_id3v1(f, size: int, out: dict) -> bool:
+  if size < 128:
+    return False
+  f.seek(size - 128)
+  tag = f.read(128)
+  if tag[:3] != b'TAG':
+    return False
+  for key, a, b in (('title', 3, 33), ('artist', 33, 63), ('album', 63, 93)):
+    if not out.get(key):
+      v = tag[a:b].split(b'\x00', 1)[0].decode('latin-1').strip()
+      if v:
+        out[key] = v
+  return True
+
+
+def _frame_header(b: bytes, i: int):
+  h = struct.unpack('>I', b[i:i + 4])[0]
+  if (h >> 21) & 0x7FF != 0x7FF:
+    return None
+  ver = (h >> 19) & 3     # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+  layer = (h >> 17) & 3   # 1 = III, 2 = II, 3 = I
+  br_idx = (h >> 12) & 0xF
+  sr_idx = (h >> 10) & 3
+  if ver == 1 or layer == 0 or br_idx in (0, 15) or sr_idx == 3:
+    return None
+  bitrate = _BITRATES[0 if ver == 3 else 1][layer][br_idx]
+  samplerate = _SAMPLERATES[ver][sr_idx]
+  if layer == 3:
+    spf = 384
+  elif layer == 1 and ver != 3:
+    spf = 576
+  else:
+    spf = 1152
+  mono = ((h >> 6) & 3) == 3
+  return {'ver': ver, 'layer': layer, 'bitrate': bitrate, 'samplerate': samplerate, 'spf': spf, 'mono': mono}
+
+
+def read_tags(path: str) -> dict:
+  """{artist, title, album, duration (s), bitrate (kbps), vbr} uit ID3v2/ID3v1 en het eerste MPEG-frame (Xing/Info/VBRI)."""
+  out = {}
+  size = os.path.getsize(path)
+  with open(path, 'rb') as f:
+    audio_start = _read_id3v2(f, out)
+    has_v1 = _read_id3v1(f, size, out)
+    f.seek(audio_start)
+    buf = f.read(HEAD_PROBE)
+  info = None
+  i = 0
+  while i + 4 <= len(buf):
+    j = buf.find(b'\xff', i)
+    if j < 0 or j + 4 > len(buf):
+      break
+    info = _frame_header(buf, j)
+    if info:
+      i = j
+      break
+    i = j + 1
+  tlen = out.pop('tlen', '')
+  result = {k: (out.get(k) or None) for k in ('artist', 'title', 'album')}
+  result.update(duration=None, bitrate=None, vbr=False)
+  if info:
+    frames = None
+    # Xing/Info: na de side info (afhankelijk van versie en kanalen)
+    if info['ver'] == 3:
+      side = 17 if info['mono'] else 32
+    else:
+      side = 9 if info['mono'] else 17
+    x = i + 4 + side
+    tag = buf[x:x + 4]
+    if tag in (b'Xing', b'Info') and x + 12 <= len(buf):
+      flags = struct.unpack('>I', buf[x + 4:x + 8])[0]
+      if flags & 1:
+        frames = struct.unpack('>I', buf[x + 8:x + 12])[0]
+      result['vbr'] = tag == b'Xing'
+    elif buf[i + 36:i + 40] == b'VBRI' and i + 54 <= len(buf):
+      frames = struct.unpack('>I', buf[i + 50:i + 54])[0]
+      result['vbr'] = True
+    audio_bytes = size - (audio_start + i) - (128 if has_v1 else 0)
+    if frames:
+      duration = frames * info['spf'] / info['samplerate']
+      result['duration'] = round(duration, 3)
+      result['bitrate'] = int(round(audio_bytes * 8 / duration / 1000)) if duration else info['bitrate']
+    else:
+      result['bitrate'] = info['bitrate']
+      if info['bitrate']:
+        result['duration'] = round(audio_bytes * 8 / (info['bitrate'] * 1000), 3)
+  if result['duration'] is None and tlen.isdigit():
+    result['duration'] = int(tlen) / 1000.0
+  return result
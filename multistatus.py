@@ -0,0 +1,143 @@
+from __future__ import annotations
+import json, time, threading
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait
+
+
+def parse_icecast_status(data: dict) -> dict:
+  """status-json.xsl → {listeners, mounts: [{mount, listeners}], mounts_count}."""
+  mounts = []
+  src = data.get("icestats", {}).get("source", [])
+  if isinstance(src, dict):
+    src = [src]
+  for s in src:
+    mount = s.get("listenurl") or s.get("server_name") or s.get("title") or s.get("mount")
+    if mount and mount.startswith("http"):
+      try:
+        p = urlparse(mount); mount = p.path or mount
+      except Exception:
+        pass
+    mounts.append({"mount": mount or "?", "listeners": int(s.get("listeners", 0))})
+  total = sum(m["listeners"] for m in mounts)
+  return {"listeners": total, "mounts": mounts, "mounts_count": len(mounts)}
+
+
+class MultiStatusCollector:
+  """Status van alle Icecast-instanties (één per Service-poort), parallel opgehaald.
+
+  `list_services()` geeft [(id, naam, poort)]; de status-URL volgt uit
+  `url_template` ({port}, {id}). Elke instantie krijgt `timeout` seconden,
+  gerekend vanaf het moment dat zijn fetch echt start (met meer instanties dan
+  `workers` wachten de rest in de pool); wat dan nog loopt telt als 'timeout'
+  en blokkeert de rest niet. Het samengevoegde overzicht (totalen per service
+  en per mount) wordt `ttl` seconden gecachet en gelijktijdige aanvragen
+  delen één ronde.
+  """
+
+  def __init__(self, http, list_services, url_template: str, timeout: float = 2.5, workers: int = 16, ttl: float = 5.0):
+    self.http = http
+    self.list_services = list_services
+    self.url_template = url_template
+    self.timeout = timeout
+    self.workers = max(1, workers)
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self._collect_lock = threading.Lock()
+    self._data = None
+    self._at = 0.0
+    self.rounds = 0
+
+  def url_for(self, svc_id: int, port: int) -> str:
+    return self.url_template.format(port=port, id=svc_id)
+
+  def _fetch(self, url: str) -> dict:
+    t0 = time.time()
+    try:
+      status, body = self.http.request(url, read_timeout=self.timeout)
+      if status != 200:
+        raise ValueError(f"HTTP {status}")
+      out = parse_icecast_status(json.loads(body.decode("utf-8", "ignore")))
+      out['error'] = ''
+    except Exception as e:
+      out = {'listeners': None, 'mounts': [], 'mounts_count': 0, 'error': str(e) or type(e).__name__}
+    out['elapsed'] = round(time.time() - t0, 3)
+    return out
+
+  def collect(self, refresh: bool = False) -> dict:
+    now = time.time()
+    with self._lock:
+      if not refresh and self._data is not None and now - self._at < self.ttl:
+        return self._data
+    with self._collect_lock:
+      # Intussen door een andere request opgehaald?
+      with self._lock:
+        if not refresh and self._data is not None and time.time() - self._at < self.ttl:
+          return self._data
+      data = self._collect()
+      with self._lock:
+        self._data, self._at = data, time.time()
+        self.rounds += 1
+      return data
+
+  def _collect(self) -> dict:
+    t0 = time.time()
+    services = [(i, n, p) for i, n, p in self.list_services() if p]
+    urls = {}
+    for svc_id, _, port in services:
+      urls.setdefault(self.url_for(svc_id, port), None)
+    results = {}
+    if urls:
+      # Per fetch: connect-timeout van de pool + read-timeout, met wat marge
+      limit = self.timeout + getattr(self.http, 'connect_timeout', 2.0) + 0.5
+      started = {}
+
+      def run(url):
+        started[url] = time.time()
+        return self._fetch(url)
+      pool = ThreadPoolExecutor(max_workers=min(self.workers, len(urls)), thread_name_prefix='ice-multi')
+      try:
+        futures = {url: pool.submit(run, url) for url in urls}
+        # Vangnet als threads langer hangen dan de HTTP-timeouts: hooguit één `limit` per golf van `workers`
+        hard = time.time() + limit * -(-len(urls) // self.workers) + 0.5
+        while True:
+          now = time.time()
+          if now >= hard:
+            break
+          # Nog in de wachtrij of binnen de eigen deadline: blijven wachten
+          live = [f for url, f in futures.items() if not f.done() and now - started.get(url, now) < limit]
+          if not live:
+            break
+          nxt = min((started[u] + limit for u, f in futures.items() if u in started and not f.done()), default=now + limit)
+          futures_wait(live, timeout=max(0.05, min(nxt, hard) - now), return_when=FIRST_COMPLETED)
+        for url, f in futures.items():
+          if f.done() and not f.cancelled():
+            results[url] = f.result()
+          else:
+            results[url] = {'listeners': None, 'mounts': [], 'mounts_count': 0, 'error': 'timeout', 'elapsed': None}
+      finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    instances, per_mount = [], {}
+    for svc_id, name, port in services:
+      url = self.url_for(svc_id, port)
+      r = results[url]
+      instances.append({'id': svc_id, 'name': name or f'Service {svc_id}', 'port': port, 'url': url,
+                        'ok': r['listeners'] is not None, 'error': r['error'], 'elapsed': r['elapsed'],
+                        'listeners': r['listeners'], 'mounts_count': r['mounts_count'], 'mounts': r['mounts']})
+      for m in r['mounts']:
+        agg = per_mount.setdefault(m['mount'], {'mount': m['mount'], 'listeners': 0, 'services': []})
+        agg['listeners'] += m['listeners']
+        agg['services'].append({'id': svc_id, 'port': port, 'listeners': m['listeners']})
+    up = [i for i in instances if i['ok']]
+    return {
+      'at': t0,
+      'seconds': round(time.time() - t0, 3),
+      'totals': {'listeners': sum(i['listeners'] for i in up), 'instances': len(instances), 'up': len(up),
+                 'down': len(instances) - len(up), 'mounts': len(per_mount)},
+      'instances': instances,
+      'mounts': sorted(per_mount.values(), key=lambda m: (-m['listeners'], m['mount'])),
+    }
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {'rounds': self.rounds, 'ttl': self.ttl, 'timeout': self.timeout, 'workers': self.workers,
+              'age': round(time.time() - self._at, 1) if self._at else None}
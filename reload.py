@@ -0,0 +1,169 @@
+from __future__ import annotations
+import os, json, time, fcntl, hashlib, logging, tempfile, threading
+
+log = logging.getLogger('ingest-admin')
+
+
+class ReloadCoalescer:
+  """Bundelt soft-reload-verzoeken per map tot één poke.
+
+  request(dir) noteert het verzoek in een gedeeld statebestand per map
+  (`state_dir/<sha1>.json`, onder flock), zodat alle workers dezelfde
+  wachtrij zien. Een achtergrondthread in elke worker (start() bij de eerste
+  request, niet pas bij een eigen verzoek) voert de poke uit zodra er `window`
+  seconden geen nieuw verzoek kwam, of uiterlijk `max_wait` na het eerste; wie
+  de lock het eerst heeft doet de poke, de rest ziet dat er niets meer
+  openstaat. Zo pakt elke worker ook de wachtrij op van een worker die
+  intussen gerecycled is. Met window 0 wordt direct gepoked (oude gedrag).
+  """
+
+  def __init__(self, poke, window: float = 2.0, max_wait: float = 10.0, state_dir: str | None = None):
+    self.poke = poke
+    self.window = max(0.0, window)
+    self.max_wait = max(self.window, max_wait)
+    self.state_dir = state_dir or os.path.join(tempfile.gettempdir(), 'ingest-admin-reload')
+    self._lock = threading.Lock()
+    self._wake = threading.Event()
+    self._thread = None
+    self._pid = None
+    self.requested = 0   # deze worker
+    self.issued = 0
+    self.failed = 0
+
+  def _path(self, dir_name: str) -> str:
+    return os.path.join(self.state_dir, hashlib.sha1(dir_name.encode('utf-8')).hexdigest() + '.json')
+
+  def _update(self, path: str, fn, blocking: bool = True):
+    """Lees-wijzig-schrijf van een statebestand onder flock; None als de lock bezet is (blocking=False)."""
+    os.makedirs(self.state_dir, exist_ok=True)
+    with open(path, 'a+') as f:
+      try:
+        fcntl.flock(f, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+      except BlockingIOError:
+        return None
+      try:
+        f.seek(0)
+        try:
+          state = json.loads(f.read() or '{}')
+        except ValueError:
+          state = {}
+        out = fn(state)
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(state))
+        f.flush()
+        return out
+      finally:
+        fcntl.flock(f, fcntl.LOCK_UN)
+
+  def _poke(self, dir_name: str) -> bool:
+    ok = self.poke(dir_name)
+    with self._lock:
+      if ok:
+        self.issued += 1
+      else:
+        self.failed += 1
+    return ok
+
+  # -- achtergrond --
+
+  def start(self):
+    if not self.window:
+      return
+    if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+      return
+    with self._lock:
+      if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+        return
+      self._pid = os.getpid()
+      self._thread = threading.Thread(target=self._run, name='reload-coalescer', daemon=True)
+      self._thread.start()
+
+  def request(self, dir_name: str) -> bool:
+    """Soft reload van `dir_name` aanvragen; False alleen als een directe poke (window 0) mislukt."""
+    with self._lock:
+      self.requested += 1
+    if not self.window:
+      return self._poke(dir_name)
+    now = time.time()
+
+    def note(state):
+      state['dir'] = dir_name
+      state['requested'] = state.get('requested', 0) + 1
+      if not state.get('pending_since'):
+        state['pending_since'] = now
+      state['last_request'] = now
+    try:
+      self._update(self._path(dir_name), note)
+    except OSError as e:
+      # Geen gedeelde state: dan maar direct
+      log.warning('reload coalescer: %s', e)
+      return self._poke(dir_name)
+    self.start()
+    self._wake.set()
+    return True
+
+  def _due(self, state: dict, now: float) -> float | None:
+    """Seconden tot de poke voor deze state (<= 0: nu), None als er niets openstaat."""
+    first = state.get('pending_since')
+    if not first:
+      return None
+    return min(state.get('last_request', first) + self.window, first + self.max_wait) - now
+
+  def _run(self):
+    while True:
+      wait = self.max_wait
+      try:
+        wait = self.flush()
+      except Exception as e:
+        log.warning('reload coalescer: %s', e)
+      self._wake.wait(max(0.05, wait))
+      self._wake.clear()
+
+  def flush(self, force: bool = False) -> float:
+    """Poke alle mappen waarvan het venster verstreken is; geeft seconden tot de volgende."""
+    try:
+      entries = [de.path for de in os.scandir(self.state_dir) if de.name.endswith('.json')]
+    except OSError:
+      return self.max_wait
+    nxt = self.max_wait
+
+    def fire(state):
+      due = self._due(state, time.time())
+      if due is None:
+        return None
+      if due > 0 and not force:
+        return due
+      ok = self._poke(state['dir'])
+      state['pending_since'] = None
+      state['issued'] = state.get('issued', 0) + (1 if ok else 0)
+      state['issued_at'] = time.time()
+      return None
+    for path in entries:
+      # Bezet: een andere worker is er al mee bezig
+      due = self._update(path, fire, blocking=False)
+      if due is not None:
+        nxt = min(nxt, due)
+    return nxt
+
+  def stats(self) -> dict:
+    """Tellers van deze worker plus de gedeelde tellers per map."""
+    dirs = {}
+    try:
+      for de in os.scandir(self.state_dir):
+        if de.name.endswith('.json'):
+          try:
+            with open(de.path) as f:
+              st = json.loads(f.read() or '{}')
+          except (OSError, ValueError):
+            continue
+          if st.get('dir'):
+            dirs[st['dir']] = {'requested': st.get('requested', 0), 'issued': st.get('issued', 0),
+                               'pending': bool(st.get('pending_since')), 'issued_at': st.get('issued_at')}
+    except OSError:
+      pass
+    with self._lock:
+      return {'window': self.window, 'max_wait': self.max_wait, 'requested': self.requested, 'issued': self.issued,
+              'failed': self.failed, 'dirs': dirs,
+              'total_requested': sum(d['requested'] for d in dirs.values()),
+              'total_issued': sum(d['issued'] for d in dirs.values())}
@@ -0,0 +1,295 @@
+from __future__ import annotations
+import io, csv, json
+
+from sqlalchemy import select, insert, func, Integer, Boolean, String
+
+from models import Service, ServiceLimits, ServiceFeatures, ServiceIcecast, ServiceAutoDJ, ServiceRelay
+from svcsettings import load_services, iter_services
+
+# (relatie op Service, model); kolommen heten in import/export `relatie.kolom`
+SECTIONS = (
+  ('', Service),
+  ('limits', ServiceLimits),
+  ('features', ServiceFeatures),
+  ('icecast', ServiceIcecast),
+  ('autodj', ServiceAutoDJ),
+  ('relay', ServiceRelay),
+)
+_MODELS = dict(SECTIONS)
+SECRETS = ('admin_pass', 'source_pass', 'relay_pass')
+BATCH = 500
+
+
+def _columns(model) -> list:
+  skip = ('service_id',) if model is Service else ('id', 'service_id')
+  return [c for c in model.__table__.columns if c.name not in skip]
+
+
+# veldnaam -> (sectie, kolom)
+FIELDS = {(f"{prefix}.{c.name}" if prefix else c.name): (prefix, c) for prefix, model in SECTIONS for c in _columns(model)}
+
+
+def _default(col):
+  d = col.default
+  return d.arg if d is not None and d.is_scalar else None
+
+
+class ImportFormatError(ValueError):
+  """Ongeldig importbestand (formaat, niet per rij)."""
+
+
+def _coerce(col, value):
+  """Waarde naar het kolomtype; ValueError met leesbare melding bij ongeldige invoer."""
+  t = col.type
+  if isinstance(t, Boolean):
+    if isinstance(value, bool):
+      return value
+    v = str(value).strip().lower()
+    if v in ('1', 'true', 'yes', 'on', 'ja'):
+      return True
+    if v in ('0', 'false', 'no', 'off', 'nee'):
+      return False
+    raise ValueError('verwacht true/false')
+  if isinstance(t, Integer):
+    if isinstance(value, bool):
+      raise ValueError('verwacht een getal')
+    try:
+      v = int(str(value).strip())
+    except ValueError:
+      raise ValueError('verwacht een getal')
+    if v < 0:
+      raise ValueError('mag niet negatief zijn')
+    return v
+  if isinstance(t, String):
+    v = str(value)
+    if t.length and len(v) > t.length:
+      raise ValueError(f'maximaal {t.length} tekens')
+    return v
+  return value
+
+
+# -- inlezen --
+
+def _flatten(obj: dict) -> dict:
+  out = {}
+  for k, v in obj.items():
+    if isinstance(v, dict):
+      for k2, v2 in v.items():
+        out[f"{k}.{k2}"] = v2
+    else:
+      out[k] = v
+  return out
+
+
+def read_records(data: bytes, fmt: str = '') -> list[dict]:
+  """JSON (lijst van objecten, genest of met `sectie.veld`-sleutels) of CSV (`sectie.veld`-kolommen).
+
+  Lege CSV-cellen en JSON null betekenen 'niet wijzigen'.
+  """
+  text = data.decode('utf-8-sig', 'replace')
+  fmt = fmt or ('json' if text.lstrip()[:1] in ('[', '{') else 'csv')
+  if fmt == 'json':
+    try:
+      doc = json.loads(text)
+    except ValueError as e:
+      raise ImportFormatError(f'Ongeldige JSON: {e}')
+    if isinstance(doc, dict):
+      doc = doc.get('services', [doc])
+    if not isinstance(doc, list) or not all(isinstance(r, dict) for r in doc):
+      raise ImportFormatError('Verwacht een lijst van services')
+    return [{k: v for k, v in _flatten(r).items() if v is not None} for r in doc]
+  reader = csv.DictReader(io.StringIO(text))
+  if not reader.fieldnames:
+    raise ImportFormatError('Lege CSV')
+  return [{k: v for k, v in r.items() if k and v not in (None, '')} for r in reader]
+
+
+# -- plannen (dry-run) --
+
+def _get(svc, prefix: str, col):
+  if svc is None:
+    return None
+  obj = getattr(svc, prefix) if prefix else svc
+  return getattr(obj, col.key, None) if obj is not None else None
+
+
+def _load_existing(db, ids: list[int], uids: list[str]) -> tuple[dict, dict]:
+  by_id, by_uid = {}, {}
+  for i in range(0, len(ids), BATCH):
+    for s in load_services(db, ids[i:i + BATCH]):
+      by_id[s.id] = s
+  for i in range(0, len(uids), BATCH):
+    found = list(db.execute(select(Service.id, Service.uid).where(Service.uid.in_(uids[i:i + BATCH]))))
+    need = [sid for sid, _ in found if sid not in by_id]
+    for j in range(0, len(need), BATCH):
+      for s in load_services(db, need[j:j + BATCH]):
+        by_id[s.id] = s
+    for sid, uid in found:
+      by_uid.setdefault(uid, []).append(by_id[sid])
+  return by_id, by_uid
+
+
+def plan_import(db, records: list[dict]) -> dict:
+  """Valideer en vergelijk met de database; wijzigt niets.
+
+  Een rij met `id` werkt die service bij (of maakt hem met dat id aan), een
+  rij met een bestaande `uid` werkt die bij, anders wordt een nieuwe service
+  aangemaakt. Geeft {rows: [{row, action, id, uid, name, changes, errors}], summary}.
+  """
+  rows, seen = [], {}
+  parsed = []
+  for n, rec in enumerate(records, 1):
+    errors, vals = [], {}
+    for k, v in rec.items():
+      if k not in FIELDS:
+        errors.append(f'onbekend veld {k}')
+        continue
+      try:
+        vals[k] = _coerce(FIELDS[k][1], v)
+      except ValueError as e:
+        errors.append(f'{k}: {e}')
+    if 'port' in vals and not 0 < vals['port'] < 65536:
+      errors.append('port: buiten 1-65535')
+    parsed.append((n, vals, errors))
+  ids = sorted({v['id'] for _, v, _ in parsed if 'id' in v})
+  uids = sorted({v['uid'] for _, v, _ in parsed if v.get('uid') and 'id' not in v})
+  by_id, by_uid = _load_existing(db, ids, uids)
+  summary = {'create': 0, 'update': 0, 'unchanged': 0, 'error': 0}
+  for n, vals, errors in parsed:
+    svc = None
+    if 'id' in vals:
+      svc = by_id.get(vals['id'])
+    elif vals.get('uid'):
+      hits = by_uid.get(vals['uid'], [])
+      if len(hits) > 1:
+        errors.append(f"uid {vals['uid']} is niet uniek in de database")
+      svc = hits[0] if len(hits) == 1 else None
+    key = ('id', svc.id) if svc is not None else (('id', vals['id']) if 'id' in vals else (('uid', vals['uid']) if vals.get('uid') else None))
+    if key is not None:
+      if key in seen:
+        errors.append(f'dubbel met rij {seen[key]}')
+      seen.setdefault(key, n)
+    if svc is None and not (vals.get('name') or '').strip():
+      errors.append('name is verplicht voor een nieuwe service')
+    changes = {}
+    for k, v in vals.items():
+      if k == 'id':
+        continue
+      old = _get(svc, *FIELDS[k])
+      if svc is None or old != v:
+        changes[k] = ['***' if k in SECRETS and old else old, '***' if k in SECRETS and v else v]
+    action = 'error' if errors else ('create' if svc is None else ('update' if changes else 'unchanged'))
+    summary[action] += 1
+    rows.append({'row': n, 'action': action, 'id': svc.id if svc is not None else vals.get('id'),
+                 'uid': vals.get('uid', svc.uid if svc is not None else ''),
+                 'name': vals.get('name', svc.name if svc is not None else ''),
+                 'changes': changes, 'errors': errors, '_svc': svc, '_vals': vals})
+  return {'rows': rows, 'summary': summary, 'ok': not summary['error']}
+
+
+def public_plan(plan: dict, limit: int | None = None) -> dict:
+  """Plan zonder interne objecten en ongewijzigde rijen (voor JSON); `limit` begrenst het aantal rijen."""
+  rows = [{k: v for k, v in r.items() if not k.startswith('_')} for r in plan['rows'] if r['action'] != 'unchanged']
+  return {'ok': plan['ok'], 'summary': plan['summary'], 'rows': rows[:limit] if limit else rows}
+
+
+# -- uitvoeren --
+
+def apply_import(db, plan: dict) -> dict:
+  """Voer een foutloos plan uit in één transactie; geeft {created: [ids], updated: [ids]}.
+
+  Nieuwe services krijgen hun id vooraf (max(id) onder een lock), zodat
+  services en alle kindtabellen met één executemany per tabel ingevoegd
+  kunnen worden; bijwerkingen gaan via de (eager geladen) objecten.
+  """
+  if not plan['ok']:
+    raise ValueError('plan bevat fouten')
+  creates = [r for r in plan['rows'] if r['action'] == 'create']
+  updates = [r for r in plan['rows'] if r['action'] == 'update']
+  created, updated = [], []
+  try:
+    for r in updates:
+      svc, vals = r['_svc'], r['_vals']
+      for k, v in vals.items():
+        if k == 'id':
+          continue
+        prefix, col = FIELDS[k]
+        obj = svc
+        if prefix:
+          obj = getattr(svc, prefix)
+          if obj is None:
+            obj = _MODELS[prefix]()
+            setattr(svc, prefix, obj)
+        setattr(obj, col.key, v)
+      updated.append(svc.id)
+    if creates:
+      nxt = (db.execute(select(func.max(Service.id)).with_for_update()).scalar() or 0) + 1
+      taken = {r['_vals']['id'] for r in creates if 'id' in r['_vals']}
+      per_table = {prefix: [] for prefix, _ in SECTIONS}
+      for r in creates:
+        vals = r['_vals']
+        sid = vals.get('id')
+        if sid is None:
+          while nxt in taken:
+            nxt += 1
+          sid, nxt = nxt, nxt + 1
+        for prefix, model in SECTIONS:
+          row = {c.key: vals.get(f"{prefix}.{c.name}" if prefix else c.name, _default(c)) for c in _columns(model)}
+          if prefix:
+            row['service_id'] = sid
+          else:
+            row['id'] = sid
+          per_table[prefix].append(row)
+        created.append(sid)
+      for prefix, model in SECTIONS:
+        rows = per_table[prefix]
+        for i in range(0, len(rows), BATCH):
+          db.execute(insert(model), rows[i:i + BATCH])
+    db.commit()
+  except Exception:
+    db.rollback()
+    raise
+  return {'created': created, 'updated': updated}
+
+
+# -- export --
+
+def export_record(svc: Service, secrets: bool = False) -> dict:
+  out = {}
+  for prefix, model in SECTIONS:
+    for c in _columns(model):
+      if c.name in SECRETS and not secrets:
+        continue
+      out[f"{prefix}.{c.name}" if prefix else c.name] = _get(svc, prefix, c)
+  return out
+
+
+def export_fields(secrets: bool = False) -> list[str]:
+  return [k for k in FIELDS if secrets or k not in SECRETS]
+
+
+def stream_json(db, secrets: bool = False):
+  """JSON-array, één service per regel; leest in batches en houdt niet alles in het geheugen."""
+  yield '[\n'
+  first = True
+  for svc in iter_services(db, BATCH):
+    yield ('' if first else ',\n') + json.dumps(export_record(svc, secrets), ensure_ascii=False)
+    first = False
+  yield '\n]\n'
+
+
+def stream_csv(db, secrets: bool = False, chunk: int = 200):
+  fields = export_fields(secrets)
+  buf = io.StringIO()
+  w = csv.DictWriter(buf, fieldnames=fields)
+  w.writeheader()
+  n = 0
+  for svc in iter_services(db, BATCH):
+    rec = export_record(svc, secrets)
+    w.writerow({k: ('1' if v is True else '0' if v is False else v) for k, v in rec.items()})
+    n += 1
+    if n % chunk == 0:
+      yield buf.getvalue()
+      buf.seek(0)
+      buf.truncate()
+  yield buf.getvalue()
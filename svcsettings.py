@@ -0,0 +1,171 @@
+from __future__ import annotations
+import os, time, tempfile, threading
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import joinedload
+
+from db import get_session
+from models import Service, ServiceLimits, ServiceFeatures, ServiceIcecast, ServiceAutoDJ, ServiceRelay
+
+# Alle één-op-één kinderen in dezelfde query (LEFT OUTER JOINs) i.p.v. één lazy load per relatie
+EAGER = (joinedload(Service.limits), joinedload(Service.features), joinedload(Service.icecast),
+         joinedload(Service.autodj), joinedload(Service.relay))
+_CHILDREN = (ServiceLimits, ServiceFeatures, ServiceIcecast, ServiceAutoDJ, ServiceRelay)
+
+
+def load_service(db, svc_id: int) -> Service | None:
+  """Service met alle instellingen in één query."""
+  return db.execute(select(Service).options(*EAGER).where(Service.id == svc_id)).unique().scalar_one_or_none()
+
+
+def load_services(db, ids=None) -> list[Service]:
+  """Meerdere services (None = alle) met hun instellingen in één query, op id gesorteerd."""
+  stmt = select(Service).options(*EAGER).order_by(Service.id)
+  if ids is not None:
+    stmt = stmt.where(Service.id.in_(list(ids)))
+  return list(db.execute(stmt).unique().scalars())
+
+
+def iter_services(db, batch: int = 500):
+  """Alle services (eager, op id) in keyset-batches; houdt de sessie klein voor streaming exports."""
+  last = 0
+  while True:
+    rows = list(db.execute(select(Service).options(*EAGER).where(Service.id > last).order_by(Service.id).limit(batch))
+                .unique().scalars())
+    if not rows:
+      return
+    yield from rows
+    last = rows[-1].id
+    db.expunge_all()
+
+
+def settings_dict(svc: Service) -> dict:
+  """Instellingen van een (eager geladen) service als platte dict voor templates/API."""
+  lim, feat, ice, adj, rel = svc.limits, svc.features, svc.icecast, svc.autodj, svc.relay
+  return {
+    'id': svc.id,
+    'name': svc.name,
+    'svc_type': svc.svc_type,
+    'owner': svc.owner,
+    'uid': svc.uid,
+    'port': svc.port,
+    'admin_pass': svc.admin_pass,
+    'source_pass': svc.source_pass,
+    'relay_pass': svc.relay_pass,
+    'limits': {k: getattr(lim, k, None) for k in ('mounts', 'autodj', 'bitrate', 'listeners', 'bandwidth', 'storage')},
+    'features': {k: getattr(feat, k, None) for k in ('hist', 'proxy', 'geoip', 'auth', 'multi', 'public', 'social', 'record')},
+    'icecast': {
+      'public_server': getattr(ice, 'public_server', None),
+      'intro': getattr(ice, 'intro_path', None),
+      'yp': getattr(ice, 'yp_url', None),
+      'redirect': getattr(ice, 'redirect_path', None),
+    },
+    'autodj': {k: getattr(adj, k, None) for k in ('autodj_type', 'fade_in', 'fade_out', 'fade_min', 'smart_fade', 'replay_gain')},
+    'relays': {'relay_type': getattr(rel, 'relay_type', None)},
+  }
+
+
+class SettingsCache:
+  """Instellingen-dict per service, in-process gecachet.
+
+  Een commit via `session_factory` die een service of een van zijn kinderen
+  raakt, wist de betreffende entries direct (session events) en zet een
+  nieuwe stempel in `stamp_path`. Elke lookup vergelijkt die stempel (één
+  stat) met die van het moment van laden, zodat ook andere workers direct
+  na een commit vers lezen; `ttl` is alleen nog een vangnet.
+  """
+
+  def __init__(self, session_factory, ttl: float = 30.0, stamp_path: str | None = None):
+    self.ttl = ttl
+    self.stamp_path = stamp_path or os.path.join(tempfile.gettempdir(), 'ingest-admin-settings.stamp')
+    self._lock = threading.Lock()
+    self._data = {}   # id -> (at, stempel, dict)
+    self.hits = 0
+    self.misses = 0
+    event.listen(session_factory, 'after_flush', self._after_flush)
+    event.listen(session_factory, 'after_commit', self._after_commit)
+    event.listen(session_factory, 'after_rollback', self._after_rollback)
+
+  # -- invalidatie --
+
+  def _after_flush(self, session, flush_context):
+    ids = session.info.setdefault('svcsettings_dirty', set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+      if isinstance(obj, Service):
+        ids.add(obj.id)
+      elif isinstance(obj, _CHILDREN):
+        ids.add(obj.service_id)
+
+  def _after_commit(self, session):
+    ids = session.info.pop('svcsettings_dirty', None)
+    if ids:
+      self.invalidate(ids)
+
+  def _after_rollback(self, session):
+    session.info.pop('svcsettings_dirty', None)
+
+  def stamp(self) -> int:
+    try:
+      return os.stat(self.stamp_path).st_mtime_ns
+    except OSError:
+      return 0
+
+  def _bump(self):
+    """Nieuwe stempel voor alle workers (mtime in ns, altijd anders dan de vorige)."""
+    try:
+      with open(self.stamp_path, 'a'):
+        pass
+      old = self.stamp()
+      now = max(time.time_ns(), old + 1)
+      os.utime(self.stamp_path, ns=(now, now))
+    except OSError:
+      pass
+
+  def invalidate(self, ids=None):
+    self._bump()
+    with self._lock:
+      if ids is None:
+        self._data.clear()
+      else:
+        for i in ids:
+          self._data.pop(i, None)
+
+  # -- lezen --
+
+  def put(self, settings: dict, stamp: int | None = None):
+    """`stamp`: stempel van vóór het laden (default: nu); een latere commit maakt de entry zo ongeldig."""
+    stamp = self.stamp() if stamp is None else stamp
+    with self._lock:
+      self._data[settings['id']] = (time.time(), stamp, settings)
+
+  def get(self, svc_id: int) -> dict | None:
+    return self.get_many([svc_id]).get(svc_id)
+
+  def get_many(self, ids) -> dict[int, dict]:
+    """{id: settings} voor alle bestaande `ids`; ontbrekende worden samen in één query geladen."""
+    now = time.time()
+    stamp = self.stamp()
+    out, todo = {}, []
+    with self._lock:
+      for i in ids:
+        hit = self._data.get(i)
+        if hit is not None and now - hit[0] < self.ttl and hit[1] == stamp:
+          out[i] = hit[2]
+        elif i not in todo:
+          todo.append(i)
+      self.hits += len(out)
+      self.misses += len(todo)
+    if todo:
+      db = get_session()
+      try:
+        loaded = [settings_dict(s) for s in load_services(db, todo)]
+      finally:
+        db.close()
+      for s in loaded:
+        self.put(s, stamp)
+        out[s['id']] = s
+    return out
+
+  def stats(self) -> dict:
+    with self._lock:
+      return {'entries': len(self._data), 'hits': self.hits, 'misses': self.misses, 'ttl': self.ttl, 'stamp': self.stamp_path}
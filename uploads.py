@@ -0,0 +1,273 @@
+from __future__ import annotations
+import os, re, json, time, fcntl, hashlib, secrets, tempfile, threading
+
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+BLOCK = 1024 * 1024
+
+
+class UploadError(Exception):
+  """Fout in een (chunked) upload; `status` is de bijpassende HTTP-status."""
+
+  def __init__(self, message: str, status: int = 400, **extra):
+    super().__init__(message)
+    self.status = status
+    self.extra = extra
+
+
+def _fsync_dir(path: str):
+  try:
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+  except OSError:
+    return
+  try:
+    os.fsync(fd)
+  except OSError:
+    pass
+  finally:
+    os.close(fd)
+
+
+def publish(tmp_path: str, dest: str):
+  """fsync het tijdelijke bestand en zet het atomair op `dest` (zelfde filesystem)."""
+  fd = os.open(tmp_path, os.O_RDONLY)
+  try:
+    os.fsync(fd)
+  finally:
+    os.close(fd)
+  os.chmod(tmp_path, 0o644)
+  os.replace(tmp_path, dest)
+  _fsync_dir(os.path.dirname(dest))
+
+
+def move_file(src: str, dest: str, tmp_dir: str):
+  """Verplaats atomair zonder te overschrijven (FileExistsError als `dest` al bestaat).
+
+  Via link+unlink: `dest` verschijnt in één keer en een bestaand bestand wordt
+  nooit vervangen. Valt terug op kopiëren via een tempfile in `tmp_dir`
+  (zelfde filesystem als `dest`, buiten de bewaakte mappen) als hard links
+  niet kunnen (ander filesystem).
+  """
+  try:
+    os.link(src, dest)
+  except FileExistsError:
+    raise
+  except OSError:
+    copy_file(src, tmp_dir, dest)
+  os.unlink(src)
+  _fsync_dir(os.path.dirname(src))
+  _fsync_dir(os.path.dirname(dest))
+
+
+def copy_file(src: str, tmp_dir: str, dest: str):
+  """Kopieer naar een tempfile in `tmp_dir` (zelfde filesystem als `dest`) en publiceer zonder te overschrijven."""
+  os.makedirs(tmp_dir, exist_ok=True)
+  fd, tmp = tempfile.mkstemp(prefix='copy-', suffix='.part', dir=tmp_dir)
+  try:
+    with os.fdopen(fd, 'wb') as out, open(src, 'rb') as f:
+      while True:
+        buf = f.read(BLOCK)
+        if not buf:
+          break
+        out.write(buf)
+      out.flush()
+      os.fsync(out.fileno())
+    os.chmod(tmp, 0o644)
+    os.link(tmp, dest)
+  finally:
+    try:
+      os.unlink(tmp)
+    except OSError:
+      pass
+  _fsync_dir(os.path.dirname(dest))
+
+
+def save_stream(stream, tmp_dir: str, dest: str) -> tuple[int, str]:
+  """Schrijf `stream` naar een tempfile in `tmp_dir` en publiceer atomair op `dest`; geeft (bytes, sha256)."""
+  os.makedirs(tmp_dir, exist_ok=True)
+  fd, tmp = tempfile.mkstemp(prefix='upload-', suffix='.part', dir=tmp_dir)
+  h = hashlib.sha256()
+  size = 0
+  try:
+    with os.fdopen(fd, 'wb') as f:
+      while True:
+        buf = stream.read(BLOCK)
+        if not buf:
+          break
+        h.update(buf)
+        f.write(buf)
+        size += len(buf)
+    publish(tmp, dest)
+  except BaseException:
+    try:
+      os.unlink(tmp)
+    except OSError:
+      pass
+    raise
+  return size, h.hexdigest()
+
+
+class ChunkedUploads:
+  """Hervatbare uploads: chunks op offset naar `<id>.part` in `tmp_dir`, daarna fsync + atomic rename.
+
+  Metadata staat naast het part-bestand (`<id>.json`), zodat elke worker of een
+  herstart de upload kan hervatten; de huidige offset is de grootte van het
+  part-bestand. Een flock per upload serialiseert gelijktijdige chunks. De
+  sha256 wordt tijdens het schrijven bijgehouden; een worker die de upload niet
+  zelf begon hasht eerst het bestaande deel in.
+  """
+
+  def __init__(self, tmp_dir: str, max_size: int, ttl: float = 86400.0):
+    self.tmp_dir = tmp_dir
+    self.max_size = max_size
+    self.ttl = ttl
+    self._lock = threading.Lock()
+    self._hash = {}   # id -> (offset, sha256-state)
+    self._last_cleanup = 0.0
+
+  def _paths(self, uid: str) -> tuple[str, str]:
+    if not _ID_RE.match(uid or ''):
+      raise UploadError('Onbekende upload', 404)
+    base = os.path.join(self.tmp_dir, uid)
+    return base + '.part', base + '.json'
+
+  def _meta(self, uid: str) -> dict:
+    _, meta_path = self._paths(uid)
+    try:
+      with open(meta_path) as f:
+        return json.load(f)
+    except FileNotFoundError:
+      raise UploadError('Onbekende of verlopen upload', 404)
+
+  def start(self, dir_name: str, name: str, size: int, sha256: str = '') -> dict:
+    if size < 0 or size > self.max_size:
+      raise UploadError(f'Bestand te groot (max {self.max_size // (1024 * 1024)} MB)', 413)
+    self.cleanup()
+    os.makedirs(self.tmp_dir, exist_ok=True)
+    uid = secrets.token_hex(16)
+    part, meta_path = self._paths(uid)
+    meta = {'id': uid, 'dir': dir_name, 'name': name, 'size': size, 'sha256': (sha256 or '').lower(), 'created': time.time()}
+    open(part, 'wb').close()
+    tmp = meta_path + '.tmp'
+    with open(tmp, 'w') as f:
+      json.dump(meta, f)
+    os.replace(tmp, meta_path)
+    with self._lock:
+      self._hash[uid] = (0, hashlib.sha256())
+    return dict(meta, offset=0)
+
+  def status(self, uid: str) -> dict:
+    meta = self._meta(uid)
+    part, _ = self._paths(uid)
+    try:
+      meta['offset'] = os.path.getsize(part)
+    except OSError:
+      raise UploadError('Onbekende of verlopen upload', 404)
+    return meta
+
+  def _hasher(self, uid: str, f, offset: int):
+    with self._lock:
+      state = self._hash.pop(uid, None)
+    if state is not None and state[0] == offset:
+      return state[1]
+    # Andere worker of herstart: bestaand deel opnieuw inhashen
+    h = hashlib.sha256()
+    f.seek(0)
+    left = offset
+    while left:
+      buf = f.read(min(BLOCK, left))
+      if not buf:
+        break
+      h.update(buf)
+      left -= len(buf)
+    return h
+
+  def append(self, uid: str, offset: int, stream, length: int | None = None) -> int:
+    """Schrijf een chunk op `offset`; geeft de nieuwe offset. 409 als de offset niet aansluit."""
+    meta = self._meta(uid)
+    part, _ = self._paths(uid)
+    with open(part, 'r+b') as f:
+      fcntl.flock(f, fcntl.LOCK_EX)
+      cur = os.fstat(f.fileno()).st_size
+      if offset != cur:
+        raise UploadError('Offset sluit niet aan', 409, offset=cur)
+      h = self._hasher(uid, f, cur)
+      f.seek(cur)
+      written = 0
+      try:
+        while length is None or written < length:
+          buf = stream.read(BLOCK if length is None else min(BLOCK, length - written))
+          if not buf:
+            break
+          if cur + written + len(buf) > meta['size']:
+            raise UploadError('Meer data dan de opgegeven grootte', 400)
+          f.write(buf)
+          h.update(buf)
+          written += len(buf)
+      except BaseException:
+        # Afgebroken chunk: terug naar het begin ervan, zodat de client op `offset` kan hervatten
+        f.truncate(cur)
+        raise
+      f.flush()
+    with self._lock:
+      self._hash[uid] = (cur + written, h)
+    return cur + written
+
+  def finish(self, uid: str, dest_dir: str) -> dict:
+    """Controleer grootte en hash, fsync en rename atomair naar dest_dir/name; geeft meta + sha256."""
+    meta = self._meta(uid)
+    part, meta_path = self._paths(uid)
+    with open(part, 'rb') as f:
+      fcntl.flock(f, fcntl.LOCK_EX)
+      size = os.fstat(f.fileno()).st_size
+      if size != meta['size']:
+        raise UploadError('Upload is nog niet compleet', 409, offset=size)
+      digest = self._hasher(uid, f, size).hexdigest()
+      if meta['sha256'] and meta['sha256'] != digest:
+        self._discard(uid)
+        raise UploadError('Checksum klopt niet; upload verworpen', 422, sha256=digest)
+      dest = os.path.join(dest_dir, meta['name'])
+      publish(part, dest)
+    try:
+      os.unlink(meta_path)
+    except OSError:
+      pass
+    with self._lock:
+      self._hash.pop(uid, None)
+    return dict(meta, sha256=digest, path=dest)
+
+  def _discard(self, uid: str):
+    with self._lock:
+      self._hash.pop(uid, None)
+    for p in self._paths(uid):
+      try:
+        os.unlink(p)
+      except OSError:
+        pass
+
+  def abort(self, uid: str):
+    self._meta(uid)
+    self._discard(uid)
+
+  def cleanup(self, now: float | None = None):
+    """Verwijder uploads die langer dan `ttl` niet zijn aangevuld (max. eens per minuut)."""
+    now = now or time.time()
+    if now - self._last_cleanup < 60:
+      return
+    self._last_cleanup = now
+    try:
+      entries = list(os.scandir(self.tmp_dir))
+    except OSError:
+      return
+    for de in entries:
+      # Metadata veroudert met het part-bestand mee (dat bij elke chunk wijzigt)
+      uid = de.name.split('.', 1)[0]
+      ref = os.path.join(self.tmp_dir, uid + '.part') if _ID_RE.match(uid) else de.path
+      try:
+        try:
+          mtime = os.stat(ref).st_mtime
+        except FileNotFoundError:
+          mtime = de.stat().st_mtime
+        if now - mtime > self.ttl:
+          os.unlink(de.path)
+      except OSError:
+        pass